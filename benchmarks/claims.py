@@ -0,0 +1,189 @@
+# benchmarks/claims.py
+"""LLM calls and prompt tokens saved by the claim extractor (claims.py) in Stage 2.
+
+Runs Stage 2 with fake_llm.FakeTruthLLM three times over the same shadows:
+
+  llm         every shadow goes to the LLM with its five clean sessions
+  fast_path   consistent, well-backed shadows are answered by claims.py
+  fact_sheet  fast path, and the rest get the fact sheet instead of the sessions
+
+and reports LLM calls, prompt tokens and wall time per mode. Shadows come from
+a Stage 1 outputs/ dir (--outputs, e.g. the transcripts of audio/) or, without
+one, from synthetic interviews with known ground truth; then the fast-path
+answers are also checked against it (no contradiction missed, experience right).
+
+Usage:
+    python benchmarks/claims.py [--shadows 40] [--inconsistent 0.4] [--filler 60]
+    python benchmarks/claims.py --outputs outputs
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import contextlib
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results", "claims.json")
+sys.path.insert(0, ROOT)
+
+STACKS = [("Python", "Django"), ("Java", "Spring Boot"), ("JavaScript", "React"), ("Ruby", "Rails"), ("Python", "Flask")]
+WORDS = {1: "one", 2: "two", 3: "three", 4: "four", 5: "five", 6: "six", 8: "eight", 10: "ten", 12: "twelve",
+         15: "fifteen", 18: "eighteen", 24: "twenty four", 30: "thirty"}
+FILLER = ["We had a tricky outage last spring.", "The hardest part was the data migration.",
+          "I enjoy pairing on difficult bugs.", "Testing was something we took seriously.",
+          "Deadlines were tight but we shipped on time.", "I like reading other people's code.",
+          "Our on-call rotation taught me a lot.", "The product team changed direction twice.",
+          "We spent a while arguing about naming things.", "The customer kept asking for new reports.",
+          "I wrote most of the onboarding documents.", "Code review could take a couple of days.",
+          "We moved the office halfway through the project.", "Nobody really owned the billing code.",
+          "I try to keep my pull requests small.", "The old system had no monitoring at all."]
+
+def _num(rng: random.Random, n: int) -> str:
+    return WORDS[n] if n in WORDS and rng.random() < 0.5 else str(n)
+
+def synthetic_shadow(rng: random.Random, shadow_id: str, inconsistent: bool, filler: int) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """Five clean sessions and the ground truth behind them."""
+    years = rng.choice([1, 2, 3, 4, 5, 6, 8, 10])
+    lang, fw = rng.choice(STACKS)
+    team = rng.choice([3, 4, 5, 6, 8]) if rng.random() < 0.7 else 0
+    lie = rng.choice(["experience", "leadership"]) if inconsistent else ""
+    claims = {
+        "experience": [f"I have been coding in {lang} for {_num(rng, years)} years.",
+                       f"I've been writing {lang} professionally for around {_num(rng, years)} years.",
+                       f"All told that is {_num(rng, years)} years of programming experience."],
+        "stack": [f"Most of my work is in {lang} with {fw}.", f"I built our main services with {fw}."],
+        "team": ([f"I led a team of {_num(rng, team)} engineers on that project.",
+                  f"As the tech lead on a {team}-person team I reviewed most of the code."] if team else
+                 ["I mostly work alone on my projects.", "I'm an individual contributor and I like focused work."]),
+    }
+    sessions = {}
+    for n in range(1, 6):
+        picked = [rng.choice(claims[kind]) for kind in claims if n in (1, 3, 5) or rng.random() < 0.6]
+        picked += [rng.choice(FILLER) for _ in range(filler)]
+        rng.shuffle(picked)
+        sessions[n] = picked
+    if lie == "experience":
+        sessions[2].append(f"Honestly I have {_num(rng, years * 3)} years of experience with {lang}.")
+    elif lie == "leadership":
+        sessions[4].append("I mostly work alone on my projects." if team else
+                           f"I led a team of {_num(rng, 6)} engineers last year.")
+    texts = {f"{shadow_id}_{n}": " ".join(lines) for n, lines in sessions.items()}
+    return texts, {"consistent": not inconsistent, "years": years, "language": lang}
+
+def segments_for(texts: Dict[str, str]) -> Dict[str, List[Dict[str, Any]]]:
+    emotions = ["neu", "neu", "hap", "sad", "ang"]
+    sessions = {}
+    for name, text in texts.items():
+        sentences = [s.strip() + "." for s in text.split(".") if s.strip()]
+        sessions[name] = [{"start": i * 4.0, "end": i * 4.0 + 3.5, "text": s, "emotion": emotions[i % len(emotions)],
+                           "rms": 0.05, "pitch": 180.0, "style": ""} for i, s in enumerate(sentences)]
+    return sessions
+
+def load_outputs(path: str) -> Tuple[Dict[str, str], Dict[str, List[Dict[str, Any]]]]:
+    import segment_store
+    from manifest import iter_transcripts, load_manifest, shadow_ids
+    manifest = load_manifest(os.path.join(path, "manifest.json"))
+    transcripts = dict(iter_transcripts(manifest))
+    sessions: Dict[str, List[Dict[str, Any]]] = {}
+    for shadow_id in shadow_ids(manifest):
+        sessions.update(segment_store.load_shadow_sessions(os.path.join(path, "segments"), shadow_id))
+    return transcripts, sessions
+
+def run_mode(fast_path: bool, fact_sheet: bool, sessions, transcripts) -> Dict[str, Any]:
+    import metrics
+    import stage_2
+    from fake_llm import FakeTruthLLM
+    stage_2.CLAIMS_FAST_PATH, stage_2.CLAIMS_FACT_SHEET = fast_path, fact_sheet
+    t0 = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = stage_2.run_all(sessions, transcripts, llm=FakeTruthLLM(latency=0.0), use_cache=False,
+                                  use_checkpoints=False)
+    wall = time.perf_counter() - t0
+    counters = metrics.drain()["counters"]
+    return {"shadows": len(results), "llm_calls": int(counters.get("llm_calls", 0)),
+            "llm_prompt_tokens": int(counters.get("llm_prompt_tokens", 0)),
+            "fast_path": int(counters.get("claims_fast_path", 0)), "wall_s": round(wall, 3), "results": results}
+
+def check_fast_path(results: List[Dict[str, Any]], truth: Dict[str, Dict[str, Any]], fast_ids: List[str]) -> Dict[str, int]:
+    by_id = {r["shadow_id"]: r for r in results}
+    missed = wrong_years = wrong_language = 0
+    for shadow_id in fast_ids:
+        t, r = truth[shadow_id], by_id[shadow_id]["revealed_truth"]
+        missed += not t["consistent"]
+        wrong_years += not r["programming_experience"].startswith(f"{t['years']} year")
+        wrong_language += not r["programming_language"].startswith(t["language"])
+    return {"answered": len(fast_ids), "missed_contradictions": missed, "wrong_experience": wrong_years,
+            "wrong_language": wrong_language}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--outputs", help="Stage 1 outputs/ dir to take the shadows from (default: synthetic)")
+    parser.add_argument("--shadows", type=int, default=40, help="synthetic shadows")
+    parser.add_argument("--inconsistent", type=float, default=0.4, help="share of synthetic shadows with a contradiction")
+    parser.add_argument("--filler", type=int, default=60, help="claim-free sentences per synthetic session")
+    args = parser.parse_args()
+
+    import claims
+    truth: Optional[Dict[str, Dict[str, Any]]] = None
+    if args.outputs:
+        transcripts, sessions = load_outputs(os.path.abspath(args.outputs))
+    else:
+        rng = random.Random(0)
+        transcripts, truth = {}, {}
+        for i in range(args.shadows):
+            shadow_id = f"shadow{i:03d}_2025"
+            texts, truth[shadow_id] = synthetic_shadow(rng, shadow_id, rng.random() < args.inconsistent,
+                                                         args.filler)
+            transcripts.update(texts)
+        sessions = segments_for(transcripts)
+
+    from manifest import group_by_shadow
+    shadows = group_by_shadow(transcripts)
+    t0 = time.perf_counter()
+    sheets = {s: claims.fact_sheet(s, {n: transcripts[f"{s}_{n}"] for n in numbers}) for s, numbers in shadows.items()}
+    extract_ms = 1000 * (time.perf_counter() - t0) / max(len(shadows), 1)
+    print(f"{len(shadows)} shadows, claim extraction {extract_ms:.2f} ms/shadow")
+
+    results: Dict[str, Any] = {"source": args.outputs or "synthetic", "shadows": len(shadows),
+                               "extract_ms_per_shadow": round(extract_ms, 3), "modes": {}}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            for mode, fast_path, fact_sheet in [("llm", False, False), ("fast_path", True, False),
+                                                ("fact_sheet", True, True)]:
+                res = run_mode(fast_path, fact_sheet, sessions, transcripts)
+                answers = res.pop("results")
+                if truth is not None and fast_path:
+                    from config import CLAIMS_MIN_CONFIDENCE
+                    fast_ids = [s for s, sheet in sheets.items()
+                                if claims.fast_path_truth(sheet, CLAIMS_MIN_CONFIDENCE) is not None]
+                    res["fast_path_check"] = check_fast_path(answers, truth, fast_ids)
+                results["modes"][mode] = res
+                print(f"{mode:11} {res['llm_calls']:4} LLM calls  {res['llm_prompt_tokens']:8} prompt tokens  "
+                      f"{res['fast_path']:4} answered locally  {res['wall_s']:6.2f}s")
+        finally:
+            os.chdir(cwd)
+
+    base = results["modes"]["llm"]
+    for mode in ("fast_path", "fact_sheet"):
+        res = results["modes"][mode]
+        res["calls_saved"] = 1 - res["llm_calls"] / max(base["llm_calls"], 1)
+        res["tokens_saved"] = 1 - res["llm_prompt_tokens"] / max(base["llm_prompt_tokens"], 1)
+        print(f"{mode:11} saves {res['calls_saved']:.0%} of LLM calls, {res['tokens_saved']:.0%} of prompt tokens")
+        if "fast_path_check" in res:
+            print(f"{'':11} fast-path check: {res['fast_path_check']}")
+
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {RESULTS_PATH}")
+    check = results["modes"]["fast_path"].get("fast_path_check", {})
+    sys.exit(1 if check.get("missed_contradictions") else 0)
+
+if __name__ == "__main__":
+    main()
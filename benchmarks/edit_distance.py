@@ -0,0 +1,96 @@
+# benchmarks/edit_distance.py
+"""Speed and correctness of evaluate.py's scorer on synthetic transcripts.
+
+Builds --sessions reference transcripts of --words words and hypotheses with
+--error-rate random substitutions/deletions/insertions, then times
+
+  - the pure-Python DP (the old benchmarks/whisper_precision.py word_edits) on a sample
+  - evaluate.levenshtein on the same sample, checking it returns the same distances
+  - evaluate.score over every session, serially and with --workers processes
+
+Usage:
+    python benchmarks/edit_distance.py [--sessions 200] [--words 3000] [--error-rate 0.1] [--workers 4]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results", "edit_distance.json")
+sys.path.insert(0, ROOT)
+
+import evaluate
+from benchmarks.stubs import WORDS
+
+def dp_edits(ref: List[str], hyp: List[str]) -> int:
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, start=1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, start=1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1]
+
+def make_pair(rng: random.Random, words: int, error_rate: float) -> Tuple[str, str]:
+    ref = [rng.choice(WORDS) for _ in range(words)]
+    hyp = []
+    for w in ref:
+        if rng.random() >= error_rate:
+            hyp.append(w)
+            continue
+        edit = rng.randrange(3)
+        if edit == 0:
+            hyp.append(rng.choice(WORDS))
+        elif edit == 2:
+            hyp += [w, rng.choice(WORDS)]
+    return " ".join(ref), " ".join(hyp)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--words", type=int, default=3000, help="reference words per session")
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--sample", type=int, default=3, help="sessions timed with the pure-Python DP")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pairs = [make_pair(rng, args.words, args.error_rate) for _ in range(args.sessions)]
+    reference = {f"session_{i}": ref for i, (ref, _) in enumerate(pairs)}
+    hypothesis = {f"session_{i}": hyp for i, (_, hyp) in enumerate(pairs)}
+    results: Dict[str, float] = {"sessions": args.sessions, "words": args.words, "error_rate": args.error_rate}
+
+    sample = [(evaluate.normalize_words(r), evaluate.normalize_words(h)) for r, h in pairs[:args.sample]]
+    t0 = time.perf_counter()
+    expected = [dp_edits(r, h) for r, h in sample]
+    results["dp_s_per_session"] = (time.perf_counter() - t0) / len(sample)
+    t0 = time.perf_counter()
+    got = [evaluate.levenshtein(r, h) for r, h in sample]
+    results["bitparallel_s_per_session"] = (time.perf_counter() - t0) / len(sample)
+    if got != expected:
+        sys.exit(f"Distance mismatch: {got} != {expected}")
+    print(f"word distance per session: DP {results['dp_s_per_session'] * 1000:8.1f} ms   "
+          f"bit-parallel {results['bitparallel_s_per_session'] * 1000:8.1f} ms   "
+          f"(x{results['dp_s_per_session'] / results['bitparallel_s_per_session']:.0f})")
+
+    for workers in sorted({1, args.workers}):
+        for alignment in (False, True):
+            t0 = time.perf_counter()
+            report = evaluate.score(reference, hypothesis, alignment=alignment, workers=workers)
+            wall = time.perf_counter() - t0
+            key = f"score_{'aligned_' if alignment else ''}{workers}w_s"
+            results[key] = wall
+            print(f"score {args.sessions} sessions, {workers} workers{', alignments' if alignment else '':12} "
+                  f"{wall:7.2f}s  WER {report['summary']['wer']:.2%}  CER {report['summary']['cer']:.2%}")
+
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {RESULTS_PATH}")
+
+if __name__ == "__main__":
+    main()
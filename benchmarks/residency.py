@@ -0,0 +1,95 @@
+# benchmarks/residency.py
+"""Peak RSS of Stage 1 per residency schedule.
+
+Runs Stage 1 over a synthetic corpus with stub models that hold --whisper-mb
+and --ser-mb of resident memory (benchmarks/stubs.py), once per schedule, each
+in a fresh process so peaks don't carry over:
+
+  unbudgeted  the plain sequential loop (no MEMORY_BUDGET_MB)
+  resident    both models loaded, one pass per file
+  two-phase   transcribe all, unload Whisper, annotate all
+  auto        MEMORY_BUDGET_MB = --budget, schedule picked by residency.plan_schedule
+
+and reports wall time and peak RSS per phase. Exits non-zero if the "auto" run
+goes over --budget.
+
+Usage:
+    python benchmarks/residency.py [--budget 1800] [--whisper-mb 1200] [--ser-mb 800] [--shadows 1] [--seconds 600]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import contextlib
+import subprocess
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results", "residency.json")
+sys.path.insert(0, ROOT)
+
+SCHEDULES = ["unbudgeted", "resident", "two-phase", "auto"]
+
+def child(corpus: str, schedule: str, budget: float, whisper_mb: float, ser_mb: float) -> Dict[str, Any]:
+    """One Stage 1 run in this process; returns its timings and RSS gauges."""
+    import config
+    import metrics
+    import stage_1
+    from benchmarks.stubs import stubbed_models
+    os.chdir(corpus)
+    config.AUDIO_FILES = sorted(os.path.join("audio", f) for f in os.listdir("audio"))
+    overrides = {"MODEL_FOOTPRINT_MB": {"whisper": whisper_mb, "ser": ser_mb}}
+    if schedule == "auto":
+        overrides["MEMORY_BUDGET_MB"] = budget
+    elif schedule != "unbudgeted":
+        overrides["RESIDENCY_SCHEDULE"] = schedule
+    with metrics.Timer() as t, stubbed_models(whisper_mb=whisper_mb, ser_mb=ser_mb):
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            stage_1.build(use_cache=False, overrides=overrides)
+    phases = {labels["phase"]: round(value / (1024 * 1024), 1)
+              for name, labels, value in metrics.drain()["gauges"] if name == "phase_peak_rss_bytes"}
+    return {"wall_s": round(t.elapsed, 3), "peak_rss_mb": round(metrics.peak_rss() / (1024 * 1024), 1),
+            "phase_peak_rss_mb": phases}
+
+def run(corpus: str, schedule: str, args) -> Dict[str, Any]:
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", corpus, schedule,
+                          "--budget", str(args.budget), "--whisper-mb", str(args.whisper_mb), "--ser-mb", str(args.ser_mb)],
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=1800.0, help="MEMORY_BUDGET_MB for the auto run")
+    parser.add_argument("--whisper-mb", type=float, default=1200.0, help="resident memory of the stub Whisper")
+    parser.add_argument("--ser-mb", type=float, default=800.0, help="resident memory of the stub SER model")
+    parser.add_argument("--shadows", type=int, default=1, help="synthetic shadows (5 sessions each)")
+    parser.add_argument("--seconds", type=float, default=600.0, help="length of each session")
+    parser.add_argument("--child", nargs=2, metavar=("CORPUS", "SCHEDULE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(child(*args.child, args.budget, args.whisper_mb, args.ser_mb)))
+        return
+
+    from benchmarks.synthetic import make_corpus
+    results: Dict[str, Any] = {"budget_mb": args.budget, "whisper_mb": args.whisper_mb, "ser_mb": args.ser_mb,
+                               "shadows": args.shadows, "seconds": args.seconds, "schedules": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        make_corpus(os.path.join(tmp, "audio"), args.shadows, args.seconds)
+        for schedule in SCHEDULES:
+            res = results["schedules"][schedule] = run(tmp, schedule, args)
+            phases = "  ".join(f"{name} {mb:.0f}" for name, mb in res["phase_peak_rss_mb"].items())
+            print(f"{schedule:11} {res['wall_s']:8.2f}s  peak RSS {res['peak_rss_mb']:7.0f} MB  "
+                  f"{'(per phase MB: ' + phases + ')' if phases else ''}")
+
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {RESULTS_PATH}")
+    within = results["schedules"]["auto"]["peak_rss_mb"] <= args.budget
+    print(f"auto run {'within' if within else 'OVER'} the {args.budget:.0f} MB budget")
+    sys.exit(0 if within else 1)
+
+if __name__ == "__main__":
+    main()
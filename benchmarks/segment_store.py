@@ -0,0 +1,122 @@
+# benchmarks/segment_store.py
+"""Load time and memory for one shadow's segments: sessions.json vs the columnar segment store.
+
+Generates a synthetic corpus (shadows x 5 sessions x segments), writes it as the
+old indent=2 sessions.json, the new compact sessions.json, and the segment
+store in Arrow IPC and Parquet. Then, in a fresh interpreter per measurement,
+it loads the segments of one shadow the way Stage 2 does, builds the prompt
+payload from them, and reports both times and peak RSS above the post-import
+baseline. "arrow-pylist" loads the Arrow partitions as Python dicts first, as
+Stage 2 did before it built the payload from the Arrow columns directly.
+
+Usage:
+    python benchmarks/segment_store.py [--shadows 200] [--segments 300] [--repeat 3]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+from typing import Any, Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results", "segment_store.json")
+sys.path.insert(0, ROOT)
+
+MODES = ["json-indent", "json-compact", "arrow-pylist", "arrow", "parquet"]
+EMOTIONS = ["neu", "neu", "neu", "hap", "sad", "ang"]
+
+def synthetic_sessions(n_shadows: int, segments: int, seed: int = 0) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    words = ["python", "team", "project", "years", "experience", "lead", "model", "data", "django", "java"]
+    sessions = {}
+    for s in range(n_shadows):
+        for n in range(1, 6):
+            t = 0.0
+            segs = []
+            for _ in range(segments):
+                dur = rng.uniform(1.0, 6.0)
+                segs.append({"start": round(t, 2), "end": round(t + dur, 2),
+                             "text": " ".join(rng.choice(words) for _ in range(rng.randint(4, 16))),
+                             "emotion": rng.choice(EMOTIONS), "rms": rng.uniform(0.01, 0.3),
+                             "pitch": rng.uniform(90.0, 300.0)})
+                t += dur + rng.uniform(0.1, 1.0)
+            sessions[f"shadow{s:04d}_2025_{n}"] = segs
+    return sessions
+
+def child(mode: str, data_dir: str, shadow_id: str):
+    """Runs in a fresh interpreter: load one shadow and build its payload, print timings and memory as JSON."""
+    from config import PROMPT_TOKEN_BUDGET
+    from metrics import current_rss, peak_rss
+    import segment_store
+    from prompt_payload import build_annotation_payload, shadow_segments
+    base = current_rss()
+    t0 = time.perf_counter()
+    if mode.startswith("json"):
+        with open(os.path.join(data_dir, f"sessions_{mode}.json"), "r", encoding="utf-8") as f:
+            picked = {f"{shadow_id}_{n}": segs for n, segs in shadow_segments(json.load(f), shadow_id).items()}
+    elif mode == "arrow-pylist":
+        picked = segment_store.load_shadow_sessions(os.path.join(data_dir, "arrow"), shadow_id)
+    else:
+        picked = segment_store.read_shadow(os.path.join(data_dir, mode), shadow_id)
+    t1 = time.perf_counter()
+    build_annotation_payload(picked, shadow_id, PROMPT_TOKEN_BUDGET)
+    t2 = time.perf_counter()
+    print(json.dumps({"seconds": t1 - t0, "payload_seconds": t2 - t1, "peak_mb": max(peak_rss() - base, 0) / 2**20,
+                      "segments": sum(len(v) for v in picked.values())}))
+
+def dir_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shadows", type=int, default=200)
+    parser.add_argument("--segments", type=int, default=300, help="segments per session")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "DIR", "SHADOW"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(*args.child)
+
+    import segment_store
+    sessions = synthetic_sessions(args.shadows, args.segments)
+    shadow_id = f"shadow{args.shadows // 2:04d}_2025"
+    results: Dict[str, Any] = {"shadows": args.shadows, "segments_per_session": args.segments, "modes": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "sessions_json-indent.json"), "w", encoding="utf-8") as f:
+            json.dump(sessions, f, ensure_ascii=False, indent=2)
+        with open(os.path.join(tmp, "sessions_json-compact.json"), "w", encoding="utf-8") as f:
+            json.dump(sessions, f, ensure_ascii=False, separators=(",", ":"))
+        for fmt in ("arrow", "parquet"):
+            for name, segs in sessions.items():
+                segment_store.write_session(os.path.join(tmp, fmt), name, segs, fmt)
+
+        for mode in MODES:
+            path = os.path.join(tmp, f"sessions_{mode}.json") if mode.startswith("json") else os.path.join(tmp, mode.split("-")[0])
+            runs = []
+            for _ in range(args.repeat):
+                out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, tmp, shadow_id],
+                                     capture_output=True, text=True, check=True, cwd=ROOT)
+                runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+            best = min(runs, key=lambda r: r["seconds"])
+            results["modes"][mode] = {"disk_mb": round(dir_size(path) / 2**20, 2),
+                                      "load_s": round(best["seconds"], 4),
+                                      "payload_s": round(min(r["payload_seconds"] for r in runs), 4),
+                                      "peak_mb": round(min(r["peak_mb"] for r in runs), 1),
+                                      "segments": best["segments"]}
+            m = results["modes"][mode]
+            print(f"{mode:13} disk {m['disk_mb']:8.1f} MB  load one shadow {m['load_s'] * 1000:8.1f} ms  "
+                  f"payload {m['payload_s'] * 1000:7.1f} ms  peak +{m['peak_mb']:7.1f} MB  ({m['segments']} segments)")
+
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {RESULTS_PATH}")
+
+if __name__ == "__main__":
+    main()
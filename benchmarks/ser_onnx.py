@@ -0,0 +1,123 @@
+# benchmarks/ser_onnx.py
+"""SER parity and latency: torch fp32 vs SER_QUANTIZE (torch int8) and onnxruntime (fp32 and int8).
+
+Cuts the recordings in audio/ (config.AUDIO_FILES) into speech regions with the
+same energy segmenter the stub Whisper uses, classifies every region with the
+torch EmotionClassifier (fp32, and dynamic int8 as with SER_QUANTIZE) and with
+OnnxEmotionClassifier, and reports
+
+  - per-segment latency (predict_label, one region at a time), mean and p50
+  - batched throughput (predict_batch over each file), segments/s and audio-s/s
+  - label agreement with torch fp32 and the largest probability difference
+
+Exits non-zero when a backend agrees with torch on fewer than --min-agreement
+of the segments. Needs torch, transformers, onnx and onnxruntime; the first run
+exports the model to SER_ONNX_DIR.
+
+Usage:
+    python benchmarks/ser_onnx.py [--files 5] [--max-segments 200] [--min-agreement 0.95]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results", "ser_onnx.json")
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+import config
+from config import SAMPLE_RATE, SER_MAX_BATCH_SECONDS, SER_MODEL_ID, SER_ONNX_DIR
+from benchmarks.stubs import StubWhisper
+
+def load_segments(files: List[str], max_segments: int) -> List[List[np.ndarray]]:
+    """Speech regions of each file (at most `max_segments` in total)."""
+    from utils_audio import load_audio
+    segmenter = StubWhisper(SAMPLE_RATE)
+    per_file, total = [], 0
+    for path in files:
+        audio = np.asarray(load_audio(path, SAMPLE_RATE), dtype=np.float32)
+        regions = segmenter._regions(audio)[:max_segments - total]
+        per_file.append([audio[int(a * SAMPLE_RATE):int(b * SAMPLE_RATE)] for a, b in regions])
+        total += len(regions)
+        if total >= max_segments:
+            break
+    return per_file
+
+def measure(ser, per_file: List[List[np.ndarray]]) -> Dict[str, Any]:
+    segments = [s for chunks in per_file for s in chunks]
+    audio_s = sum(s.shape[0] for s in segments) / SAMPLE_RATE
+    ser.predict_label(segments[0], SAMPLE_RATE)  # warm-up
+
+    latencies = []
+    for seg in segments:
+        t0 = time.perf_counter()
+        ser.predict_label(seg, SAMPLE_RATE)
+        latencies.append(time.perf_counter() - t0)
+
+    labels, probs = [], []
+    t0 = time.perf_counter()
+    for chunks in per_file:
+        file_labels, file_probs = ser.predict_batch(chunks, SAMPLE_RATE)
+        labels.extend(file_labels)
+        probs.append(file_probs)
+    batch_wall = time.perf_counter() - t0
+    return {
+        "latency_mean_ms": round(1000 * float(np.mean(latencies)), 2),
+        "latency_p50_ms": round(1000 * float(np.percentile(latencies, 50)), 2),
+        "segments_per_s": round(len(segments) / batch_wall, 2),
+        "audio_s_per_s": round(audio_s / batch_wall, 2),
+        "labels": labels, "probs": np.concatenate(probs),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=5, help="recordings from audio/ to use")
+    parser.add_argument("--max-segments", type=int, default=200)
+    parser.add_argument("--min-agreement", type=float, default=0.95, help="required label agreement with torch")
+    args = parser.parse_args()
+
+    from utils_audio import EmotionClassifier, OnnxEmotionClassifier
+    files = config.AUDIO_FILES[:args.files]
+    if not files:
+        sys.exit(f"No recordings in {config.AUDIO_DIR}/")
+    per_file = load_segments(files, args.max_segments)
+    n = sum(len(chunks) for chunks in per_file)
+    print(f"{n} segments from {len(per_file)} files")
+
+    backends = {
+        "torch": lambda: EmotionClassifier(SER_MODEL_ID, max_batch_seconds=SER_MAX_BATCH_SECONDS),
+        "torch_int8": lambda: EmotionClassifier(SER_MODEL_ID, max_batch_seconds=SER_MAX_BATCH_SECONDS, quantize=True),
+        "onnx": lambda: OnnxEmotionClassifier(SER_MODEL_ID, SER_MAX_BATCH_SECONDS, cache_dir=SER_ONNX_DIR),
+        "onnx_int8": lambda: OnnxEmotionClassifier(SER_MODEL_ID, SER_MAX_BATCH_SECONDS, quantize=True,
+                                                   cache_dir=SER_ONNX_DIR),
+    }
+    results: Dict[str, Any] = {"segments": n, "files": len(per_file), "backends": {}}
+    reference = None
+    ok = True
+    for name, make in backends.items():
+        res = measure(make(), per_file)
+        labels, probs = res.pop("labels"), res.pop("probs")
+        if reference is None:
+            reference = (labels, probs)
+        else:
+            res["agreement"] = round(float(np.mean([a == b for a, b in zip(labels, reference[0])])), 4)
+            res["max_prob_diff"] = round(float(np.abs(probs - reference[1]).max()), 4)
+            ok = ok and res["agreement"] >= args.min_agreement
+        results["backends"][name] = res
+        parity = f"  agreement {res['agreement']:.3f}  max |dp| {res['max_prob_diff']:.4f}" if "agreement" in res else ""
+        print(f"{name:10} p50 {res['latency_p50_ms']:8.2f} ms/segment  {res['segments_per_s']:7.2f} segments/s  "
+              f"{res['audio_s_per_s']:7.2f} audio-s/s{parity}")
+
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {RESULTS_PATH}")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# benchmarks/service_load.py
+"""Load test for service.py: p50/p99 job latency under concurrent submissions.
+
+Starts the service in-process on a free port with the stub Whisper/SER models
+(benchmarks/stubs.py, with simulated model cost), then for each concurrency
+level runs that many client threads, each submitting a synthetic session and
+waiting for its result, until --requests jobs are done. Each level is run with
+SER micro-batching on (SERVICE_BATCH_WAIT_MS) and off (one job per SER pass).
+
+Usage:
+    python benchmarks/service_load.py [--concurrency 1 4 16] [--requests 48] [--seconds 60]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results", "service_load.json")
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+import metrics
+import service
+from config import SERVICE_BATCH_WAIT_MS, SERVICE_MAX_BATCH_JOBS
+from benchmarks.stubs import stubbed_models
+from benchmarks.synthetic import make_corpus
+
+@contextlib.contextmanager
+def running_service(batch_wait: float, max_batch_jobs: int):
+    """Service on 127.0.0.1:<free port> in a background event loop; yields the port."""
+    loop = asyncio.new_event_loop()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        svc = service.load_service(use_cache=False, batch_wait=batch_wait, max_batch_jobs=max_batch_jobs)
+    server = loop.run_until_complete(svc.start("127.0.0.1", 0))
+    port = server.sockets[0].getsockname()[1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        yield port
+    finally:
+        server.close()
+        asyncio.run_coroutine_threadsafe(svc.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+def load(files: List[str], port: int, concurrency: int, requests: int) -> Dict[str, Any]:
+    addr = {"host": "127.0.0.1", "port": port}
+
+    def one(i: int) -> float:
+        t0 = time.perf_counter()
+        job = service.wait(service.submit(files[i % len(files)], **addr), **addr)
+        if job["status"] != "done":
+            raise RuntimeError(job["error"])
+        return time.perf_counter() - t0
+
+    metrics.reset()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - t0
+    counters = metrics.drain()["counters"]
+    return {"p50_s": round(float(np.percentile(latencies, 50)), 4), "p99_s": round(float(np.percentile(latencies, 99)), 4),
+            "jobs_per_s": round(requests / wall, 3), "wall_s": round(wall, 3),
+            "jobs_per_ser_pass": round(counters.get("ser_batch_jobs", 0) / max(counters.get("ser_batches", 1), 1), 2)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=48, help="jobs per concurrency level")
+    parser.add_argument("--files", type=int, default=8, help="distinct synthetic sessions")
+    parser.add_argument("--seconds", type=float, default=60.0, help="length of each session")
+    parser.add_argument("--whisper-rtf", type=float, default=0.005, help="simulated Whisper cost per audio second")
+    parser.add_argument("--ser-overhead", type=float, default=0.2, help="simulated fixed cost per SER forward pass")
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {"requests": args.requests, "seconds": args.seconds, "whisper_rtf": args.whisper_rtf,
+                               "ser_overhead": args.ser_overhead, "modes": {}}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp, stubbed_models(whisper_rtf=args.whisper_rtf, ser_overhead=args.ser_overhead):
+        os.chdir(tmp)
+        try:
+            files = make_corpus(os.path.join(tmp, "audio"), max(args.files // 5, 1), args.seconds)[:args.files]
+            modes = {"batched": (SERVICE_BATCH_WAIT_MS / 1000, SERVICE_MAX_BATCH_JOBS), "unbatched": (0.0, 1)}
+            for mode, (batch_wait, max_jobs) in modes.items():
+                with running_service(batch_wait, max_jobs) as port:
+                    load(files, port, 1, len(files))  # warm-up: decode cache, first-call costs
+                    for concurrency in args.concurrency:
+                        res = load(files, port, concurrency, args.requests)
+                        results["modes"].setdefault(mode, {})[str(concurrency)] = res
+                        print(f"{mode:9} concurrency {concurrency:3}  p50 {res['p50_s']:7.3f}s  p99 {res['p99_s']:7.3f}s  "
+                              f"{res['jobs_per_s']:6.2f} jobs/s  {res['jobs_per_ser_pass']:5.2f} jobs per SER pass")
+        finally:
+            os.chdir(cwd)
+
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {RESULTS_PATH}")
+
+if __name__ == "__main__":
+    main()
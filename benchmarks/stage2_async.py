@@ -0,0 +1,71 @@
+# benchmarks/stage2_async.py
+"""Stage 2 throughput: sequential run_all vs arun_all at several concurrency limits.
+
+Uses fake_llm.FakeTruthLLM (fixed latency, no API key) and the sessions from
+fake_llm.synthetic_inputs, in a temporary directory so the real outputs/ are
+untouched. With a latency of L seconds and N shadows the sequential run takes
+about N*L; the async run should approach ceil(N / concurrency) * L as long as
+the rate limit allows it.
+
+Usage:
+    python benchmarks/stage2_async.py [--shadows 12] [--latency 0.5] [--concurrency 1 4 8]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results", "stage2_async.json")
+sys.path.insert(0, ROOT)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shadows", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake LLM latency per call (s)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--rps", type=float, default=100.0, help="rate limit for the async runs")
+    args = parser.parse_args()
+
+    import stage_2
+    from fake_llm import FakeTruthLLM, synthetic_inputs
+
+    sessions, transcripts, shadows = synthetic_inputs(args.shadows)
+    results = {"shadows": args.shadows, "latency": args.latency, "rps": args.rps, "runs": []}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            runs = [("sequential", None)] + [("async", c) for c in args.concurrency]
+            for mode, concurrency in runs:
+                llm = FakeTruthLLM(latency=args.latency)
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    t0 = time.perf_counter()
+                    if mode == "sequential":
+                        out = stage_2.run_all(sessions, transcripts, llm=llm, shadows=shadows,
+                                              use_cache=False, use_checkpoints=False)
+                    else:
+                        out = asyncio.run(stage_2.arun_all(sessions, transcripts, llm=llm, shadows=shadows,
+                                                           concurrency=concurrency, requests_per_second=args.rps,
+                                                           use_cache=False, use_checkpoints=False))
+                    wall = time.perf_counter() - t0
+                order_ok = [r["shadow_id"] for r in out] == shadows
+                run = {"mode": mode, "concurrency": concurrency, "wall_s": round(wall, 3),
+                       "shadows_per_s": round(len(out) / wall, 2), "llm_calls": llm.calls, "ordered": order_ok}
+                results["runs"].append(run)
+                print(f"{mode:10} concurrency={str(concurrency or 1):>3}  {wall:7.2f}s  "
+                      f"{run['shadows_per_s']:6.2f} shadows/s  ordered={order_ok}")
+        finally:
+            os.chdir(cwd)
+
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {RESULTS_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/startup.py
+"""Import-time budget check for the pipeline's entry modules.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter for each
+module and compares the cumulative import time against BUDGET_MS. Exits with a
+non-zero status when any module is over budget, so it can gate CI.
+
+Usage:
+    python benchmarks/startup.py [--repeat 5]
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+from typing import Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results", "startup.json")
+
+# Cumulative import time budgets in milliseconds. None of these modules may pull in
+# torch, transformers, librosa, langchain or faster_whisper at import time.
+BUDGET_MS: Dict[str, float] = {
+    "config": 20,
+    "metrics": 30,
+    "merge_sessions": 30,
+    "main": 60,
+    "utils_audio": 300,   # numpy
+    "stage_1": 400,       # numpy
+    "stage_2": 600,       # pydantic
+}
+HEAVY = ("torch", "transformers", "librosa", "langchain", "langchain_core", "langgraph", "faster_whisper", "whisper")
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def import_profile(module: str) -> Dict[str, int]:
+    """Cumulative import time (us) of every module imported by `import module`."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+    profile = {}
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            profile[m.group(4)] = int(m.group(2))
+    return profile
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per module; the fastest is reported")
+    args = parser.parse_args()
+
+    results, failed = {}, False
+    print(f"{'module':16} {'import ms':>10} {'budget':>8}  heavy imports")
+    for module, budget in BUDGET_MS.items():
+        try:
+            runs = [import_profile(module) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{module:16} {'error':>10} {budget:8.0f}  {e}")
+            failed = True
+            continue
+        ms = min(r[module] for r in runs) / 1000
+        heavy = sorted({name for name in runs[0] if name.split(".")[0] in HEAVY and "." not in name})
+        over = ms > budget or bool(heavy)
+        failed |= over
+        print(f"{module:16} {ms:10.1f} {budget:8.0f}  {', '.join(heavy) or '-'}{'  <-- over budget' if over else ''}")
+        results[module] = {"import_ms": ms, "budget_ms": budget, "heavy_imports": heavy}
+
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
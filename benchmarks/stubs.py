@@ -0,0 +1,122 @@
+# benchmarks/stubs.py
+"""Stand-ins for Whisper, the SER model and Gemini behind the calls the pipeline makes.
+
+None of them download anything; their output depends only on the audio, so
+timings measure the pipeline around the models (decoding, features, batching,
+I/O, prompt building). `rtf` adds a simulated model cost per audio second and
+`footprint_mb` holds that much resident memory, standing in for the weights.
+"""
+import time
+import contextlib
+from types import SimpleNamespace
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from utils_audio import EmotionClassifier
+
+WORDS = ["i", "worked", "with", "python", "for", "three", "years", "on", "a", "team", "of", "five",
+         "we", "built", "django", "services", "and", "led", "the", "migration", "to", "react"]
+
+def _ballast(mb: float) -> np.ndarray:
+    return np.ones(int(mb * 1024 * 1024 / 8))  # np.ones writes every page, so it is resident
+
+class StubWhisper:
+    """faster-whisper-style model: transcribe(audio, ...) -> (lazy segments, info).
+
+    Segments follow energy: consecutive 0.25 s frames above a threshold form a
+    segment (split at `max_segment` seconds), with ~2.5 words per second of text.
+    """
+
+    def __init__(self, sr: int = 16000, rtf: float = 0.0, threshold: float = 0.01, max_segment: float = 15.0,
+                 footprint_mb: float = 0.0):
+        self.weights = _ballast(footprint_mb)
+        self.sr = sr
+        self.rtf = rtf
+        self.threshold = threshold
+        self.max_segment = max_segment
+
+    def _regions(self, audio: np.ndarray) -> List[Tuple[float, float]]:
+        hop = self.sr // 4
+        n = audio.shape[0] // hop
+        if n == 0:
+            return []
+        frames = np.asarray(audio[:n * hop], dtype=np.float32).reshape(n, hop)
+        voiced = np.sqrt(np.mean(frames ** 2, axis=1)) > self.threshold
+        regions, start = [], None
+        for i, v in enumerate(np.append(voiced, False)):
+            if v and start is None:
+                start = i
+            elif start is not None and (not v or (i - start) * 0.25 >= self.max_segment):
+                regions.append((start * 0.25, i * 0.25))
+                start = i if v else None
+        return regions
+
+    def transcribe(self, audio, language: str = "en", **kwargs):
+        if isinstance(audio, str):
+            from utils_audio import load_audio
+            audio = load_audio(audio, self.sr)
+        regions = self._regions(audio)
+
+        def segments() -> Iterator[SimpleNamespace]:
+            for i, (start, end) in enumerate(regions):
+                if self.rtf:
+                    time.sleep(self.rtf * (end - start))
+                n_words = max(1, int((end - start) * 2.5))
+                text = " ".join(WORDS[(i * 7 + j) % len(WORDS)] for j in range(n_words))
+                yield SimpleNamespace(start=start, end=end, text=" " + text)
+
+        return segments(), SimpleNamespace(language=language, duration=audio.shape[0] / self.sr)
+
+class StubSER(EmotionClassifier):
+    """EmotionClassifier with the same batching; labels come from loudness and zero-crossing rate.
+
+    `overhead` adds a fixed cost per forward pass (kernel launches, feature extractor setup).
+    """
+
+    LABELS = ["neu", "hap", "ang", "sad"]
+
+    def __init__(self, max_batch_seconds: float = 120.0, rtf: float = 0.0, overhead: float = 0.0,
+                 footprint_mb: float = 0.0):
+        self.weights = _ballast(footprint_mb)
+        self.max_batch_seconds = max_batch_seconds
+        self.rtf = rtf
+        self.overhead = overhead
+
+    def predict_batch(self, chunks: List[np.ndarray], sr: int) -> Tuple[List[str], np.ndarray]:
+        labels = ["neutral"] * len(chunks)
+        probs = np.zeros((len(chunks), len(self.LABELS)), dtype=np.float32)
+        for batch in self._batches(chunks, sr):
+            longest = max(chunks[i].size for i in batch)
+            padded = np.zeros((len(batch), longest), dtype=np.float32)
+            for row, i in enumerate(batch):
+                padded[row, :chunks[i].size] = chunks[i]
+            if self.rtf or self.overhead:
+                time.sleep(self.overhead + self.rtf * padded.size / sr)
+            rms = np.sqrt(np.mean(padded ** 2, axis=1))
+            zcr = np.mean(np.abs(np.diff(np.sign(padded), axis=1)) > 0, axis=1)
+            logits = np.stack([np.full_like(rms, 1.0), zcr * 10, rms * 20, 0.5 / (rms * 50 + 0.5)], axis=1)
+            batch_probs = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+            for row, i in enumerate(batch):
+                probs[i] = batch_probs[row]
+                labels[i] = self.LABELS[int(batch_probs[row].argmax())]
+        return labels, probs
+
+@contextlib.contextmanager
+def stubbed_models(whisper_rtf: float = 0.0, ser_rtf: float = 0.0, ser_overhead: float = 0.0,
+                   whisper_mb: float = 0.0, ser_mb: float = 0.0):
+    """Make stage_1 load the stubs (faster-whisper code path) instead of real models."""
+    import config
+    import stage_1
+    saved = (stage_1.load_whisper_model, stage_1.load_emotion_classifier, config.__dict__.get("WHISPER_BACKEND"))
+    stage_1.load_whisper_model = lambda cpu_threads=0, num_workers=1, settings=None: StubWhisper(rtf=whisper_rtf, footprint_mb=whisper_mb)
+    stage_1.load_emotion_classifier = lambda threads=0, settings=None: StubSER(rtf=ser_rtf, overhead=ser_overhead, footprint_mb=ser_mb)
+    config.WHISPER_BACKEND = "faster-whisper"
+    try:
+        yield
+    finally:
+        stage_1.load_whisper_model, stage_1.load_emotion_classifier, backend = saved
+        if backend is None:
+            del config.WHISPER_BACKEND
+        else:
+            config.WHISPER_BACKEND = backend
@@ -0,0 +1,209 @@
+# benchmarks/suite.py
+"""Offline benchmark suite for the whole pipeline.
+
+Generates synthetic sessions (benchmarks/synthetic.py), swaps Whisper, the SER
+model and Gemini for the stand-ins in benchmarks/stubs.py and fake_llm.py,
+and times each stage at several corpus sizes (number of shadows, 5 sessions
+each). Every case reports wall time, peak RSS and, where it applies, the
+real-time factor (wall / audio seconds) and throughput.
+
+Results go to benchmarks/results/suite.json (or --output) together with the
+git commit, so two runs can be compared:
+
+    python benchmarks/suite.py --sizes 1 2 4 --seconds 120
+    python benchmarks/suite.py --output after.json --compare before.json --threshold 0.10
+
+With --compare the script exits non-zero when any case got slower than the
+threshold allows.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results", "suite.json")
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+import config
+from metrics import PeakRSS, Timer
+from benchmarks.stubs import StubSER, StubWhisper, stubbed_models
+from benchmarks.synthetic import SAMPLE_RATE, make_corpus
+
+# ------------- Cases -------------
+# Each case gets the corpus context and returns extra metrics; wall time and
+# peak RSS are measured around it by run_case.
+
+def case_decode(ctx: Dict[str, Any]) -> Dict[str, float]:
+    from utils_audio import load_audio
+    for path in ctx["files"]:
+        load_audio(path, SAMPLE_RATE)
+    return {"audio_s": ctx["audio_s"]}
+
+def _segments(ctx: Dict[str, Any]):
+    whisper = StubWhisper()
+    for audio in ctx["audio"]:
+        segs, _ = whisper.transcribe(audio)
+        yield audio, [(int(s.start * SAMPLE_RATE), int(s.end * SAMPLE_RATE)) for s in segs]
+
+def case_features_per_segment(ctx: Dict[str, Any]) -> Dict[str, float]:
+    from utils_audio import analyze_features
+    n = 0
+    for audio, bounds in _segments(ctx):
+        for a, b in bounds:
+            analyze_features(audio[a:b], SAMPLE_RATE)
+            n += 1
+    return {"audio_s": ctx["audio_s"], "items": n}
+
+def case_features_frame(ctx: Dict[str, Any], pitch_tracker: str = "") -> Dict[str, float]:
+    from utils_audio import FrameFeatures
+    n = 0
+    for audio, bounds in _segments(ctx):
+        features = FrameFeatures(audio, SAMPLE_RATE, pitch_tracker=pitch_tracker or config.PITCH_TRACKER)
+        for a, b in bounds:
+            features.segment(a, b)
+            n += 1
+    return {"audio_s": ctx["audio_s"], "items": n}
+
+def case_features_frame_yin(ctx: Dict[str, Any]) -> Dict[str, float]:
+    return case_features_frame(ctx, "yin")
+
+def case_ser_predict_label(ctx: Dict[str, Any]) -> Dict[str, float]:
+    ser = StubSER()
+    n = 0
+    for audio, bounds in _segments(ctx):
+        for a, b in bounds:
+            ser.predict_label(audio[a:b], SAMPLE_RATE)
+            n += 1
+    return {"audio_s": ctx["audio_s"], "items": n}
+
+def case_ser_predict_batch(ctx: Dict[str, Any]) -> Dict[str, float]:
+    ser = StubSER()
+    n = 0
+    for audio, bounds in _segments(ctx):
+        ser.predict_batch([audio[a:b] for a, b in bounds], SAMPLE_RATE)
+        n += len(bounds)
+    return {"audio_s": ctx["audio_s"], "items": n}
+
+def case_stage_1(ctx: Dict[str, Any]) -> Dict[str, float]:
+    import stage_1
+    with stubbed_models():
+        sessions = stage_1.build(use_cache=False)
+    return {"audio_s": ctx["audio_s"], "items": sum(len(s) for s in sessions.values())}
+
+def case_merge_sessions(ctx: Dict[str, Any]) -> Dict[str, float]:
+    import merge_sessions
+    merge_sessions.merge_sessions()
+    return {"items": len(ctx["files"])}
+
+def case_stage_2(ctx: Dict[str, Any]) -> Dict[str, float]:
+    import stage_2
+    from fake_llm import FakeTruthLLM
+    results = stage_2.run_all(llm=FakeTruthLLM(latency=0.0), use_cache=False, use_checkpoints=False)
+    return {"items": len(results)}
+
+# Order matters: stage_1 produces the outputs merge_sessions and stage_2 read
+CASES: List[Callable[[Dict[str, Any]], Dict[str, float]]] = [
+    case_decode, case_features_per_segment, case_features_frame, case_features_frame_yin, case_ser_predict_label,
+    case_ser_predict_batch, case_stage_1, case_merge_sessions, case_stage_2,
+]
+
+def run_case(case: Callable, ctx: Dict[str, Any], repeat: int) -> Dict[str, float]:
+    best = None
+    for _ in range(repeat):
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            with Timer() as t, PeakRSS() as mem:
+                extra = case(ctx)
+        if best is None or t.elapsed < best["wall_s"]:
+            best = {"wall_s": t.elapsed, "peak_rss_mb": mem.peak_mb, **extra}
+    if best.get("audio_s"):
+        best["rtf"] = best["wall_s"] / best["audio_s"]
+    if best.get("items"):
+        best["items_per_s"] = best["items"] / max(best["wall_s"], 1e-9)
+    return {k: round(v, 4) if isinstance(v, float) else v for k, v in best.items()}
+
+# ------------- Runner -------------
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run_suite(sizes: List[int], seconds: float, repeat: int, only: List[str]) -> Dict[str, Any]:
+    results: Dict[str, Any] = {
+        "commit": git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count(),
+        "seconds_per_session": seconds, "cases": {},
+    }
+    cwd = os.getcwd()
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                files = make_corpus(os.path.join(tmp, "audio"), size, seconds)
+                config.AUDIO_FILES = files
+                from utils_audio import load_audio
+                audio = [np.asarray(load_audio(p, SAMPLE_RATE)) for p in files]
+                ctx = {"files": files, "audio": audio, "audio_s": sum(a.shape[0] for a in audio) / SAMPLE_RATE}
+                for case in CASES:
+                    name = case.__name__[len("case_"):]
+                    if only and name not in only and name not in ("stage_1",):
+                        continue
+                    res = run_case(case, ctx, repeat)
+                    results["cases"].setdefault(name, {})[str(size)] = res
+                    rtf = f"  RTF {res['rtf']:.4f}" if "rtf" in res else ""
+                    print(f"{name:22} shadows={size:<3} {res['wall_s']:8.3f}s  peak {res['peak_rss_mb']:7.0f} MB{rtf}")
+            finally:
+                os.chdir(cwd)
+                config.__dict__.pop("AUDIO_FILES", None)
+    return results
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> bool:
+    """Print wall-time ratios against `baseline`; True if nothing regressed beyond `threshold`."""
+    ok = True
+    print(f"\nvs {baseline.get('commit', '?')} ({baseline.get('timestamp', '?')})")
+    for name, by_size in current["cases"].items():
+        for size, res in by_size.items():
+            old = baseline.get("cases", {}).get(name, {}).get(size)
+            if not old:
+                continue
+            ratio = res["wall_s"] / max(old["wall_s"], 1e-9)
+            flag = "REGRESSION" if ratio > 1 + threshold else ""
+            ok = ok and not flag
+            print(f"{name:22} shadows={size:<3} {old['wall_s']:8.3f}s -> {res['wall_s']:8.3f}s  x{ratio:5.2f}  {flag}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4], help="corpus sizes in shadows")
+    parser.add_argument("--seconds", type=float, default=120.0, help="length of each synthetic session")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case; the fastest is kept")
+    parser.add_argument("--only", nargs="+", default=[], help="case names to run (stage_1 always runs)")
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown for --compare")
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.seconds, args.repeat, args.only)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        sys.exit(0 if compare(results, baseline, args.threshold) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/synthetic.py
+"""Synthetic 16 kHz interview-like recordings for offline benchmarks.
+
+Each session alternates speech-like regions (a pitched harmonic tone with
+syllable-rate amplitude modulation and some noise) with silence, and mixes in
+loud, quiet and noise-only stretches, so VAD-style segmentation, RMS/pitch
+features and the style heuristics all have something to work on.
+"""
+import os
+import wave
+import shutil
+import subprocess
+from typing import List
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+def _speech_like(n: int, sr: int, rng: np.random.Generator) -> np.ndarray:
+    t = np.arange(n) / sr
+    f0 = rng.uniform(95.0, 260.0) * (1 + 0.05 * np.sin(2 * np.pi * rng.uniform(0.2, 0.8) * t))
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    syllables = 0.5 * (1 + np.sin(2 * np.pi * rng.uniform(3.0, 5.0) * t)) ** 2
+    return (voice * syllables + 0.05 * rng.standard_normal(n)).astype(np.float32)
+
+def synth_session(seconds: float, sr: int = SAMPLE_RATE, seed: int = 0) -> np.ndarray:
+    """Mono float32 in [-1, 1] with speech, silence, loud, quiet and noise regions."""
+    rng = np.random.default_rng(seed)
+    total = int(seconds * sr)
+    out = np.zeros(total, dtype=np.float32)
+    pos = 0
+    while pos < total:
+        kind = rng.choice(["speech", "speech", "speech", "silence", "loud", "quiet", "noise"])
+        n = min(int(rng.uniform(0.5, 2.0 if kind == "silence" else 8.0) * sr), total - pos)
+        if kind == "silence":
+            region = 0.001 * rng.standard_normal(n)
+        elif kind == "noise":
+            region = 0.05 * rng.standard_normal(n)
+        else:
+            gain = {"speech": 0.1, "loud": 0.45, "quiet": 0.015}[kind]
+            region = gain * _speech_like(n, sr, rng)
+        out[pos:pos + n] = region
+        pos += n
+    return np.clip(out, -1.0, 1.0)
+
+def write_wav(path: str, audio: np.ndarray, sr: int = SAMPLE_RATE):
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sr)
+        f.writeframes(pcm.tobytes())
+
+def write_mp3(path: str, audio: np.ndarray, sr: int = SAMPLE_RATE) -> bool:
+    """Encode with ffmpeg; returns False (and writes nothing) when ffmpeg is not installed."""
+    if shutil.which("ffmpeg") is None:
+        return False
+    wav_path = path + ".wav"
+    write_wav(wav_path, audio, sr)
+    try:
+        subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-i", wav_path, "-codec:a", "libmp3lame",
+                        "-b:a", "64k", path], check=True)
+    finally:
+        os.remove(wav_path)
+    return True
+
+def make_corpus(out_dir: str, n_shadows: int, seconds: float = 120.0, sessions: int = 5,
+                fmt: str = "wav", seed: int = 0) -> List[str]:
+    """Write <shadowN>_2025_<k>.<fmt> files like audio/ and return their paths (sorted).
+
+    fmt="mp3" falls back to WAV when ffmpeg is missing.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for s in range(n_shadows):
+        for k in range(1, sessions + 1):
+            audio = synth_session(seconds, seed=seed + s * 100 + k)
+            base = os.path.join(out_dir, f"shadow{s:04d}_2025_{k}")
+            if fmt == "mp3" and write_mp3(base + ".mp3", audio):
+                paths.append(base + ".mp3")
+            else:
+                write_wav(base + ".wav", audio)
+                paths.append(base + ".wav")
+    return sorted(paths)
@@ -0,0 +1,79 @@
+# benchmarks/whisper_precision.py
+"""Real-time factor and WER drift of Whisper model/precision choices on audio/.
+
+Usage:
+    python benchmarks/whisper_precision.py --write-reference
+    python benchmarks/whisper_precision.py --configs large-v3:int8 distil-large-v3:int8 small:int8_float32
+
+The reference is a large-v3 (default precision) transcript of every file, stored
+in benchmarks/reference/; WER is measured against it, not against human labels.
+The RTF/WER table is written next to it, and both files are meant to be
+committed together so a precision change can be judged against the numbers it
+was chosen on. The SER side of SER_QUANTIZE is checked by benchmarks/ser_onnx.py.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import stage_1
+import config
+import evaluate
+from config import SAMPLE_RATE, AUDIO_CACHE_DIR
+from utils_audio import load_audio
+
+REFERENCE_PATH = os.path.join("benchmarks", "reference", "large-v3.json")
+RESULTS_PATH = os.path.join("benchmarks", "reference", "whisper_precision.json")
+DEFAULT_CONFIGS = ["large-v3:default", "large-v3:int8", "large-v3:int8_float32",
+                   "distil-large-v3:int8", "medium:int8", "small:int8"]
+
+def run_config(model: str, compute_type: str) -> Dict:
+    settings = stage_1.resolve_settings({"WHISPER_MODEL": model, "WHISPER_COMPUTE_TYPE": compute_type})
+    whisper_model = stage_1.load_whisper_model(settings=settings)
+    texts, audio_s, wall_s = {}, 0.0, 0.0
+    for audio_path in config.AUDIO_FILES:
+        audio = load_audio(audio_path, SAMPLE_RATE, AUDIO_CACHE_DIR)
+        t0 = time.perf_counter()
+        texts[stage_1.session_name(audio_path)] = stage_1.transcribe(whisper_model, audio)["text"]
+        wall_s += time.perf_counter() - t0
+        audio_s += audio.shape[0] / SAMPLE_RATE
+    return {"texts": texts, "audio_seconds": audio_s, "wall_seconds": wall_s, "rtf": wall_s / max(audio_s, 1e-9)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--configs", nargs="+", default=DEFAULT_CONFIGS, help="model:compute_type pairs")
+    parser.add_argument("--write-reference", action="store_true", help="(re)create the large-v3 reference transcripts")
+    args = parser.parse_args()
+
+    if args.write_reference:
+        ref = run_config("large-v3", "default")
+        os.makedirs(os.path.dirname(REFERENCE_PATH), exist_ok=True)
+        with open(REFERENCE_PATH, "w", encoding="utf-8") as f:
+            json.dump(ref["texts"], f, ensure_ascii=False, indent=2)
+        print(f"Wrote reference for {len(ref['texts'])} files to {REFERENCE_PATH}")
+    with open(REFERENCE_PATH, "r", encoding="utf-8") as f:
+        reference = json.load(f)
+
+    results = []
+    print(f"{'config':32} {'RTF':>7} {'WER drift':>10}")
+    for cfg in args.configs:
+        model, _, compute_type = cfg.partition(":")
+        run = run_config(model, compute_type or "default")
+        wer = evaluate.score(reference, run["texts"])["summary"]["wer"]
+        print(f"{cfg:32} {run['rtf']:7.3f} {wer:10.2%}")
+        results.append({"config": cfg, "rtf": run["rtf"], "wer_vs_reference": wer,
+                        "audio_seconds": run["audio_seconds"], "wall_seconds": run["wall_seconds"]})
+
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {RESULTS_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+# claims.py
+"""Rule- and lexicon-based claims from a shadow's clean session transcripts.
+
+Each session is split into sentences and searched for:
+  - years/months of experience ("6 years", "around three years", "5+ years")
+  - team size ("a team of five", "a 4-person team")
+  - leadership statements ("I led ...", "tech lead") and their opposites
+    ("I work alone", "individual contributor")
+  - languages and frameworks, reported as "Language (Framework)"
+  - skill keywords from a fixed lexicon
+
+Numeric claims are compared across sessions: two values at least
+CONTRADICTION_RATIO apart are a conflict ("6 years" vs "2 years"); closer ones
+are refinements, as the Stage 2 prompt asks. The result is a fact sheet that
+can stand in for the raw transcripts in the prompt, and, when every field is
+backed by several sessions without conflicts, a TruthWeaverOutput that needs
+no LLM call at all (fast_path_truth).
+"""
+import re
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# ------------- Lexicons -------------
+
+LANGUAGES = {"python": "Python", "java": "Java", "javascript": "JavaScript", "typescript": "TypeScript",
+             "golang": "Go", "rust": "Rust", "c++": "C++", "cpp": "C++", "c#": "C#", "csharp": "C#",
+             "ruby": "Ruby", "php": "PHP", "kotlin": "Kotlin", "swift": "Swift", "scala": "Scala",
+             "sql": "SQL", "dart": "Dart", "elixir": "Elixir"}
+# framework -> (display name, parent language)
+FRAMEWORKS = {"django": ("Django", "Python"), "flask": ("Flask", "Python"), "fastapi": ("FastAPI", "Python"),
+              "pandas": ("Pandas", "Python"), "pytorch": ("PyTorch", "Python"), "tensorflow": ("TensorFlow", "Python"),
+              "react": ("React", "JavaScript"), "angular": ("Angular", "JavaScript"), "vue": ("Vue", "JavaScript"),
+              "node": ("Node.js", "JavaScript"), "node.js": ("Node.js", "JavaScript"), "nodejs": ("Node.js", "JavaScript"),
+              "express": ("Express", "JavaScript"), "next.js": ("Next.js", "JavaScript"),
+              "spring boot": ("SpringBoot", "Java"), "springboot": ("SpringBoot", "Java"), "spring": ("Spring", "Java"),
+              "hibernate": ("Hibernate", "Java"), "rails": ("Rails", "Ruby"), "laravel": ("Laravel", "PHP"),
+              ".net": (".NET", "C#"), "asp.net": ("ASP.NET", "C#"), "flutter": ("Flutter", "Dart"),
+              "phoenix": ("Phoenix", "Elixir")}
+# Also everyday words ("last spring", "rails", "react to"): these only count when capitalised
+AMBIGUOUS = {"spring", "rails", "flask", "express", "node", "react", "vue", "phoenix", "swift", "rust", "ruby",
+             "dart", "angular"}
+KEYWORDS = ["machine learning", "deep learning", "data science", "distributed systems", "microservices", "kafka",
+            "redis", "docker", "kubernetes", "aws", "gcp", "azure", "cloud migration", "ci/cd", "devops",
+            "system design", "system architecture", "api design", "rest api", "graphql", "postgresql", "mysql",
+            "mongodb", "fault tolerance", "idempotency", "service discovery", "testing", "debugging",
+            "computer vision", "nlp", "frontend", "backend", "full stack", "mentorship", "agile", "scrum"]
+
+# No bare "a"/"an": "a year at a bank" is not a claim of one year of experience
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+                "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+                "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19, "twenty": 20,
+                "a couple of": 2, "a couple": 2, "a dozen": 12, "a single": 1}
+
+# Two numeric claims this far apart contradict each other; closer ones are refinements
+CONTRADICTION_RATIO = 2.0
+
+# Bump when a change to the rules or lexicons can change a fact sheet; Stage 2 checkpoints key on it
+RULES_VERSION = 2
+
+# ------------- Patterns -------------
+
+def _alternation(terms) -> str:
+    # Longest first, so "javascript" wins over "java" and "spring boot" over "spring"
+    return "|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True))
+
+_NUM = rf"(?:\d+(?:\.\d+)?|{_alternation(NUMBER_WORDS)})"
+_HEDGE = r"(?:around|about|maybe|roughly|almost|nearly|approximately|probably|like|over|more than|less than)"
+_EXPERIENCE = re.compile(rf"(?P<hedge>\b{_HEDGE}\s+)?\b(?P<num>{_NUM})(?P<plus>\s*\+|\s+plus)?\s+(?P<unit>years?|months?)\b"
+                         r"(?!\s+(?:ago|old|later|back))")
+_EXPERIENCE_CONTEXT = re.compile(r"\b(experience|coding|programming|developer|engineer|engineering|working|worked|"
+                                 r"been|code|software|professionally|using|writing|built|building|mastered|learning|"
+                                 r"learned|debugging|experienced)\b")
+_TEAM = re.compile(rf"\bteam of (?P<num>{_NUM})\b|\b(?P<num2>{_NUM})[- ](?:person|member|people|engineer|developer)s?"
+                   r"(?:\s+team)?\b")
+_LEAD = re.compile(r"\bi\b.*\b(led|lead|leading|managed|manage|managing|mentored|mentoring|supervised|headed)\b|"
+                   r"^(led|managed|headed)\b|\b(led|managed|headed) (?:a|the|our|my) team\b|"
+                   r"\b(tech lead|team lead|engineering manager|lead engineer|lead developer)\b")
+_SOLO = re.compile(r"\b(never (?:led|lead|managed)|not (?:a|the) (?:lead|manager)|work(?:ed|ing)? alone|by myself|"
+                   r"on my own|individual contributor|solo|nobody reporting|no one reporting|"
+                   r"never been comfortable with (?:\.\.\. )?(?:with )?people)\b")
+_TECH = re.compile(rf"(?<![\w+#.])({_alternation(list(LANGUAGES) + list(FRAMEWORKS))})(?![\w+#])")
+_KEYWORD = re.compile(rf"\b({_alternation(KEYWORDS)})\b")
+
+def _number(text: str) -> Optional[float]:
+    text = text.strip()
+    if text in NUMBER_WORDS:
+        return float(NUMBER_WORDS[text])
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+def sentences(text: str) -> List[str]:
+    parts = re.split(r"(?<=[.!?])\s+|\s*\.\.\.+\s*|\s*\*[^*]*\*\s*", text)
+    return [p.strip() for p in parts if p and p.strip()]
+
+def _clip(sentence: str, limit: int = 120) -> str:
+    return sentence if len(sentence) <= limit else sentence[:limit - 3].rstrip() + "..."
+
+# ------------- Per-session extraction -------------
+
+def extract_session(text: str) -> Dict[str, Any]:
+    """Claims made in one clean transcript."""
+    facts: Dict[str, Any] = {"experience": [], "team_size": [], "lead": [], "solo": [],
+                             "languages": {}, "frameworks": {}, "keywords": []}
+    for sentence in sentences(text):
+        low = sentence.lower()
+        # Durations only count as experience next to work words or a technology ("Python for 6 years")
+        if _EXPERIENCE_CONTEXT.search(low) or _TECH.search(low):
+            for m in _EXPERIENCE.finditer(low):
+                value = _number(m.group("num"))
+                if value is None:
+                    continue
+                years = value / 12 if m.group("unit").startswith("month") else value
+                facts["experience"].append({"years": years, "approx": bool(m.group("hedge")),
+                                            "plus": bool(m.group("plus")), "claim": m.group(0).strip(),
+                                            "sentence": _clip(sentence)})
+        for m in _TEAM.finditer(low):
+            value = _number(m.group("num") or m.group("num2"))
+            if value and value > 1:
+                facts["team_size"].append({"size": int(value), "claim": m.group(0).strip(), "sentence": _clip(sentence)})
+        if _SOLO.search(low):
+            facts["solo"].append(_clip(sentence))
+        elif _LEAD.search(low) and not re.search(r"\b(never|not|didn't|don't|haven't)\b", low):
+            facts["lead"].append(_clip(sentence))
+        for m in _TECH.finditer(low):
+            term = m.group(1)
+            if term in AMBIGUOUS and not sentence[m.start(1):m.start(1) + 1].isupper():
+                continue
+            if term in FRAMEWORKS:
+                name, parent = FRAMEWORKS[term]
+                facts["frameworks"][name] = facts["frameworks"].get(name, 0) + 1
+                facts["languages"][parent] = facts["languages"].get(parent, 0) + 1
+            else:
+                name = LANGUAGES[term]
+                facts["languages"][name] = facts["languages"].get(name, 0) + 1
+        for m in _KEYWORD.finditer(low):
+            if m.group(1) not in facts["keywords"]:
+                facts["keywords"].append(m.group(1))
+    return facts
+
+# ------------- Cross-session fact sheet -------------
+
+def _format_years(years: float, plus: bool = False) -> str:
+    if years < 1:
+        months = max(int(round(years * 12)), 1)
+        return f"{months} month{'s' if months != 1 else ''}"
+    value = f"{years:g}" if years == int(years) else f"{years:.1f}"
+    return f"{value}{'+' if plus else ''} year{'s' if years != 1 or plus else ''}"
+
+def _numeric_conflict(claims: List[Tuple[str, float, str]], lie_type: str) -> Optional[Dict[str, Any]]:
+    """claims: (session, value, claim text). The widest pair, if it is CONTRADICTION_RATIO apart."""
+    if len(claims) < 2:
+        return None
+    low = min(claims, key=lambda c: c[1])
+    high = max(claims, key=lambda c: c[1])
+    if low[1] <= 0 or high[1] / low[1] < CONTRADICTION_RATIO:
+        return None
+    return {"lie_type": lie_type, "contradictory_claims": [high[2], low[2]], "sessions": [high[0], low[0]]}
+
+def _language_field(per_session: Dict[str, Dict[str, Any]]) -> Tuple[str, int, bool]:
+    """("Language (Framework)", sessions backing it, unambiguous)."""
+    support: Dict[str, int] = {}
+    mentions: Dict[str, int] = {}
+    frameworks: Dict[str, int] = {}
+    for facts in per_session.values():
+        for lang, n in facts["languages"].items():
+            support[lang] = support.get(lang, 0) + 1
+            mentions[lang] = mentions.get(lang, 0) + n
+        for fw, n in facts["frameworks"].items():
+            frameworks[fw] = frameworks.get(fw, 0) + n
+    if not support:
+        return "", 0, False
+    ranked = sorted(support, key=lambda lang: (-support[lang], -mentions[lang], lang))
+    primary = ranked[0]
+    unambiguous = len(ranked) == 1 or support[ranked[1]] < support[primary]
+    own = [fw for fw in frameworks if any(FRAMEWORKS[k] == (fw, primary) for k in FRAMEWORKS)]
+    if own:
+        top = max(own, key=lambda fw: (frameworks[fw], fw))
+        return f"{primary} ({top})", support[primary], unambiguous
+    return primary, support[primary], unambiguous
+
+def fact_sheet(shadow_id: str, transcripts: Dict[str, str]) -> Dict[str, Any]:
+    """Per-session claims, the conflicts between sessions and a proposed answer with its confidence.
+
+    `transcripts` maps session number ("1".."5") to clean text.
+    """
+    per_session = {n: extract_session(text) for n, text in sorted(transcripts.items()) if text.strip()}
+
+    experience = [(n, e["years"], e["claim"]) for n, f in per_session.items() for e in f["experience"]]
+    team = [(n, float(t["size"]), t["claim"]) for n, f in per_session.items() for t in f["team_size"]]
+    conflicts = [c for c in (_numeric_conflict(experience, "experience_inflation"),
+                             _numeric_conflict(team, "team_size_inconsistency")) if c]
+    lead_sessions = [n for n, f in per_session.items() if f["lead"]]
+    solo_sessions = [n for n, f in per_session.items() if f["solo"]]
+    if lead_sessions and solo_sessions:
+        conflicts.append({"lie_type": "leadership_fabrication",
+                          "contradictory_claims": [per_session[lead_sessions[0]]["lead"][0],
+                                                   per_session[solo_sessions[0]]["solo"][0]],
+                          "sessions": [lead_sessions[0], solo_sessions[0]]})
+
+    # Later sessions are taken as more truthful, as in the prompt
+    exp_sessions = sorted({n for n, _, _ in experience})
+    latest = per_session[exp_sessions[-1]]["experience"] if exp_sessions else []
+    experience_value = _format_years(latest[-1]["years"], latest[-1]["plus"]) if latest else ""
+    language, language_support, unambiguous = _language_field(per_session)
+    team_sizes = sorted({int(v) for _, v, _ in team})
+    team_sessions = sorted({n for n, _, _ in team} | set(lead_sessions) | set(solo_sessions))
+
+    def backing(n_sessions: int) -> float:
+        return min(n_sessions / 2, 1.0)  # two independent sessions count as fully backed
+
+    components = [len(per_session) / 5, backing(len(exp_sessions)),
+                  backing(language_support) * (1.0 if unambiguous else 0.5), backing(len(team_sessions))]
+    confidence = 0.0 if conflicts else sum(components) / len(components)
+
+    keywords: Dict[str, int] = {}
+    for facts in per_session.values():
+        for kw in list(facts["frameworks"]) + facts["keywords"]:
+            keywords[kw] = keywords.get(kw, 0) + 1
+    return {
+        "shadow_id": shadow_id,
+        "sessions": per_session,
+        "conflicts": conflicts,
+        "proposed": {
+            "experience": experience_value,
+            "experience_years": latest[-1]["years"] if latest else None,
+            "language": language,
+            "team_sizes": team_sizes,
+            "lead": bool(lead_sessions),
+            "solo": bool(solo_sessions),
+            "keywords": sorted(keywords, key=lambda k: (-keywords[k], k)),
+        },
+        "confidence": round(confidence, 3),
+    }
+
+# ------------- Outputs -------------
+
+def _skill_mastery(years: Optional[float]) -> str:
+    if years is None:
+        return "unknown"
+    if years < 1:
+        return "beginner"
+    if years < 3:
+        return "intermediate"
+    if years < 6:
+        return "advanced"
+    return "expert"
+
+def fast_path_truth(sheet: Dict[str, Any], min_confidence: float) -> Optional[Dict[str, Any]]:
+    """A TruthWeaverOutput dict for a consistent shadow whose facts are backed well enough, else None."""
+    if sheet["conflicts"] or sheet["confidence"] < min_confidence:
+        return None
+    p = sheet["proposed"]
+    if not p["experience"] or not p["language"]:
+        return None
+    team = f"team of {p['team_sizes'][-1]}" if p["team_sizes"] else ""
+    if p["lead"]:
+        leadership = f"led a {team}" if team else "leads and mentors others"
+        team_experience = f"collaborative, {team}" if team else "works in and leads teams"
+    elif p["solo"]:
+        leadership = "none"
+        team_experience = "individual contributor"
+    else:
+        leadership = "none claimed"
+        team_experience = team or "not stated"
+    return {
+        "shadow_id": sheet["shadow_id"],
+        "revealed_truth": {
+            "programming_experience": p["experience"],
+            "programming_language": p["language"],
+            "skill_mastery": _skill_mastery(p["experience_years"]),
+            "leadership_claims": leadership,
+            "team_experience": team_experience,
+            "skills and other keywords": p["keywords"],
+        },
+        "deception_patterns": [],
+    }
+
+def render_fact_sheet(sheet: Dict[str, Any]) -> str:
+    """Compact JSON of the claims, with the sentence each came from, for the LLM prompt."""
+    sessions = {}
+    for n, f in sheet["sessions"].items():
+        row = {
+            "experience": [e["sentence"] for e in f["experience"]],
+            "team": [t["sentence"] for t in f["team_size"]],
+            "lead": f["lead"], "solo": f["solo"],
+            "tech": sorted(f["frameworks"]) + [lang for lang in sorted(f["languages"])],
+            "keywords": f["keywords"],
+        }
+        sessions[n] = {k: v for k, v in row.items() if v}
+    payload = {"sessions": sessions, "conflicts": [{k: c[k] for k in ("lie_type", "contradictory_claims", "sessions")}
+                                                   for c in sheet["conflicts"]]}
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
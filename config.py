@@ -1,32 +1,136 @@
 # config.py
+# Importing this module has no side effects: WHISPER_BACKEND and AUDIO_FILES are
+# computed on first access (see __getattr__ at the bottom). Read them as
+# `config.WHISPER_BACKEND` at the point of use to keep imports cheap.
 import os
 import glob
-import torch
 
-if torch.cuda.is_available():
-    # Use the standard OpenAI backend when a CUDA-enabled GPU is found
-    WHISPER_BACKEND = "openai-whisper"
-    print("✅ GPU detected. Using 'openai-whisper' backend.")
-else:
-    # Fall back to faster-whisper for more efficient CPU processing
-    WHISPER_BACKEND = "faster-whisper"
-    print("⚠️ No GPU detected. Falling back to 'faster-whisper' for CPU.")
+def _detect_whisper_backend() -> str:
+    import torch
+    if torch.cuda.is_available():
+        # Use the standard OpenAI backend when a CUDA-enabled GPU is found
+        print("✅ GPU detected. Using 'openai-whisper' backend.")
+        return "openai-whisper"
+    else:
+        # Fall back to faster-whisper for more efficient CPU processing
+        print("⚠️ No GPU detected. Falling back to 'faster-whisper' for CPU.")
+        return "faster-whisper"
 
-WHISPER_MODEL = "large-v3"
+def _discover_audio_files():
+    files = [f for ext in AUDIO_EXTENSIONS for f in glob.glob(os.path.join(AUDIO_DIR, "*" + ext))]
+    return sorted(f.replace("\\", "/") for f in files)
+
+WHISPER_MODEL = "large-v3"  # or "distil-large-v3", "medium", "small", "turbo", ...
+# faster-whisper/CTranslate2 precision: "default", "int8", "int8_float32", "float16", ...
+WHISPER_COMPUTE_TYPE = "default"
+
+# Chunked transcription (stage_1.py --chunked): split at VAD silences into ~target-length
+# chunks and decode CHUNK_WORKERS of them concurrently
+CHUNK_TARGET_SECONDS = 120.0
+CHUNK_WORKERS = 2
 
 AUDIO_DIR = "audio"
-AUDIO_FILES = [f.replace("\\", "/") for f in glob.glob(os.path.join(AUDIO_DIR, "*.mp3"))]
+AUDIO_EXTENSIONS = (".mp3",)
+SAMPLE_RATE = 16000
+# Decoded PCM is cached here as .npy keyed by file hash; set to None to always decode
+AUDIO_CACHE_DIR = ".audio_cache"
+# Per-file Stage 1 results keyed by audio hash + model/threshold settings; set to None to disable
+STAGE1_CACHE_DIR = ".stage1_cache"
 
 OUTPUT_DIR = "outputs"
+# One store with every clean transcript + a manifest of shadow -> session -> byte range (written by Stage 1)
+# The store is written as transcripts.<content hash>.txt; the manifest names it
+TRANSCRIPT_STORE = os.path.join(OUTPUT_DIR, "transcripts.txt")
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, "manifest.json")
+# Columnar segment store, one partition per session: "arrow" (memory-mapped IPC) or "parquet"
+SEGMENT_STORE_DIR = os.path.join(OUTPUT_DIR, "segments")
+SEGMENT_STORE_FORMAT = "arrow"
+# outputs/session_segments.csv is only written when enabled
+EXPORT_CSV = False
 FINAL_OUTPUT_DIR = "final_outputs"
 TRUTH_JSON_OUTPUT = "truth_json_output"
 SER_MODEL_ID = "superb/hubert-large-superb-er"
-TEMP_DIRECTORIES = ["atlas", "oceanus", "rhea", "selene", "titan", "hyperion", "eos","crius"]
+# Max padded audio (batch size x longest segment) per SER forward pass; bounds peak memory
+SER_MAX_BATCH_SECONDS = 120.0
+# Dynamic int8 quantization of the SER model's Linear layers (CPU speed-up)
+SER_QUANTIZE = False
+# SER runtime: "torch" (eager PyTorch) or "onnx" (onnxruntime; the model is exported once to
+# SER_ONNX_DIR, and SER_QUANTIZE selects an int8 copy of the export)
+SER_BACKEND = "torch"
+SER_ONNX_DIR = ".ser_onnx"
+
+# Stage 1 memory budget in MB (None: no limit). Under a budget Stage 1 decodes to memory-mapped
+# PCM first, then either keeps Whisper and SER loaded together or, if only one fits, transcribes
+# every file, unloads Whisper and annotates every file (see residency.py). e.g. 7000 on an 8 GB machine
+MEMORY_BUDGET_MB = None
+# "auto" picks by budget; "resident" or "two-phase" forces a schedule
+RESIDENCY_SCHEDULE = "auto"
+# Measured model footprints in MB, e.g. {"whisper": 1800, "ser": 1300}; replaces the estimates
+MODEL_FOOTPRINT_MB = {}
+# Estimated-token budget for one shadow's annotation payload in the Stage 2 prompt
+PROMPT_TOKEN_BUDGET = 1500
+# Rule-based claim extraction before the LLM (claims.py). A shadow whose claims agree across sessions and
+# are backed well enough (confidence >= CLAIMS_MIN_CONFIDENCE) is answered without calling the LLM.
+# Off by default: the answer is then the rules' output, checked only against tests/data/claims_samples.json
+CLAIMS_FAST_PATH = False
+CLAIMS_MIN_CONFIDENCE = 0.8
+# Send the extracted fact sheet instead of the five clean transcripts: a much smaller prompt, but the
+# model then only sees the claims the rules found
+CLAIMS_FACT_SHEET = False
+# Stage 2 LLM calls: shadows in flight (--async), token-bucket rate, retries on 429/5xx
+LLM_CONCURRENCY = 4
+LLM_REQUESTS_PER_SECOND = 1.0
+LLM_MAX_RETRIES = 5
+LLM_BACKOFF_SECONDS = 1.0
+# Invalid JSON answers get up to this many cheap repair calls (error + bad JSON only)
+LLM_REPAIR_ATTEMPTS = 2
+LLM_JSON_MODE = True
+# Validated Stage 2 answers keyed by prompt + model hash (python stage_2.py --no-cache to bypass)
+LLM_CACHE_PATH = os.path.join(".llm_cache", "responses.sqlite")
+LLM_CACHE_TTL_SECONDS = 30 * 24 * 3600
+LLM_CACHE_MAX_ENTRIES = 1000
+# LangGraph checkpoints of each shadow's run; a restarted Stage 2 resumes instead of starting over
+STAGE2_CHECKPOINT_PATH = os.path.join(".llm_cache", "checkpoints.sqlite")
+
+# Warm-model service (python service.py serve): HTTP on SERVICE_HOST:SERVICE_PORT, or a Unix
+# socket when SERVICE_SOCKET is set. Jobs that arrive within SERVICE_BATCH_WAIT_MS of each other
+# share SER forward passes (up to SERVICE_MAX_BATCH_JOBS files per batch)
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_SOCKET = ""
+SERVICE_WHISPER_WORKERS = 2
+SERVICE_BATCH_WAIT_MS = 50
+SERVICE_MAX_BATCH_JOBS = 8
+SERVICE_MAX_FINISHED_JOBS = 1000
+
+# Watch daemon (python watch.py): rescan audio/ every WATCH_POLL_SECONDS (inotify events wake it
+# sooner when watchdog is installed); a file is processed once its size and mtime have not
+# changed for WATCH_SETTLE_SECONDS, so half-copied recordings are never picked up
+WATCH_POLL_SECONDS = 5.0
+WATCH_SETTLE_SECONDS = 10.0
+
+# Span timings and counters of each stage go to METRICS_DIR/<stage>.prom (Prometheus textfile
+# format); TRACE_EVENTS also writes <stage>.trace.json for chrome://tracing / Perfetto
+METRICS_DIR = os.path.join(OUTPUT_DIR, "metrics")
+TRACE_EVENTS = False
+# Per-stage profiler: "" (off), "cprofile" (METRICS_DIR/<stage>.prof) or "py-spy" (<stage>.svg, needs py-spy)
+PROFILER = ""
+
+# "piptrack" matches the historical rms/pitch fields; "yin" measures F0 over voiced frames instead
+# (a different pitch value, and slower on the frame grid: see features_frame_yin in benchmarks/suite.py)
+PITCH_TRACKER = "piptrack"
 
 # Heuristic thresholds
 RMS_WHISPER = 0.5
 RMS_STATIC = 0.2
 RMS_SHOUT = 1.5
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-os.makedirs(TRUTH_JSON_OUTPUT, exist_ok=True)
+_LAZY = {"WHISPER_BACKEND": _detect_whisper_backend, "AUDIO_FILES": _discover_audio_files}
+
+def __getattr__(name):
+    if name in _LAZY:
+        value = _LAZY[name]()
+        globals()[name] = value  # evaluated once, then a plain module attribute
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
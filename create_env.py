@@ -3,7 +3,11 @@ LANGCHAIN_API_KEY="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"
 LANGCHAIN_PROJECT="eightfold_ai"
 """
 
-with open('.env', 'w') as f:
-    f.write(env_content)
+def create_env():
+    with open('.env', 'w') as f:
+        f.write(env_content)
 
-print("✓ .env file created successfully")
\ No newline at end of file
+    print("✓ .env file created successfully")
+
+if __name__ == "__main__":
+    create_env()
@@ -0,0 +1,242 @@
+# evaluate.py
+"""Score Stage 1 transcripts against references: WER, CER and per-session alignments.
+
+    python evaluate.py REF HYP [HYP ...]      # each an outputs/ dir or a transcribed.txt
+    python evaluate.py refs/ outputs/ --json report.json --alignments
+
+Edit distances use the bit-parallel Levenshtein algorithm of Myers/Hyyrö: the
+shorter sequence is packed into one Python int per symbol, so each symbol of
+the other sequence costs a handful of big-int operations instead of a DP row.
+Alignments (substitutions, deletions, insertions) run a numpy DP restricted to
+the diagonal band the known distance allows. Sessions are scored in parallel
+worker processes.
+
+The report pairs each run's accuracy with its real-time factor, taken from the
+run's metrics/stage_1.prom (audio seconds processed / stage wall time).
+"""
+import os
+import re
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# ------------- Edit distance -------------
+
+def normalize_words(text: str) -> List[str]:
+    """Lower-cased words without punctuation."""
+    return [w for w in (re.sub(r"[^\w']", "", w).lower() for w in text.split()) if w]
+
+def normalize_chars(text: str) -> str:
+    return " ".join(normalize_words(text))
+
+def levenshtein(a: Sequence, b: Sequence) -> int:
+    """Edit distance between two sequences of hashable symbols (bit-parallel, Hyyrö 2001)."""
+    if len(a) < len(b):
+        a, b = b, a
+    m = len(b)
+    if m == 0:
+        return len(a)
+    # b is the pattern: bit i of peq[c] is set where b[i] == c
+    peq: Dict[Any, int] = {}
+    for i, c in enumerate(b):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    for c in a:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = (ph << 1) | 1  # row 0 of the DP grows by one per column
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+    return score
+
+_DIAG, _UP, _LEFT = 0, 1, 2
+
+def align(ref: Sequence, hyp: Sequence, distance: Optional[int] = None) -> List[Tuple[str, int, int]]:
+    """Optimal alignment as (op, ref index, hyp index) with op "=", "S", "D" (ref word missing) or
+    "I" (extra hyp word); the index of the side an op doesn't touch is -1.
+
+    An alignment of cost d never leaves the band |j - i| <= d, so the DP only fills
+    (len(ref) + 1) x (2d + 1) cells, each row in a few numpy operations.
+    """
+    m, n = len(ref), len(hyp)
+    k = levenshtein(ref, hyp) if distance is None else distance
+    width = 2 * k + 1
+    vocab: Dict[Any, int] = {}
+    r = np.array([vocab.setdefault(x, len(vocab)) for x in ref], dtype=np.int64)
+    h = np.array([vocab.setdefault(x, len(vocab)) for x in hyp] or [-1], dtype=np.int64)
+    inf = np.int64(1 << 40)
+    offsets = np.arange(-k, k + 1)  # band index b holds column j = i + b - k
+    steps = np.arange(width)
+    moves = np.zeros((m + 1, width), dtype=np.uint8)
+
+    j = offsets
+    valid = (j >= 0) & (j <= n)
+    prev = np.where(valid, j, inf)
+    moves[0] = _LEFT
+    for i in range(1, m + 1):
+        j = i + offsets
+        valid = (j >= 0) & (j <= n)
+        diag = np.where(j >= 1, prev + (h[np.clip(j - 1, 0, max(n - 1, 0))] != r[i - 1]), inf)
+        up = np.append(prev[1:] + 1, inf)
+        best = np.where(valid, np.minimum(diag, up), inf)
+        # Insertions chain along the row: cur[b] = min(best[b], cur[b - 1] + 1)
+        cur = np.minimum.accumulate(best - steps) + steps
+        cur = np.where(valid, cur, inf)
+        moves[i] = np.where(cur == diag, _DIAG, np.where(cur == up, _UP, _LEFT))
+        prev = cur
+
+    ops: List[Tuple[str, int, int]] = []
+    i, b = m, n - m + k
+    while i > 0 or i + b - k > 0:
+        jj = i + b - k
+        move = moves[i, b] if i > 0 else _LEFT
+        if move == _DIAG:
+            ops.append(("=" if ref[i - 1] == hyp[jj - 1] else "S", i - 1, jj - 1))
+            i -= 1
+        elif move == _UP:
+            ops.append(("D", i - 1, -1))
+            i -= 1; b += 1
+        else:
+            ops.append(("I", -1, jj - 1))
+            b -= 1
+    ops.reverse()
+    return ops
+
+# ------------- Scoring -------------
+
+def score_session(ref_text: str, hyp_text: str, alignment: bool = False) -> Dict[str, Any]:
+    ref_words, hyp_words = normalize_words(ref_text), normalize_words(hyp_text)
+    ref_chars, hyp_chars = normalize_chars(ref_text), normalize_chars(hyp_text)
+    word_edits = levenshtein(ref_words, hyp_words)
+    result = {"ref_words": len(ref_words), "word_edits": word_edits,
+              "ref_chars": len(ref_chars), "char_edits": levenshtein(ref_chars, hyp_chars)}
+    if alignment:
+        ops = align(ref_words, hyp_words, word_edits)
+        for op, name in (("S", "substitutions"), ("D", "deletions"), ("I", "insertions")):
+            result[name] = sum(1 for o in ops if o[0] == op)
+        result["alignment"] = [[op, ref_words[i] if i >= 0 else "", hyp_words[j] if j >= 0 else ""]
+                               for op, i, j in ops if op != "="]
+    return result
+
+def _score_pair(args: Tuple[str, str, bool]) -> Dict[str, Any]:
+    return score_session(*args)
+
+def score(reference: Dict[str, str], hypothesis: Dict[str, str], alignment: bool = False,
+          workers: int = 0) -> Dict[str, Any]:
+    """WER/CER of `hypothesis` against `reference` (session -> text), overall and per session.
+    Sessions missing from the hypothesis count as empty; extra ones are ignored."""
+    sessions = sorted(reference)
+    jobs = [(reference[s], hypothesis.get(s, ""), alignment) for s in sessions]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = list(pool.map(_score_pair, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+    else:
+        results = [_score_pair(job) for job in jobs]
+
+    per_session = {}
+    for session, res in zip(sessions, results):
+        res["wer"] = res["word_edits"] / max(res["ref_words"], 1)
+        res["cer"] = res["char_edits"] / max(res["ref_chars"], 1)
+        per_session[session] = res
+    totals = {key: sum(r[key] for r in results) for key in ("ref_words", "word_edits", "ref_chars", "char_edits")}
+    summary = {"sessions": len(sessions), "missing": sorted(s for s in sessions if s not in hypothesis),
+               "wer": totals["word_edits"] / max(totals["ref_words"], 1),
+               "cer": totals["char_edits"] / max(totals["ref_chars"], 1), **totals}
+    if alignment:
+        for name in ("substitutions", "deletions", "insertions"):
+            summary[name] = sum(r[name] for r in results)
+    return {"summary": summary, "sessions": per_session}
+
+# ------------- Reading runs -------------
+
+def read_transcripts(path: str) -> Dict[str, str]:
+    """Session -> clean transcript from an outputs/ dir (manifest + store, else <session>.txt
+    files) or from a merged transcribed.txt ("<session>:\\n<text>\\n\\n" blocks)."""
+    if os.path.isdir(path):
+        from manifest import iter_transcripts, load_manifest
+        manifest_path = os.path.join(path, "manifest.json")
+        if os.path.exists(manifest_path):
+            return dict(iter_transcripts(load_manifest(manifest_path)))
+        texts = {}
+        for name in sorted(os.listdir(path)):
+            if name.endswith(".txt") and not name.endswith("_annotated.txt") and not name.startswith("transcripts."):
+                with open(os.path.join(path, name), "r", encoding="utf-8") as f:
+                    texts[name[:-len(".txt")]] = f.read().strip()
+        return texts
+    with open(path, "r", encoding="utf-8") as f:
+        blocks = f.read().split("\n\n")
+    texts = {}
+    for block in blocks:
+        name, sep, text = block.strip().partition(":\n")
+        if sep:
+            texts[name] = text.strip()
+    return texts
+
+def read_rtf(path: str) -> Optional[Dict[str, float]]:
+    """Audio seconds, wall seconds and RTF of the Stage 1 run that wrote `path`, if it has metrics."""
+    prom = os.path.join(path if os.path.isdir(path) else os.path.dirname(path), "metrics", "stage_1.prom")
+    if not os.path.exists(prom):
+        return None
+    values = {}
+    with open(prom, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith(("pipeline_audio_seconds_total", "pipeline_stage_duration_seconds")):
+                name, value = line.split("{")[0], line.rsplit(" ", 1)[1]
+                values[name] = float(value)
+    audio_s = values.get("pipeline_audio_seconds_total", 0.0)
+    wall_s = values.get("pipeline_stage_duration_seconds")
+    if not audio_s or wall_s is None:
+        return None  # every file came from the Stage 1 cache: nothing was timed
+    return {"audio_seconds": audio_s, "wall_seconds": wall_s, "rtf": wall_s / audio_s}
+
+def evaluate(reference: str, hypotheses: Iterable[str], alignment: bool = False, workers: int = 0) -> Dict[str, Any]:
+    ref = read_transcripts(reference)
+    if not ref:
+        raise ValueError(f"No reference transcripts found in {reference}")
+    report: Dict[str, Any] = {"reference": reference, "runs": {}}
+    for hyp in hypotheses:
+        run = score(ref, read_transcripts(hyp), alignment, workers)
+        run["stage_1"] = read_rtf(hyp)
+        report["runs"][hyp] = run
+    return report
+
+def print_report(report: Dict[str, Any]):
+    print(f"[Eval] reference: {report['reference']}")
+    print(f"[Eval] {'run':40} {'WER':>7} {'CER':>7} {'S/D/I':>17} {'RTF':>7}")
+    for hyp, run in report["runs"].items():
+        s = run["summary"]
+        sdi = f"{s['substitutions']}/{s['deletions']}/{s['insertions']}" if "substitutions" in s else "-"
+        rtf = f"{run['stage_1']['rtf']:7.3f}" if run["stage_1"] else f"{'-':>7}"
+        print(f"[Eval] {hyp:40} {s['wer']:7.2%} {s['cer']:7.2%} {sdi:>17} {rtf}")
+        if s["missing"]:
+            print(f"[Eval]   missing {len(s['missing'])} sessions: {', '.join(s['missing'][:5])}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WER/CER of Stage 1 transcripts against a reference")
+    parser.add_argument("reference", help="reference outputs/ dir or transcribed.txt")
+    parser.add_argument("hypotheses", nargs="+", help="outputs/ dirs or transcribed.txt files to score")
+    parser.add_argument("--alignments", action="store_true", help="word alignments with S/D/I counts per session")
+    parser.add_argument("--workers", type=int, default=0, help="scoring processes (default: one per CPU)")
+    parser.add_argument("--json", help="write the full report (per-session scores, alignments) here")
+    args = parser.parse_args()
+    report = evaluate(args.reference, args.hypotheses, args.alignments, args.workers)
+    print_report(report)
+    if args.json:
+        from utils_io import atomic_write
+        with atomic_write(args.json) as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[Eval] wrote {args.json}")
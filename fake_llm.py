@@ -0,0 +1,86 @@
+# fake_llm.py
+import re
+import json
+import time
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+def canned_truth(shadow_id: str) -> str:
+    """A schema-valid TruthWeaverOutput for `shadow_id`."""
+    return json.dumps({
+        "shadow_id": shadow_id,
+        "revealed_truth": {
+            "programming_experience": "3-4 years",
+            "programming_language": "python",
+            "skill_mastery": "intermediate",
+            "leadership_claims": "fabricated",
+            "team_experience": "individual contributor",
+            "skills and other keywords": ["Machine Learning"]
+        },
+        "deception_patterns": [
+            {"lie_type": "experience_inflation", "contradictory_claims": ["6 years", "3 years"]}
+        ]
+    }, ensure_ascii=False)
+
+def synthetic_inputs(n_shadows: int, segments: int = 40) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, str], List[str]]:
+    """`n_shadows` shadows of five sessions each, as (sessions, transcripts, shadow ids) for stage_2.run_all."""
+    sessions, transcripts = {}, {}
+    emotions = ["neu", "neu", "hap", "sad", "ang"]
+    for s in range(n_shadows):
+        shadow = f"shadow{s}_2025"
+        for n in range(1, 6):
+            name = f"{shadow}_{n}"
+            segs = [{"start": i * 3.0, "end": i * 3.0 + 2.5, "text": f"segment {i} of session {n}",
+                     "emotion": emotions[i % len(emotions)], "rms": 0.05, "pitch": 180.0, "style": ""}
+                    for i in range(segments)]
+            sessions[name] = segs
+            transcripts[name] = " ".join(seg["text"] for seg in segs)
+    return sessions, transcripts, [f"shadow{s}_2025" for s in range(n_shadows)]
+
+class FakeTruthLLM(BaseChatModel):
+    """Offline stand-in for the Gemini chat model.
+
+    Sleeps `latency` seconds per call and answers with canned_truth() for the
+    "Shadow ID:" found in the prompt, so Stage 2 can be run and timed without
+    an API key. Pass it as `llm=` to stage_2.main/run_all/arun_all.
+    The first `fail_first` answers are schema-invalid, to exercise the repair loop.
+    """
+
+    latency: float = 0.5
+    fail_first: int = 0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-truth"
+
+    def _answer(self, messages: List[BaseMessage]) -> ChatResult:
+        prompt = "\n".join(str(m.content) for m in messages)
+        # Truth prompts carry "Shadow ID: X"; repair prompts only the bad JSON
+        match = re.search(r"Shadow ID:\s*(\S+)", prompt) or re.search(r'"shadow_id":\s*"([^"]+)"', prompt)
+        content = canned_truth(match.group(1) if match else "unknown_shadow")
+        if self.calls < self.fail_first:
+            broken = json.loads(content)
+            del broken["deception_patterns"]
+            content = "Here is the JSON:\n" + json.dumps(broken)
+        self.calls += 1
+        message = AIMessage(content=content, usage_metadata={
+            "input_tokens": len(prompt) // 4,
+            "output_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return self._answer(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._answer(messages)
@@ -1,47 +1,179 @@
 import os
-import subprocess
+import ast
 import sys
+import json
+import hashlib
+import argparse
+from typing import Any, Callable, Dict, List
 
-def run_pipeline():
+from metrics import PeakRSS, Timer
+from utils_io import atomic_write
+
+# config.py's paths are relative to the repo root; run_pipeline works from there wherever it is started
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = os.path.join(ROOT, ".pipeline_state.json")
+
+class Stage:
+    """One pipeline step.
+
+    `run(ctx)` does the work and may put results into `ctx` for later stages.
+    `inputs()` lists the files whose size/mtime decide whether the stage is up
+    to date; it is evaluated when the stage is reached, after upstream stages ran.
     """
-    Executes the pipeline of Python scripts sequentially.
-    This method is cross-platform.
+
+    def __init__(self, name: str, run: Callable[[Dict[str, Any]], None], inputs: Callable[[], List[str]],
+                 outputs: List[str] = (), deps: List[str] = ()):
+        self.name = name
+        self.run = run
+        self.inputs = inputs
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+
+def fingerprint(paths: List[str]) -> str:
+    h = hashlib.sha1()
+    for path in sorted(set(paths)):
+        try:
+            st = os.stat(path)
+            h.update(f"{path}:{st.st_size}:{st.st_mtime_ns}\n".encode("utf-8"))
+        except FileNotFoundError:
+            h.update(f"{path}:missing\n".encode("utf-8"))
+    return h.hexdigest()
+
+def local_modules(entry: str) -> List[str]:
+    """Paths of `entry` plus every repo module it imports, directly or through other repo modules.
+
+    Imports are read from the source (including the ones deferred into functions),
+    so a stage's fingerprint covers all the code it can run without importing it.
     """
-    print("Starting the pipeline...")
+    seen, todo = set(), [entry]
+    while todo:
+        path = todo.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        with open(os.path.join(ROOT, path), "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                module = name.split(".")[0] + ".py"
+                if os.path.exists(os.path.join(ROOT, module)):
+                    todo.append(module)
+    return [os.path.join(ROOT, path) for path in sorted(seen)]
+
+def load_state() -> Dict[str, str]:
+    if not os.path.exists(STATE_FILE):
+        return {}
+    with open(STATE_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_state(state: Dict[str, str]):
+    with atomic_write(STATE_FILE) as f:
+        json.dump(state, f, indent=2)
+
+# ------------- Stages -------------
+# Modules are imported inside each stage so a skipped stage never pays for
+# importing torch/transformers/langchain.
+
+def run_create_env(ctx: Dict[str, Any]):
+    import create_env
+    create_env.create_env()
+
+def run_stage_1(ctx: Dict[str, Any]):
+    import stage_1
+    ctx["sessions"] = stage_1.build()
+    ctx["transcripts"] = stage_1.transcripts_from_sessions(ctx["sessions"])
+
+def run_merge_sessions(ctx: Dict[str, Any]):
+    import merge_sessions
+    merge_sessions.merge_sessions(ctx.get("transcripts"))
 
-    # Define the sequence of scripts to be executed
-    scripts = [
-        'create_env.py', # Usually a one-time setup
-        'stage_1.py',
-        'merge_sessions.py',
-        'create_folders.py',
-        'stage_2.py'
-    ]
+def run_stage_2(ctx: Dict[str, Any]):
+    import asyncio
+    import stage_2
+    # Shadows run concurrently, bounded by config.LLM_CONCURRENCY / LLM_REQUESTS_PER_SECOND
+    ctx["results"] = asyncio.run(stage_2.arun_all(ctx.get("sessions"), ctx.get("transcripts")))
+
+def _stage_1_inputs() -> List[str]:
+    from config import AUDIO_FILES
+    return [os.path.join(ROOT, f) for f in AUDIO_FILES] + local_modules("stage_1.py")
+
+def _transcript_files() -> List[str]:
+    # Stage 1's manifest; it names the transcript store by content hash, so it changes with the store
+    return [os.path.join(ROOT, "outputs", "manifest.json")]
+
+def _segment_partitions() -> List[str]:
+    # Stage 2 reads the segments from the columnar store, one partition per session
+    from config import SEGMENT_STORE_DIR
+    store = os.path.join(ROOT, SEGMENT_STORE_DIR)
+    return [os.path.join(d, name) for d, _, names in os.walk(store) for name in names
+            if name.endswith((".arrow", ".parquet"))]
+
+PIPELINE = [
+    Stage("create_env", run_create_env, lambda: local_modules("create_env.py"),
+          outputs=[os.path.join(ROOT, ".env")]),
+    Stage("stage_1", run_stage_1, _stage_1_inputs, outputs=[os.path.join(ROOT, "outputs", "sessions.json")],
+          deps=["create_env"]),
+    Stage("merge_sessions", run_merge_sessions, lambda: _transcript_files() + local_modules("merge_sessions.py"),
+          outputs=[os.path.join(ROOT, "final_outputs", "transcribed.txt")], deps=["stage_1"]),
+    Stage("stage_2", run_stage_2,
+          lambda: _transcript_files() + _segment_partitions() + local_modules("stage_2.py"),
+          outputs=[os.path.join(ROOT, "final_outputs", "PrelimsSubmission.json")], deps=["stage_1"]),
+]
+
+def run_pipeline(force: bool = False):
+    """
+    Runs the pipeline stages in-process, in dependency order.
+    Stages whose inputs and outputs are unchanged since their last run are skipped;
+    results are handed to later stages in memory and written to disk as artifacts.
+    """
+    print("Starting the pipeline...")
+    os.chdir(ROOT)
+    state = load_state()
+    ctx: Dict[str, Any] = {}
+    report = []
+    done = set()
 
     try:
-        # Execute each script in the list
-        for script in scripts:
-            print(f"--- Running {script} ---")
-            
-            # Use sys.executable to ensure we use the same Python interpreter
-            # that is running this main script. This is best practice.
-            subprocess.run([sys.executable, script], check=True)
-            
-            print(f"--- Finished {script} ---\n")
-        
-        print("✅ Pipeline completed successfully!")
-
-    except FileNotFoundError as e:
-        # This error occurs if a script in the list doesn't exist
-        print(f"\n❌ Error: Script not found: {e.filename}")
-        print("Please ensure all script files are in the correct directory.")
-        sys.exit(1)
-        
-    except subprocess.CalledProcessError as e:
-        # This error occurs if any script returns a non-zero exit code (i.e., it fails)
-        print(f"\n❌ Error: A script failed with exit code {e.returncode}.")
-        # The failing script's output/errors should be visible above
+        for stage in PIPELINE:
+            missing = [d for d in stage.deps if d not in done]
+            if missing:
+                raise RuntimeError(f"{stage.name} depends on {missing}, which have not run")
+
+            fp = fingerprint(stage.inputs())
+            if not force and state.get(stage.name) == fp and all(os.path.exists(o) for o in stage.outputs):
+                print(f"--- Skipping {stage.name} (inputs unchanged) ---\n")
+                report.append((stage.name, "skipped", 0.0, 0.0))
+                done.add(stage.name)
+                continue
+
+            print(f"--- Running {stage.name} ---")
+            with Timer() as t, PeakRSS() as mem:
+                stage.run(ctx)
+            print(f"--- Finished {stage.name} in {t.elapsed:.1f}s (peak RSS {mem.peak_mb:.0f} MB) ---\n")
+            report.append((stage.name, "ran", t.elapsed, mem.peak_mb))
+            done.add(stage.name)
+            state[stage.name] = fp
+            save_state(state)
+
+    except Exception as e:
+        print(f"\n❌ Error: Stage '{stage.name}' failed: {e}")
+        import traceback
+        traceback.print_exc()
         sys.exit(1)
 
+    print(f"{'stage':16} {'status':8} {'wall (s)':>9} {'peak RSS (MB)':>14}")
+    for name, status, elapsed, peak in report:
+        print(f"{name:16} {status:8} {elapsed:9.1f} {peak:14.0f}")
+    print("✅ Pipeline completed successfully!")
+
 if __name__ == '__main__':
-    run_pipeline()
+    parser = argparse.ArgumentParser(description="Run the Truth Weaver pipeline")
+    parser.add_argument("--force", action="store_true", help="run every stage even if its inputs are unchanged")
+    args = parser.parse_args()
+    run_pipeline(force=args.force)
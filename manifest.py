@@ -0,0 +1,118 @@
+# manifest.py
+import os
+import json
+import hashlib
+from typing import Dict, Iterator, List, Tuple
+
+# Stage 1 writes every clean transcript into one store file and a manifest
+#   {"version": 2, "store": "transcripts.<sha256[:16]>.txt", "sha256": "...",
+#    "shadows": {"atlas_2025": {"1": [byte_offset, byte_length], ...}, ...}}
+# Stage 2 and merge_sessions.py read sessions through it by seeking into the store.
+# The store is named after its content and never rewritten, so replacing the
+# manifest is the single point where a new set of transcripts becomes visible.
+MANIFEST_VERSION = 2
+
+def split_session(session: str) -> Tuple[str, str]:
+    """"atlas_2025_3" -> ("atlas_2025", "3"); names without a trailing number are their own shadow."""
+    shadow_id, _, number = session.rpartition("_")
+    if shadow_id and number.isdigit():
+        return shadow_id, number
+    return session, ""
+
+def session_name(shadow_id: str, number: str) -> str:
+    return f"{shadow_id}_{number}" if number else shadow_id
+
+def _session_order(number: str):
+    return (0, int(number)) if number.isdigit() else (1, number)
+
+def group_by_shadow(names) -> Dict[str, List[str]]:
+    """Session numbers per shadow, both sorted."""
+    shadows: Dict[str, List[str]] = {}
+    for name in names:
+        shadow_id, number = split_session(name)
+        shadows.setdefault(shadow_id, []).append(number)
+    return {s: sorted(nums, key=_session_order) for s, nums in sorted(shadows.items())}
+
+def ordered_sessions(names) -> List[str]:
+    """Session names in store order: by shadow, then by session number."""
+    return [session_name(s, n) for s, numbers in group_by_shadow(names).items() for n in numbers]
+
+def _store_versions(store_path: str) -> List[str]:
+    """Content-versioned store files written for `store_path`, as names in its directory."""
+    directory = os.path.dirname(store_path) or "."
+    root, ext = os.path.splitext(os.path.basename(store_path))
+    if not os.path.isdir(directory):
+        return []
+    return [name for name in os.listdir(directory)
+            if name.startswith(root + ".") and name.endswith(ext) and len(name) == len(root) + 17 + len(ext)]
+
+def write_transcript_store(transcripts: Dict[str, str], store_path: str, manifest_path: str) -> Dict:
+    """Write all transcripts to a store named after its content next to `store_path`, and their byte
+    ranges to `manifest_path`.
+
+    The manifest is replaced last; readers see either the old manifest and store or the new ones.
+    Store versions other than the new one and the one the old manifest named are then removed.
+    """
+    shadows: Dict[str, Dict[str, List[int]]] = {}
+    offset = 0
+    digest = hashlib.sha256()
+    tmp_store = store_path + ".tmp"
+    with open(tmp_store, "wb") as f:
+        for shadow_id, numbers in group_by_shadow(transcripts).items():
+            for number in numbers:
+                data = transcripts[session_name(shadow_id, number)].strip().encode("utf-8") + b"\n"
+                f.write(data)
+                digest.update(data)
+                shadows.setdefault(shadow_id, {})[number] = [offset, len(data) - 1]
+                offset += len(data)
+    sha256 = digest.hexdigest()
+    root, ext = os.path.splitext(os.path.basename(store_path))
+    store_name = f"{root}.{sha256[:16]}{ext}"
+    os.replace(tmp_store, os.path.join(os.path.dirname(store_path), store_name))
+
+    previous = None
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                previous = json.load(f).get("store")
+        except (OSError, ValueError):
+            pass
+    manifest = {"version": MANIFEST_VERSION, "store": store_name, "sha256": sha256, "shadows": shadows}
+    tmp_manifest = manifest_path + ".tmp"
+    with open(tmp_manifest, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_manifest, manifest_path)
+
+    for name in _store_versions(store_path):
+        if name not in (store_name, previous):
+            try:
+                os.remove(os.path.join(os.path.dirname(store_path), name))
+            except OSError:
+                pass
+    return manifest
+
+def load_manifest(manifest_path: str) -> Dict:
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"Transcript manifest not found at {manifest_path} (run Stage 1 first)")
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest["_store_path"] = os.path.join(os.path.dirname(manifest_path), manifest["store"])
+    return manifest
+
+def shadow_ids(manifest: Dict) -> List[str]:
+    return sorted(manifest["shadows"])
+
+def read_shadow(manifest: Dict, shadow_id: str) -> Dict[str, str]:
+    """Clean transcripts of one shadow keyed by session name, read with one seek per session."""
+    sessions = manifest["shadows"].get(shadow_id, {})
+    texts = {}
+    with open(manifest["_store_path"], "rb") as f:
+        for number, (offset, length) in sessions.items():
+            f.seek(offset)
+            texts[session_name(shadow_id, number)] = f.read(length).decode("utf-8")
+    return texts
+
+def iter_transcripts(manifest: Dict) -> Iterator[Tuple[str, str]]:
+    """(session name, clean transcript) for every session, in store order."""
+    for shadow_id in shadow_ids(manifest):
+        yield from read_shadow(manifest, shadow_id).items()
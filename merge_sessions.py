@@ -1,32 +1,31 @@
 import os
-import glob
+from typing import Dict
 
 OUTPUT_DIR = "outputs"
 FINAL_OUTPUT_DIR = "final_outputs"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-os.makedirs(FINAL_OUTPUT_DIR, exist_ok=True)
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, "manifest.json")
 
-# Find all .txt files but exclude annotated ones
-session_files = sorted(
-    f for f in glob.glob(os.path.join(OUTPUT_DIR, "*.txt"))
-    if "annotated" not in os.path.basename(f)
-)
+def merge_sessions(transcripts: Dict[str, str] = None) -> str:
+    os.makedirs(FINAL_OUTPUT_DIR, exist_ok=True)
 
-# Output file path
-merged_file = os.path.join(FINAL_OUTPUT_DIR, "transcribed.txt")
+    if transcripts is not None:
+        # Handed over in memory by the pipeline runner; same order as the store
+        from manifest import ordered_sessions
+        sessions = ((name, transcripts[name]) for name in ordered_sessions(transcripts))
+    else:
+        # Read through Stage 1's manifest instead of rescanning outputs/
+        from manifest import load_manifest, iter_transcripts
+        sessions = iter_transcripts(load_manifest(MANIFEST_PATH))
 
-with open(merged_file, "w", encoding="utf-8") as outfile:
-    for file in session_files:
-        filename = os.path.splitext(os.path.basename(file))[0]
-        with open(file, "r", encoding="utf-8") as infile:
-            lines = infile.read().strip().splitlines()
-            
-            # Drop the first line if it matches the filename
-            if lines and lines[0].strip() == filename:
-                lines = lines[1:]
-            
-            text = "\n".join(lines).strip()
-            outfile.write(f"{filename}:\n{text}\n\n")
+    merged_file = os.path.join(FINAL_OUTPUT_DIR, "transcribed.txt")
+    count = 0
+    with open(merged_file, "w", encoding="utf-8") as outfile:
+        for filename, text in sessions:
+            outfile.write(f"{filename}:\n{text.strip()}\n\n")
+            count += 1
 
-print(f"Merged {len(session_files)} session files into {merged_file}")
+    print(f"Merged {count} sessions into {merged_file}")
+    return merged_file
 
+if __name__ == "__main__":
+    merge_sessions()
@@ -0,0 +1,283 @@
+# metrics.py
+import os
+import sys
+import json
+import time
+import threading
+import contextlib
+from typing import Any, Dict, List, Optional, Tuple
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (0 if it can't be measured)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # high-water mark, not current
+    except ImportError:
+        return 0
+
+def peak_rss() -> int:
+    """High-water RSS of this process in bytes.
+
+    Prefers VmHWM, which starts fresh at exec; ru_maxrss on Linux can carry over
+    the peak of the parent that forked this process.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return 0
+
+class PeakRSS:
+    """Context manager that samples RSS on a background thread and keeps the peak.
+
+        with PeakRSS() as mem:
+            run_stage()
+        print(mem.peak_mb)
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = current_rss()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+        return False
+
+    @property
+    def peak_mb(self) -> float:
+        return self.peak / (1024 * 1024)
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        return False
+
+# ------------- Spans and counters -------------
+# One registry per process. A span adds its duration to a per-name aggregate
+# (count, total, max) and, while tracing is on, keeps a Chrome trace event.
+# Stage 1 worker processes hand theirs to the parent with drain() / merge().
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_gauges: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}  # (name, labels) -> value
+_spans: Dict[str, List[float]] = {}  # name -> [count, total seconds, max seconds]
+_events: List[Dict[str, Any]] = []
+_lanes: Dict[str, int] = {}
+_tracing = False
+
+def reset(trace: bool = False):
+    """Forget everything recorded so far; `trace` turns Chrome trace events on or off."""
+    global _tracing
+    with _lock:
+        _counters.clear(); _gauges.clear(); _spans.clear(); _events.clear(); _lanes.clear()
+        _tracing = trace
+
+def count(name: str, value: float = 1.0):
+    """Add `value` to counter `name` (exported as pipeline_<name>_total)."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0.0) + value
+
+def gauge(name: str, value: float, **labels: str):
+    """Set gauge `name` (exported as pipeline_<name>); merged across processes by taking the max."""
+    with _lock:
+        _gauges[(name, tuple(sorted(labels.items())))] = value
+
+def _record(name: str, seconds: float, ts: float, lane: Optional[str], args: Dict[str, Any]):
+    with _lock:
+        agg = _spans.setdefault(name, [0, 0.0, 0.0])
+        agg[0] += 1; agg[1] += seconds; agg[2] = max(agg[2], seconds)
+        if not _tracing:
+            return
+        pid = os.getpid()
+        if lane is None:
+            tid = threading.get_ident()
+        elif lane in _lanes:
+            tid = _lanes[lane]
+        else:
+            tid = _lanes[lane] = len(_lanes) + 1
+            _events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": lane}})
+        _events.append({"name": name, "ph": "X", "ts": ts * 1e6, "dur": seconds * 1e6, "pid": pid, "tid": tid,
+                        "args": args})
+
+@contextlib.contextmanager
+def span(name: str, lane: Optional[str] = None, **args):
+    """Time the block as `name`. `lane` gives its trace events their own row (e.g. one per shadow,
+    since concurrent asyncio tasks share a thread); `args` only show up in the trace."""
+    ts = time.time()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - t0, ts, lane, args)
+
+def drain() -> Dict[str, Any]:
+    """Everything recorded in this process, which then starts over (the tracing setting is kept)."""
+    with _lock:
+        snapshot = {"counters": dict(_counters), "spans": {k: list(v) for k, v in _spans.items()},
+                    "gauges": [[name, dict(labels), value] for (name, labels), value in _gauges.items()],
+                    "events": list(_events)}
+        _counters.clear(); _gauges.clear(); _spans.clear(); _events.clear(); _lanes.clear()
+    return snapshot
+
+def merge(snapshot: Dict[str, Any]):
+    """Add a drain() snapshot from another process to this registry."""
+    with _lock:
+        for name, value in snapshot["counters"].items():
+            _counters[name] = _counters.get(name, 0.0) + value
+        for name, (n, total, longest) in snapshot["spans"].items():
+            agg = _spans.setdefault(name, [0, 0.0, 0.0])
+            agg[0] += n; agg[1] += total; agg[2] = max(agg[2], longest)
+        for name, labels, value in snapshot.get("gauges", []):
+            key = (name, tuple(sorted(labels.items())))
+            _gauges[key] = max(_gauges.get(key, value), value)
+        _events.extend(snapshot["events"])
+
+# ------------- Export -------------
+
+def prometheus_text(stage: str, wall_seconds: Optional[float] = None) -> str:
+    """The registry in Prometheus text exposition format, every series labelled with `stage`."""
+    with _lock:
+        spans = {k: list(v) for k, v in _spans.items()}
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+    lines = ["# HELP pipeline_span_seconds Time spent in each instrumented step.",
+             "# TYPE pipeline_span_seconds summary"]
+    for name, (n, total, _) in sorted(spans.items()):
+        labels = f'stage="{stage}",span="{name}"'
+        lines.append(f"pipeline_span_seconds_sum{{{labels}}} {total!r}")
+        lines.append(f"pipeline_span_seconds_count{{{labels}}} {n}")
+    lines += ["# HELP pipeline_span_seconds_max Longest single occurrence of each step.",
+              "# TYPE pipeline_span_seconds_max gauge"]
+    for name, (_, _, longest) in sorted(spans.items()):
+        lines.append(f'pipeline_span_seconds_max{{stage="{stage}",span="{name}"}} {longest!r}')
+    for name, value in sorted(counters.items()):
+        metric = f"pipeline_{name}_total"
+        lines += [f"# TYPE {metric} counter", f'{metric}{{stage="{stage}"}} {float(value)!r}']
+    for name in sorted({name for name, _ in gauges}):
+        lines.append(f"# TYPE pipeline_{name} gauge")
+        for (_, labels), value in sorted((k, v) for k, v in gauges.items() if k[0] == name):
+            extra = "".join(f',{k}="{v}"' for k, v in labels)
+            lines.append(f'pipeline_{name}{{stage="{stage}"{extra}}} {float(value)!r}')
+    if wall_seconds is not None:
+        lines += ["# TYPE pipeline_stage_duration_seconds gauge",
+                  f'pipeline_stage_duration_seconds{{stage="{stage}"}} {wall_seconds!r}',
+                  "# TYPE pipeline_stage_last_run_timestamp_seconds gauge",
+                  f'pipeline_stage_last_run_timestamp_seconds{{stage="{stage}"}} {time.time()!r}']
+    return "\n".join(lines) + "\n"
+
+def _write_atomic(path: str, text: str):
+    # The textfile collector may read at any moment: never let it see a half-written file
+    from utils_io import atomic_write
+    with atomic_write(path) as f:
+        f.write(text)
+
+def write_prometheus(path: str, stage: str, wall_seconds: Optional[float] = None):
+    _write_atomic(path, prometheus_text(stage, wall_seconds))
+
+def write_chrome_trace(path: str):
+    """Trace events as JSON for chrome://tracing or https://ui.perfetto.dev."""
+    with _lock:
+        events = list(_events)
+    _write_atomic(path, json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+
+def report(prefix: str, wall_seconds: float):
+    """Print where the time went, largest span first (spans can overlap when work runs in parallel)."""
+    with _lock:
+        spans = sorted(_spans.items(), key=lambda kv: -kv[1][1])
+    for name, (n, total, longest) in spans:
+        print(f"{prefix} {name:12} {total:9.2f}s {100 * total / max(wall_seconds, 1e-9):6.1f}% of wall  "
+              f"({n} calls, longest {longest:.2f}s)")
+
+# ------------- Profiling -------------
+
+@contextlib.contextmanager
+def profiled(stage: str, profiler: str, out_dir: str):
+    """Profile the block with "cprofile" (<out_dir>/<stage>.prof, open with snakeviz or pstats)
+    or "py-spy" (<out_dir>/<stage>.svg flame graph, including worker processes); "" does nothing."""
+    if not profiler:
+        yield
+    elif profiler == "cprofile":
+        import cProfile
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            os.makedirs(out_dir, exist_ok=True)
+            prof.dump_stats(os.path.join(out_dir, f"{stage}.prof"))
+    elif profiler == "py-spy":
+        import shutil
+        import signal
+        import subprocess
+        exe = shutil.which("py-spy")
+        if exe is None:
+            print("py-spy not found on PATH; running without the profiler")
+            yield
+            return
+        os.makedirs(out_dir, exist_ok=True)
+        proc = subprocess.Popen([exe, "record", "--pid", str(os.getpid()), "--subprocesses",
+                                 "-o", os.path.join(out_dir, f"{stage}.svg")])
+        try:
+            yield
+        finally:
+            proc.send_signal(signal.SIGINT)  # py-spy writes the flame graph when interrupted
+            proc.wait()
+    else:
+        raise ValueError(f"Unknown profiler: {profiler}")
+
+@contextlib.contextmanager
+def stage(name: str, prefix: str, out_dir: str, trace: bool = False, profiler: str = ""):
+    """Instrument one pipeline stage: start a fresh registry, profile if asked, and on exit (also
+    after a failure) write <out_dir>/<name>.prom, <name>.trace.json when tracing, and a summary."""
+    reset(trace)
+    t0 = time.perf_counter()
+    try:
+        with profiled(name, profiler, out_dir):
+            yield
+    finally:
+        wall = time.perf_counter() - t0
+        write_prometheus(os.path.join(out_dir, f"{name}.prom"), name, wall)
+        if trace:
+            write_chrome_trace(os.path.join(out_dir, f"{name}.trace.json"))
+        report(prefix, wall)
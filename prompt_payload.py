@@ -0,0 +1,145 @@
+# prompt_payload.py
+import json
+from functools import reduce
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# Column order of one annotation row; sent to the LLM as the "k" legend
+COLUMNS = ["start", "end", "emotion", "rms", "pitch", "text"]
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English/JSON; good enough to compare payloads
+    return (len(text) + 3) // 4
+
+def shadow_segments(sessions: Dict[str, Any], shadow_id: str) -> Dict[str, Any]:
+    """Segments of `shadow_id`'s sessions keyed by session number ("atlas_2025_3" -> "3")."""
+    picked = {}
+    for name, segs in sessions.items():
+        prefix, _, number = name.rpartition("_")
+        if prefix == shadow_id:
+            picked[number] = segs
+    return dict(sorted(picked.items(), key=lambda kv: int(kv[0]) if kv[0].isdigit() else kv[0]))
+
+# One segment in an indented sessions.json (nested two levels deep) without its text, with typical values
+_SEGMENT_JSON_CHARS = len(json.dumps([[{"start": 1234.56, "end": 1238.9, "text": "", "emotion": "neutral",
+                                        "rms": 0.05234198765432101, "pitch": 182.34567891234567, "style": ""}]],
+                                      indent=2))
+
+def raw_tokens(sessions: Dict[str, Any]) -> int:
+    """Estimated tokens of these sessions' segments as indented JSON, i.e. before compaction.
+    Only the text lengths are read, so Arrow tables are not converted to Python."""
+    chars = 0
+    for segs in sessions.values():
+        if hasattr(segs, "column"):
+            import pyarrow.compute as pc
+            chars += pc.sum(pc.utf8_length(segs.column("text"))).as_py() or 0
+        else:
+            chars += sum(len(seg["text"]) for seg in segs)
+        chars += len(segs) * _SEGMENT_JSON_CHARS
+    return (chars + 3) // 4
+
+def _numbers(column) -> np.ndarray:
+    if hasattr(column, "num_chunks"):  # pyarrow.ChunkedArray: a single chunk is read in place
+        return column.chunk(0).to_numpy() if column.num_chunks == 1 else column.to_numpy()
+    return np.asarray(column, dtype=np.float64)
+
+def session_columns(segs) -> Dict[str, Any]:
+    """One session as columns: start/end/rms/pitch arrays, emotion codes + labels, and the texts.
+
+    `segs` is a list of segment dicts or a pyarrow.Table from segment_store, whose
+    numeric and emotion buffers are used without copying; its text column is only
+    turned into Python strings if the payload keeps text.
+    """
+    if hasattr(segs, "column"):
+        emotion = segs.column("emotion").combine_chunks()
+        if not hasattr(emotion, "indices"):
+            emotion = emotion.dictionary_encode()
+        return {"start": _numbers(segs.column("start")), "end": _numbers(segs.column("end")),
+                "rms": _numbers(segs.column("rms")), "pitch": _numbers(segs.column("pitch")),
+                "codes": emotion.indices.to_numpy(zero_copy_only=False), "labels": emotion.dictionary.to_pylist(),
+                "text": segs.column("text")}
+    labels: Dict[str, int] = {}
+    codes = [labels.setdefault(seg["emotion"], len(labels)) for seg in segs]
+    return {**{c: _numbers([seg[c] for seg in segs]) for c in ("start", "end", "rms", "pitch")},
+            "codes": np.asarray(codes, dtype=np.int64), "labels": list(labels), "text": [seg["text"] for seg in segs]}
+
+def merge_runs(segs) -> Dict[str, Any]:
+    """Merge consecutive segments with the same emotion; RMS/pitch become duration-weighted means.
+
+    Returns the runs as columns (start, end, emotion, rms, pitch) plus, for the text,
+    the index range of the segments each run covers.
+    """
+    cols = session_columns(segs)
+    codes = cols["codes"]
+    if codes.size == 0:
+        empty = np.zeros(0)
+        return {"start": empty, "end": empty, "emotion": [], "rms": empty, "pitch": empty,
+                "first": empty.astype(np.int64), "last": empty.astype(np.int64), "source_text": []}
+    first = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    last = np.r_[first[1:], codes.size] - 1
+    dur = np.maximum(cols["end"] - cols["start"], 1e-3)
+    total = np.add.reduceat(dur, first)
+    return {"start": cols["start"][first], "end": cols["end"][last],
+            "emotion": [cols["labels"][c] for c in codes[first]],
+            "rms": np.add.reduceat(cols["rms"] * dur, first) / total,
+            "pitch": np.add.reduceat(cols["pitch"] * dur, first) / total,
+            "first": first, "last": last, "source_text": cols["text"]}
+
+def _run_texts(runs: Dict[str, Any]) -> List[str]:
+    texts = runs["source_text"]
+    if hasattr(texts, "to_pylist"):
+        texts = texts.to_pylist()
+    return [reduce(lambda a, b: f"{a} {b}".strip(), texts[a:b + 1]) for a, b in zip(runs["first"], runs["last"])]
+
+def _rows(runs: Dict[str, Any], with_text: bool) -> List[list]:
+    """Every run's payload row; built once, then picked from as rows are thinned out."""
+    rows = [[round(start, 1), round(end, 1), emotion, round(rms, 3), int(round(pitch))]
+            for start, end, emotion, rms, pitch in zip(runs["start"].tolist(), runs["end"].tolist(), runs["emotion"],
+                                                       runs["rms"].tolist(), runs["pitch"].tolist())]
+    if with_text:
+        rows = [row + [text] for row, text in zip(rows, _run_texts(runs))]
+    return rows
+
+def _render(rows: Dict[str, List[list]], with_text: bool) -> str:
+    payload = {"k": COLUMNS if with_text else COLUMNS[:-1], **rows}
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+def _downsample(runs: Dict[str, Any], step: int) -> np.ndarray:
+    # Keep every `step`-th run, but never drop a non-neutral one
+    neutral = np.array([e.startswith("neu") for e in runs["emotion"]], dtype=bool)
+    return np.flatnonzero((np.arange(neutral.size) % step == 0) | ~neutral)
+
+def build_annotation_payload(sessions: Dict[str, Any], shadow_id: str,
+                             token_budget: int) -> Tuple[str, Dict[str, int]]:
+    """Compact JSON annotations for one shadow, shrunk to fit `token_budget`.
+
+    Rows are `[start, end, emotion, rms, pitch, text]` per session with same-emotion
+    runs merged. Over budget, the text column is dropped first (the clean sessions
+    already carry it), then neutral rows are thinned out. Sessions are lists of
+    segment dicts or segment_store Arrow tables.
+    Returns the payload and {"segments", "rows", "tokens"}.
+    """
+    picked = shadow_segments(sessions, shadow_id)
+    merged = {n: merge_runs(segs) for n, segs in picked.items()}
+    n_segments = sum(len(segs) for segs in picked.values())
+    longest = max((len(runs["emotion"]) for runs in merged.values()), default=0)
+
+    with_text = True
+    step = 1
+    all_rows = {n: _rows(runs, with_text) for n, runs in merged.items()}
+    while True:
+        kept = {n: _downsample(runs, step) for n, runs in merged.items()}
+        text = _render({n: [all_rows[n][i] for i in keep] for n, keep in kept.items()}, with_text)
+        tokens = estimate_tokens(text)
+        rows = sum(len(keep) for keep in kept.values())
+        if tokens <= token_budget:
+            break
+        if with_text:
+            with_text = False
+            all_rows = {n: [row[:-1] for row in session_rows] for n, session_rows in all_rows.items()}
+        elif step < longest:
+            step *= 2
+        else:
+            break  # only first + non-neutral rows left; send what remains
+    return text, {"segments": n_segments, "rows": rows, "tokens": tokens}
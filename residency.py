@@ -0,0 +1,129 @@
+# residency.py
+"""Keep Stage 1 inside a memory budget.
+
+Whisper large-v3 and HuBERT-large SER do not fit next to each other (plus the
+decoded audio) on an 8 GB machine. ModelResidency loads the models on first
+use and, when loading one would overrun MEMORY_BUDGET_MB, unloads the least
+recently used one first. plan_schedule picks how Stage 1 runs:
+
+  resident   both models stay loaded and each file is done in one pass
+  two-phase  every file is transcribed, Whisper is unloaded, then every file
+             is annotated (features + SER) with only the SER model loaded
+
+"resident" is preferred because it loads each model once and keeps per-file
+results flowing; "two-phase" is used when only one model at a time fits.
+Footprints are estimated from parameter counts and the precision in use
+(MODEL_FOOTPRINT_MB in config.py overrides them), and are replaced by the RSS
+actually gained when a model is loaded.
+"""
+import gc
+import sys
+import contextlib
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import metrics
+
+MB = 1024 * 1024
+
+# Weights in millions; unknown models are assumed to be as large as large-v3 / HuBERT-large
+WHISPER_PARAMS_M = {"tiny": 39, "base": 74, "small": 244, "medium": 769, "large-v1": 1550, "large-v2": 1550,
+                    "large-v3": 1550, "large": 1550, "turbo": 809, "large-v3-turbo": 809,
+                    "distil-large-v3": 756, "distil-medium.en": 394, "distil-small.en": 166}
+SER_PARAMS_M = {"superb/hubert-large-superb-er": 316, "superb/hubert-base-superb-er": 95,
+                "superb/wav2vec2-base-superb-er": 95, "superb/wav2vec2-large-superb-er": 317}
+# Framework runtime, allocator arenas and tokenizer/feature extractor around each model
+RUNTIME_MB = 400.0
+
+# ------------- Footprints -------------
+
+def whisper_footprint_mb(model: str, backend: str, compute_type: str) -> float:
+    params = WHISPER_PARAMS_M.get(model, 1550)
+    if backend != "faster-whisper":
+        bytes_per_weight = 4  # openai-whisper keeps float32 weights
+    elif compute_type.startswith("int8"):
+        bytes_per_weight = 1
+    elif compute_type in ("float16", "bfloat16"):
+        bytes_per_weight = 2
+    else:
+        bytes_per_weight = 4  # "default" on CPU runs the float16 checkpoint as float32
+    return params * bytes_per_weight + RUNTIME_MB
+
+def ser_footprint_mb(model_id: str, quantize: bool) -> float:
+    # Dynamic int8 only covers the Linear layers; the convolutional front end stays float32
+    return SER_PARAMS_M.get(model_id, 316) * (1.5 if quantize else 4) + RUNTIME_MB
+
+def audio_working_mb(seconds: float, sr: int) -> float:
+    """Memory the longest file needs while a model works on it: the samples Whisper or the
+    feature extractor copy in, Whisper's log-mel input and the frame-level RMS/pitch."""
+    return seconds * sr * 4 * 3 / MB
+
+def plan_schedule(budget_mb: Optional[float], base_mb: float, footprints_mb: Dict[str, float],
+                  audio_mb: float) -> Tuple[str, Dict[str, float]]:
+    """("resident" | "two-phase", estimated peak MB of each schedule) for the given budget."""
+    estimates = {"resident": base_mb + sum(footprints_mb.values()) + audio_mb,
+                 "two-phase": base_mb + max(footprints_mb.values()) + audio_mb}
+    if budget_mb is None or estimates["resident"] <= budget_mb:
+        return "resident", estimates
+    return "two-phase", estimates
+
+# ------------- Residency -------------
+
+def release_memory():
+    """Collect garbage and hand freed heap pages back to the OS (glibc keeps them otherwise)."""
+    gc.collect()
+    if sys.platform.startswith("linux"):
+        try:
+            import ctypes
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+class ModelResidency:
+    """Named models loaded on first use and unloaded when a load would overrun the budget.
+
+    Callers must not keep their own reference to a model past `unload`, or its memory
+    cannot be freed.
+    """
+
+    def __init__(self, budget_mb: Optional[float], loaders: Dict[str, Callable[[], Any]],
+                 footprints_mb: Dict[str, float]):
+        self.budget_mb = budget_mb
+        self.loaders = loaders
+        self.footprints_mb = dict(footprints_mb)
+        self.models: Dict[str, Any] = {}  # least recently used first
+        self.phases: Dict[str, Dict[str, float]] = {}
+
+    def get(self, name: str) -> Any:
+        if name in self.models:
+            self.models[name] = self.models.pop(name)
+            return self.models[name]
+        if self.budget_mb is not None:
+            while self.models and metrics.current_rss() / MB + self.footprints_mb[name] > self.budget_mb:
+                self.unload(next(iter(self.models)))
+        before = metrics.current_rss()
+        with metrics.span("load", model=name):
+            self.models[name] = self.loaders[name]()
+        self.footprints_mb[name] = max((metrics.current_rss() - before) / MB, 0.0)
+        metrics.gauge("model_rss_bytes", self.footprints_mb[name] * MB, model=name)
+        return self.models[name]
+
+    def unload(self, name: str):
+        if self.models.pop(name, None) is not None:
+            release_memory()
+
+    def close(self):
+        for name in list(self.models):
+            self.unload(name)
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Record the wall time and peak RSS of the block as phase `name`."""
+        with metrics.Timer() as t, metrics.PeakRSS() as mem:
+            yield
+        self.phases[name] = {"seconds": t.elapsed, "peak_rss_mb": mem.peak_mb}
+        metrics.gauge("phase_peak_rss_bytes", mem.peak, phase=name)
+
+    def report(self, prefix: str):
+        budget = f" (budget {self.budget_mb:.0f} MB)" if self.budget_mb is not None else ""
+        for name, res in self.phases.items():
+            print(f"{prefix} phase {name:10} {res['seconds']:8.1f}s  peak RSS {res['peak_rss_mb']:7.0f} MB{budget}")
@@ -0,0 +1,117 @@
+# segment_store.py
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from manifest import split_session, ordered_sessions
+
+# Columnar store of Stage 1 segments, partitioned by session:
+#   <root>/<shadow_id>/<session>.arrow    (Arrow IPC file, memory-mapped on read)
+#   <root>/<shadow_id>/<session>.parquet  (smaller on disk, decoded on read)
+# Stage 1 writes one partition per audio file as it finishes; Stage 2 reads only
+# the partitions of the shadow it is working on.
+COLUMNS = ["start", "end", "text", "emotion", "rms", "pitch"]
+EXTENSIONS = {"arrow": ".arrow", "parquet": ".parquet"}
+
+def _schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("start", pa.float64()), ("end", pa.float64()), ("text", pa.string()),
+        ("emotion", pa.dictionary(pa.int8(), pa.string())), ("rms", pa.float64()), ("pitch", pa.float64()),
+    ])
+
+def session_path(root: str, session: str, fmt: str = "arrow") -> str:
+    if fmt not in EXTENSIONS:
+        raise ValueError(f"Unknown segment store format: {fmt}")
+    shadow_id, _ = split_session(session)
+    return os.path.join(root, shadow_id, session + EXTENSIONS[fmt])
+
+def write_session(root: str, session: str, segments: List[Dict[str, Any]], fmt: str = "arrow",
+                  source: Optional[str] = None) -> str:
+    """Write (or replace) one session's partition atomically; returns its path.
+
+    `source` (e.g. the Stage 1 cache key of the record) is kept in the schema metadata; see partition_source.
+    """
+    import pyarrow as pa
+    schema = _schema()
+    if source is not None:
+        schema = schema.with_metadata({b"source": source.encode("utf-8")})
+    table = pa.Table.from_pydict({c: [s[c] for s in segments] for c in COLUMNS}, schema=schema)
+    path = session_path(root, session, fmt)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    if fmt == "arrow":
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        import pyarrow.parquet as pq
+        pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+    # A session lives in exactly one format
+    for other in EXTENSIONS:
+        if other != fmt and os.path.exists(session_path(root, session, other)):
+            os.remove(session_path(root, session, other))
+    return path
+
+def partition_source(root: str, session: str, fmt: str = "arrow") -> Optional[str]:
+    """The `source` a session's partition was written with; None if it is missing or has none.
+
+    Only the schema is read, so checking whether a partition is current costs no segment data.
+    """
+    path = session_path(root, session, fmt)
+    if not os.path.exists(path):
+        return None
+    import pyarrow as pa
+    if fmt == "arrow":
+        schema = pa.ipc.open_file(pa.memory_map(path, "r")).schema
+    else:
+        import pyarrow.parquet as pq
+        schema = pq.read_schema(path)
+    source = (schema.metadata or {}).get(b"source")
+    return source.decode("utf-8") if source is not None else None
+
+def read_table(path: str, columns: Optional[List[str]] = None):
+    import pyarrow as pa
+    if path.endswith(EXTENSIONS["arrow"]):
+        # Buffers point into the memory-mapped file: no copy, pages load on first touch
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        return table.select(columns) if columns else table
+    import pyarrow.parquet as pq
+    return pq.read_table(path, columns=columns, memory_map=True)
+
+def _partitions(shadow_dir: str) -> Dict[str, str]:
+    paths = {}
+    if os.path.isdir(shadow_dir):
+        for fname in os.listdir(shadow_dir):
+            name, ext = os.path.splitext(fname)
+            if ext in EXTENSIONS.values():
+                paths[name] = os.path.join(shadow_dir, fname)
+    return paths
+
+def read_shadow(root: str, shadow_id: str, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Arrow tables of one shadow's sessions, keyed by session name in session order."""
+    paths = _partitions(os.path.join(root, shadow_id))
+    return {name: read_table(paths[name], columns) for name in ordered_sessions(paths)}
+
+def load_shadow_sessions(root: str, shadow_id: str) -> Dict[str, List[Dict[str, Any]]]:
+    """One shadow's segments in the sessions.json layout ({session: [segment, ...]})."""
+    return {name: table.to_pylist() for name, table in read_shadow(root, shadow_id).items()}
+
+def shadow_ids(root: str) -> List[str]:
+    return sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d))) if os.path.isdir(root) else []
+
+def load_all_sessions(root: str) -> Dict[str, List[Dict[str, Any]]]:
+    sessions = {}
+    for shadow_id in shadow_ids(root):
+        sessions.update(load_shadow_sessions(root, shadow_id))
+    return sessions
+
+def prune(root: str, keep: Iterable[str]):
+    """Delete partitions of sessions not in `keep` (e.g. audio files that were removed)."""
+    keep = set(keep)
+    for shadow_id in shadow_ids(root):
+        shadow_dir = os.path.join(root, shadow_id)
+        for name, path in _partitions(shadow_dir).items():
+            if name not in keep:
+                os.remove(path)
+        if not os.listdir(shadow_dir):
+            os.rmdir(shadow_dir)
@@ -0,0 +1,397 @@
+# service.py
+"""Warm-model service: Whisper and the SER model are loaded once and stay resident.
+
+    python service.py serve [--host H --port P | --socket PATH] [--no-cache]
+    python service.py submit [FILES ...]     # default: every file in audio/
+    python service.py status JOB_ID
+
+HTTP/JSON API (the same over TCP or a Unix socket):
+    POST /jobs                {"path": "/abs/path/atlas_2025_1.mp3"} -> 202 {"id": ..., "status": "queued"}
+    GET  /jobs/<id>[?wait=S]  status, timings and, once done, the session record (wait blocks up to S seconds)
+    GET  /jobs                every job without records
+    GET  /health              loaded models, queue depth, jobs by status
+    GET  /metrics             Prometheus text
+
+A job goes decode -> transcribe (SERVICE_WHISPER_WORKERS threads) -> annotate.
+Annotation is micro-batched: jobs that reach it within SERVICE_BATCH_WAIT_MS of
+each other share one features + SER pass, so the SER model sees one set of
+length-bucketed batches for several files instead of one per file. Finished
+records are written like Stage 1 writes them (session files, segment store,
+Stage 1 cache); sessions.json and the manifest are still built by stage_1.py.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import asyncio
+import argparse
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+import config
+from config import SAMPLE_RATE, AUDIO_CACHE_DIR, OUTPUT_DIR, SERVICE_HOST, SERVICE_PORT, SERVICE_SOCKET
+from config import SERVICE_WHISPER_WORKERS, SERVICE_BATCH_WAIT_MS, SERVICE_MAX_BATCH_JOBS, SERVICE_MAX_FINISHED_JOBS
+import metrics
+
+# ------------- Jobs -------------
+
+class Job:
+    def __init__(self, path: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.path = path
+        self.status = "queued"  # queued -> decoding -> transcribing -> annotating -> writing -> done | failed
+        self.submitted = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.cached = False
+        self.record: Optional[Dict[str, Any]] = None
+        self.error = ""
+        self.done = asyncio.Event()
+
+    def to_dict(self, with_record: bool = True) -> Dict[str, Any]:
+        d = {"id": self.id, "path": self.path, "status": self.status, "cached": self.cached, "error": self.error,
+             "submitted": self.submitted,
+             "queue_s": self.started - self.submitted if self.started else None,
+             "latency_s": self.finished - self.submitted if self.finished else None}
+        if with_record and self.record is not None:
+            d["record"] = self.record
+        return d
+
+class MicroBatcher:
+    """Collects annotation requests for up to `max_wait` seconds (or `max_jobs` jobs) and runs
+    features + SER for all of them in one call on a dedicated thread."""
+
+    def __init__(self, ser, max_wait: float, max_jobs: int):
+        self.ser = ser
+        self.max_wait = max_wait
+        self.max_jobs = max(max_jobs, 1)
+        self.queue: "asyncio.Queue" = asyncio.Queue()
+        # One thread: the SER model is never called concurrently
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ser")
+
+    async def annotate(self, audio: np.ndarray, segments: List[Dict[str, Any]]):
+        """(features, emotions) for one file's segments, computed together with other waiting files."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((audio, segments, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_jobs:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # A client that went away has cancelled its future: skip its work and never resolve it
+            batch = [item for item in batch if not item[2].done()]
+            if not batch:
+                continue
+            try:
+                results = await loop.run_in_executor(self.pool, self._annotate, [(a, s) for a, s, _ in batch])
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def _annotate(self, items: List[Tuple[np.ndarray, List[Dict[str, Any]]]]):
+        import stage_1
+        chunks: List[np.ndarray] = []
+        per_file = []
+        with metrics.span("features", jobs=len(items)):
+            for audio, segments in items:
+                file_chunks, features = stage_1.segment_features(audio, SAMPLE_RATE, segments)
+                per_file.append((len(chunks), features))
+                chunks.extend(file_chunks)
+        with metrics.span("ser", jobs=len(items)):
+            emotions, _ = self.ser.predict_batch(chunks, SAMPLE_RATE)
+        metrics.count("ser_batches")
+        metrics.count("ser_batch_jobs", len(items))
+        return [(features, emotions[offset:offset + len(features)]) for offset, features in per_file]
+
+# ------------- Service -------------
+
+class Service:
+    def __init__(self, whisper_model, ser, whisper_workers: int = 1, batch_wait: float = SERVICE_BATCH_WAIT_MS / 1000,
+                 max_batch_jobs: int = SERVICE_MAX_BATCH_JOBS, use_cache: bool = True):
+        self.whisper_model = whisper_model
+        self.whisper_workers = whisper_workers
+        self.use_cache = use_cache and bool(config.STAGE1_CACHE_DIR)
+        self.jobs: Dict[str, Job] = {}
+        self.whisper_pool = ThreadPoolExecutor(max_workers=whisper_workers, thread_name_prefix="whisper")
+        self.io_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="io")
+        self.batch_wait = batch_wait
+        self.max_batch_jobs = max_batch_jobs
+        self.ser = ser
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self, host: str = SERVICE_HOST, port: int = SERVICE_PORT, socket_path: str = ""):
+        """Start the job runners and the server; returns the asyncio server."""
+        self.queue: "asyncio.Queue" = asyncio.Queue()
+        self.batcher = MicroBatcher(self.ser, self.batch_wait, self.max_batch_jobs)
+        # More runners than Whisper threads, so decoding and annotation overlap with transcription
+        runners = self.whisper_workers + self.max_batch_jobs
+        self._tasks = [asyncio.create_task(self._runner()) for _ in range(runners)]
+        self._tasks.append(asyncio.create_task(self.batcher.run()))
+        if socket_path:
+            return await asyncio.start_unix_server(self.handle, path=socket_path)
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def aclose(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.whisper_pool.shutdown(wait=False)
+        self.io_pool.shutdown(wait=False)
+        self.batcher.pool.shutdown(wait=False)
+
+    def submit(self, path: str) -> Job:
+        job = Job(path)
+        self.jobs[job.id] = job
+        self.queue.put_nowait(job)
+        metrics.count("jobs_submitted")
+        return job
+
+    async def _runner(self):
+        while True:
+            job = await self.queue.get()
+            await self._run(job)
+
+    async def _run(self, job: Job):
+        import stage_1
+        loop = asyncio.get_running_loop()
+        job.started = time.time()
+        try:
+            job.status = "decoding"
+            key = await loop.run_in_executor(self.io_pool, stage_1.stage1_cache_key, job.path) if self.use_cache else None
+            cached = await loop.run_in_executor(self.io_pool, stage_1.load_cached_record, key) if key else None
+            if cached is not None:
+                job.record, job.cached = cached, True
+                metrics.count("stage1_cache_hits")
+            else:
+                audio = await loop.run_in_executor(self.io_pool, _decode, job.path)
+                job.status = "transcribing"
+                segments = await loop.run_in_executor(self.whisper_pool, _transcribe, self.whisper_model, audio)
+                job.status = "annotating"
+                features, emotions = await self.batcher.annotate(audio, segments)
+                records = stage_1.annotate_segments(segments, features, emotions)
+                stage_1.count_file(audio.shape[0] / SAMPLE_RATE, len(records))
+                job.record = {"session": stage_1.session_name(job.path),
+                              "audio_seconds": audio.shape[0] / SAMPLE_RATE, "segments": records}
+                job.status = "writing"
+                await loop.run_in_executor(self.io_pool, _write, key, job.record)
+            job.status = "done"
+            metrics.count("jobs_done")
+        except Exception as e:
+            job.status, job.error = "failed", f"{type(e).__name__}: {e}"
+            metrics.count("jobs_failed")
+            print(f"[Service] {job.id} {job.path}: {job.error}")
+        finally:
+            job.finished = time.time()
+            job.done.set()
+            self._prune()
+
+    def _prune(self):
+        # Finished jobs are kept for status queries, oldest dropped first
+        finished = [j for j in self.jobs.values() if j.finished is not None]
+        for job in sorted(finished, key=lambda j: j.finished)[:max(len(finished) - SERVICE_MAX_FINISHED_JOBS, 0)]:
+            del self.jobs[job.id]
+
+    def health(self) -> Dict[str, Any]:
+        by_status: Dict[str, int] = {}
+        for job in self.jobs.values():
+            by_status[job.status] = by_status.get(job.status, 0) + 1
+        return {"whisper": type(self.whisper_model).__name__, "ser": type(self.ser).__name__,
+                "queued": self.queue.qsize(), "jobs": by_status}
+
+    # ------------- HTTP -------------
+
+    async def route(self, method: str, target: str, body: bytes) -> Tuple[int, Any]:
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        if method == "POST" and parts == ["jobs"]:
+            path = json.loads(body or b"{}").get("path", "")
+            if not os.path.isfile(path):
+                return 400, {"error": f"no such file: {path!r}"}
+            job = self.submit(path)
+            return 202, {"id": job.id, "status": job.status}
+        if method == "GET" and parts == ["jobs"]:
+            return 200, [job.to_dict(with_record=False) for job in self.jobs.values()]
+        if method == "GET" and len(parts) == 2 and parts[0] == "jobs":
+            job = self.jobs.get(parts[1])
+            if job is None:
+                return 404, {"error": f"unknown job {parts[1]}"}
+            wait = float(parse_qs(url.query).get("wait", ["0"])[0])
+            if wait > 0:
+                try:
+                    await asyncio.wait_for(job.done.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            return 200, job.to_dict()
+        if method == "GET" and parts == ["health"]:
+            return 200, self.health()
+        if method == "GET" and parts == ["metrics"]:
+            return 200, metrics.prometheus_text("service")
+        return 404, {"error": f"no route for {method} {url.path}"}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Minimal HTTP/1.1: one request per connection, JSON (or text) responses
+        try:
+            method, target, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.strip().lower() == "content-length":
+                    length = int(value)
+            body = await reader.readexactly(length) if length else b""
+            status, payload = await self.route(method, target, body)
+        except Exception as e:
+            status, payload = 400, {"error": f"{type(e).__name__}: {e}"}
+        if isinstance(payload, str):
+            data, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            data, content_type = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json"
+        reason = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found"}[status]
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+def _decode(path: str) -> np.ndarray:
+    from utils_audio import load_audio
+    with metrics.span("decode"):
+        return load_audio(path, SAMPLE_RATE, AUDIO_CACHE_DIR)
+
+def _transcribe(whisper_model, audio: np.ndarray) -> List[Dict[str, Any]]:
+    import stage_1
+    with metrics.span("transcribe"):
+        return stage_1.transcribe(whisper_model, audio)["segments"]
+
+def _write(key: Optional[str], record: Dict[str, Any]):
+    import stage_1
+    stage_1.ensure_dir(OUTPUT_DIR)
+    with metrics.span("write", kind="session_files"):
+        stage_1.write_session_files(record)
+    stage_1.write_segment_store(record, key)
+    if key:
+        stage_1.save_cached_record(key, record)
+
+def load_service(use_cache: bool = True, batch_wait: float = SERVICE_BATCH_WAIT_MS / 1000,
+                 max_batch_jobs: int = SERVICE_MAX_BATCH_JOBS) -> Service:
+    """Load Whisper and SER once and wrap them in a Service."""
+    import stage_1
+    # openai-whisper models are not safe to call from several threads
+    workers = SERVICE_WHISPER_WORKERS if config.WHISPER_BACKEND == "faster-whisper" else 1
+    t0 = time.perf_counter()
+    ser = stage_1.load_emotion_classifier()
+    whisper_model = stage_1.load_whisper_model(num_workers=workers)
+    print(f"[Service] models loaded in {time.perf_counter() - t0:.1f}s ({workers} Whisper workers)")
+    return Service(whisper_model, ser, workers, batch_wait, max_batch_jobs, use_cache)
+
+async def serve(host: str = SERVICE_HOST, port: int = SERVICE_PORT, socket_path: str = SERVICE_SOCKET,
+                use_cache: bool = True):
+    service = load_service(use_cache)
+    server = await service.start(host, port, socket_path)
+    print(f"[Service] listening on {socket_path or f'http://{host}:{port}'}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.aclose()
+
+# ------------- Client -------------
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float = 60.0):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+def request(method: str, path: str, body: Any = None, host: str = SERVICE_HOST, port: int = SERVICE_PORT,
+            socket_path: str = SERVICE_SOCKET, timeout: float = 60.0) -> Any:
+    conn = UnixHTTPConnection(socket_path, timeout) if socket_path else http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        conn.request(method, path, body=None if body is None else json.dumps(body),
+                     headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        data = resp.read().decode("utf-8")
+    finally:
+        conn.close()
+    if resp.status >= 400:
+        raise RuntimeError(f"{method} {path}: {resp.status} {data}")
+    return json.loads(data) if resp.getheader("Content-Type", "").startswith("application/json") else data
+
+def submit(path: str, **addr) -> str:
+    return request("POST", "/jobs", {"path": os.path.abspath(path)}, **addr)["id"]
+
+def wait(job_id: str, timeout: float = 3600.0, **addr) -> Dict[str, Any]:
+    """Block until the job is done or failed (long-polls the server)."""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = request("GET", f"/jobs/{job_id}?wait=30", timeout=45.0, **addr)
+        if job["status"] in ("done", "failed") or time.monotonic() > deadline:
+            return job
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm-model transcription/annotation service")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("serve", "submit", "status"):
+        p = sub.add_parser(name)
+        p.add_argument("--host", default=SERVICE_HOST)
+        p.add_argument("--port", type=int, default=SERVICE_PORT)
+        p.add_argument("--socket", default=SERVICE_SOCKET, help="Unix socket path instead of host:port")
+        if name == "serve":
+            p.add_argument("--no-cache", action="store_true", help="ignore the Stage 1 result cache")
+        elif name == "submit":
+            p.add_argument("files", nargs="*", help="audio files (default: every file in audio/)")
+        else:
+            p.add_argument("job_id")
+    args = parser.parse_args()
+    addr = {"host": args.host, "port": args.port, "socket_path": args.socket}
+
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.host, args.port, args.socket, use_cache=not args.no_cache))
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "status":
+        print(json.dumps(request("GET", f"/jobs/{args.job_id}", **addr), indent=2, ensure_ascii=False))
+    else:
+        files = args.files or config.AUDIO_FILES
+        ids = {submit(path, **addr): path for path in files}
+        print(f"Submitted {len(ids)} jobs")
+        failed = 0
+        for job_id, path in ids.items():
+            job = wait(job_id, **addr)
+            segments = len(job["record"]["segments"]) if job.get("record") else 0
+            print(f"{job['status']:7} {job['latency_s'] or 0:7.1f}s  {segments:4} segments  {path}"
+                  + (f"  ({job['error']})" if job["error"] else "") + ("  (cached)" if job["cached"] else ""))
+            failed += job["status"] != "done"
+        sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -2,110 +2,652 @@
 import os
 import csv
 import json
-from typing import List
+import time
+import tempfile
+import contextlib
+import hashlib
+import argparse
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 import numpy as np
-import librosa
 
-from config import AUDIO_FILES, OUTPUT_DIR, WHISPER_BACKEND, WHISPER_MODEL, SER_MODEL_ID, RMS_SHOUT, RMS_WHISPER, RMS_STATIC
-from utils_audio import EmotionClassifier, analyze_features
+import config
+from config import OUTPUT_DIR, WHISPER_MODEL, WHISPER_COMPUTE_TYPE, CHUNK_TARGET_SECONDS, CHUNK_WORKERS, SER_MODEL_ID, SER_MAX_BATCH_SECONDS, SER_QUANTIZE, RMS_SHOUT, RMS_WHISPER, RMS_STATIC, SAMPLE_RATE, AUDIO_CACHE_DIR, STAGE1_CACHE_DIR, PITCH_TRACKER, TRANSCRIPT_STORE, MANIFEST_PATH
+from config import SEGMENT_STORE_DIR, SEGMENT_STORE_FORMAT, EXPORT_CSV, METRICS_DIR, TRACE_EVENTS, PROFILER
+from config import SER_BACKEND, SER_ONNX_DIR, MEMORY_BUDGET_MB, RESIDENCY_SCHEDULE, MODEL_FOOTPRINT_MB
+from manifest import write_transcript_store
+import metrics
+import residency
+import segment_store
+from utils_io import atomic_write
+from utils_audio import EmotionClassifier, FrameFeatures, OnnxEmotionClassifier, file_sha1, load_audio
 
 def ensure_dir(d): os.makedirs(d, exist_ok=True)
 
+# Config values the command line and benchmarks may override for one build()
+OVERRIDABLE = ("WHISPER_MODEL", "WHISPER_COMPUTE_TYPE", "SER_QUANTIZE", "SER_BACKEND", "MEMORY_BUDGET_MB",
+               "RESIDENCY_SCHEDULE", "TRACE_EVENTS", "PROFILER", "MODEL_FOOTPRINT_MB")
+
+def resolve_settings(overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """The OVERRIDABLE config values with `overrides` applied; None in `overrides` keeps the config value.
+
+    The result is passed down explicitly, so an override never outlives the call it was given to.
+    """
+    unknown = sorted(set(overrides or {}) - set(OVERRIDABLE))
+    if unknown:
+        raise ValueError(f"Unknown Stage 1 override(s): {unknown}")
+    settings = {name: globals()[name] for name in OVERRIDABLE}
+    settings.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return settings
+
+def load_emotion_classifier(threads: int = 0, settings: Optional[Dict[str, Any]] = None) -> EmotionClassifier:
+    settings = settings or resolve_settings()
+    if settings["SER_BACKEND"] == "onnx":
+        return OnnxEmotionClassifier(SER_MODEL_ID, max_batch_seconds=SER_MAX_BATCH_SECONDS,
+                                     quantize=settings["SER_QUANTIZE"], cache_dir=SER_ONNX_DIR, threads=threads)
+    return EmotionClassifier(SER_MODEL_ID, max_batch_seconds=SER_MAX_BATCH_SECONDS, quantize=settings["SER_QUANTIZE"])
+
 # ------------- Whisper loaders -------------
-def load_whisper_model():
-    if WHISPER_BACKEND == "faster-whisper":
+def load_whisper_model(cpu_threads: int = 0, num_workers: int = 1, settings: Optional[Dict[str, Any]] = None):
+    # cpu_threads=0 keeps the backend default (all cores); num_workers > 1 lets
+    # that many transcribe() calls run concurrently from different threads
+    settings = settings or resolve_settings()
+    if config.WHISPER_BACKEND == "faster-whisper":
         from faster_whisper import WhisperModel
-        return WhisperModel(WHISPER_MODEL, device="auto")
+        return WhisperModel(settings["WHISPER_MODEL"], device="auto", compute_type=settings["WHISPER_COMPUTE_TYPE"],
+                            cpu_threads=cpu_threads, num_workers=num_workers)
     else:
         import whisper
-        return whisper.load_model(WHISPER_MODEL)
+        return whisper.load_model(settings["WHISPER_MODEL"])
 
-def transcribe(whisper_model, path: str):
-    if WHISPER_BACKEND == "faster-whisper":
-        segments, info = whisper_model.transcribe(path, language="en", vad_filter=True)
-        segs = []
+def iter_segments(whisper_model, audio: Union[str, np.ndarray], chunked: bool = False) -> Iterator[Dict[str, Any]]:
+    """Yield segments as Whisper produces them (lazily with faster-whisper)."""
+    if chunked:
+        yield from iter_segments_chunked(whisper_model, audio)
+    elif config.WHISPER_BACKEND == "faster-whisper":
+        segments, info = whisper_model.transcribe(audio, language="en", vad_filter=True)
         for i, s in enumerate(segments):
-            segs.append({"id": i, "start": s.start, "end": s.end, "text": s.text.strip()})
+            yield {"id": i, "start": s.start, "end": s.end, "text": s.text.strip()}
+    else:
+        yield from transcribe(whisper_model, audio)["segments"]
+
+def transcribe(whisper_model, audio: Union[str, np.ndarray], chunked: bool = False):
+    # Both backends take a path or a 16 kHz mono float32 array
+    if chunked or config.WHISPER_BACKEND == "faster-whisper":
+        segs = list(iter_segments(whisper_model, audio, chunked))
         text = " ".join([s["text"] for s in segs]).strip()
         return {"text": text, "segments": segs}
     else:
-        result = whisper_model.transcribe(path, language="en", task="transcribe", verbose=False)
+        if isinstance(audio, np.ndarray):
+            # torch.from_numpy needs a writable buffer; memory-mapped cache hits are read-only
+            audio = np.require(audio, dtype=np.float32, requirements=["W"])
+        result = whisper_model.transcribe(audio, language="en", task="transcribe", verbose=False)
         return {"text": result.get("text","").strip(), "segments": result.get("segments", [])}
 
+# ------------- Chunked transcription -------------
+
+def plan_chunks(speech: List[Dict[str, int]], total: int, target: int) -> List[Tuple[int, int]]:
+    """Group VAD speech regions (sample offsets) into chunks of about `target` samples.
+
+    Cuts fall in the middle of the silence between two regions, so no speech is
+    split or decoded twice. A single region longer than `target` stays whole.
+    """
+    if not speech:
+        return [(0, total)] if total else []
+    bounds = []
+    chunk_start = 0
+    first = speech[0]["start"]
+    for prev, region in zip(speech, speech[1:]):
+        if region["end"] - first > target:
+            cut = (prev["end"] + region["start"]) // 2
+            bounds.append((chunk_start, cut))
+            chunk_start, first = cut, region["start"]
+    bounds.append((chunk_start, total))
+    return bounds
+
+def iter_segments_chunked(whisper_model, audio: Union[str, np.ndarray]) -> Iterator[Dict[str, Any]]:
+    """Transcribe silence-delimited chunks concurrently and yield one stitched segment list."""
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+    if isinstance(audio, str):
+        audio = load_audio(audio, SAMPLE_RATE, AUDIO_CACHE_DIR)
+    speech = get_speech_timestamps(np.asarray(audio, dtype=np.float32), VadOptions())
+    chunks = plan_chunks(speech, audio.shape[0], int(CHUNK_TARGET_SECONDS * SAMPLE_RATE))
+
+    def run(bounds: Tuple[int, int]) -> List[Dict[str, Any]]:
+        a, b = bounds
+        offset = a / SAMPLE_RATE
+        return [dict(s, start=s["start"] + offset, end=s["end"] + offset)
+                for s in transcribe(whisper_model, audio[a:b])["segments"]]
+
+    # openai-whisper models are not safe to call from several threads
+    workers = CHUNK_WORKERS if config.WHISPER_BACKEND == "faster-whisper" else 1
+    seg_id = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # map() yields chunks in order, so segments come out in global time order. Chunks
+        # meet in silence and never overlap, so segments are kept as they are.
+        for chunk_segments in pool.map(run, chunks):
+            for seg in chunk_segments:
+                text = seg["text"].strip()
+                if not text:
+                    continue
+                yield dict(seg, id=seg_id, text=text)
+                seg_id += 1
+
+# ------------- Per-file processing -------------
+
+def session_name(audio_path: str) -> str:
+    return os.path.splitext(os.path.basename(audio_path))[0]  # e.g. "atlas_2025_1"
+
+def style_tag(emotion: str, rms: float, rms_mean: float) -> str:
+    if emotion == "angry" or rms > RMS_SHOUT*rms_mean:
+        return "[shouting]"
+    elif emotion in ["sad", "fearful"] and rms < RMS_WHISPER*rms_mean:
+        return "[whispered]"
+    elif emotion == "sad":
+        return "[sobbing]"
+    elif rms < RMS_STATIC*rms_mean:
+        return "[static interference]"
+    return ""
+
+def process_file(audio_path: str, whisper_model, ser: EmotionClassifier, chunked: bool = False) -> Dict[str, Any]:
+    """Transcribe and annotate one file; returns its session record (no files written)."""
+    # Decode once and share the waveform between Whisper, features and SER
+    with metrics.span("decode"):
+        audio = load_audio(audio_path, SAMPLE_RATE, AUDIO_CACHE_DIR)
+    sr = SAMPLE_RATE
+    with metrics.span("transcribe"):
+        result = transcribe(whisper_model, audio, chunked)
+    segments = result["segments"]
+
+    with metrics.span("features"):
+        chunks, features = segment_features(audio, sr, segments)
+    # Classify the whole session in a few length-bucketed batches
+    with metrics.span("ser"):
+        emotions, _ = ser.predict_batch(chunks, sr)
+
+    records = annotate_segments(segments, features, emotions)
+    count_file(audio.shape[0] / sr, len(records))
+    return {"session": session_name(audio_path), "audio_seconds": audio.shape[0] / sr, "segments": records}
+
+def segment_features(audio: np.ndarray, sr: int, segments: List[Dict[str, Any]],
+                     frame_features: Optional[FrameFeatures] = None) -> Tuple[List[np.ndarray], List[Tuple[float, float]]]:
+    """Audio slice and (rms, pitch) of each segment."""
+    # RMS and pitch are computed once over the file; each segment is a range query
+    if frame_features is None:
+        frame_features = FrameFeatures(audio, sr, pitch_tracker=PITCH_TRACKER)
+    chunks = []
+    features = []
+    for seg in segments:
+        start = int(seg["start"] * sr); end = int(seg["end"] * sr)
+        chunks.append(audio[start:end])
+        features.append(frame_features.segment(start, end))
+    return chunks, features
+
+def annotate_segments(segments: List[Dict[str, Any]], features: List[Tuple[float, float]],
+                      emotions: List[str]) -> List[Dict[str, Any]]:
+    """Segment records with style tags relative to the session's mean RMS."""
+    rms_mean = sum(rms for rms, _ in features) / max(len(features), 1)
+    records = []
+    for seg, (rms, pitch), emotion in zip(segments, features, emotions):
+        records.append({
+            "start": float(seg["start"]), "end": float(seg["end"]), "text": seg["text"].strip(),
+            "emotion": emotion, "rms": float(rms), "pitch": float(pitch),
+            "style": style_tag(emotion, rms, rms_mean),
+        })
+    return records
+
+def count_file(audio_seconds: float, segments: int):
+    metrics.count("files")
+    metrics.count("audio_seconds", audio_seconds)
+    metrics.count("segments", segments)
+
+# ------------- Streaming -------------
+
+_END = object()
+
+def _put(q: "queue.Queue", item, stop: threading.Event) -> bool:
+    """Put `item`, waiting while the queue is full; False once the consumer has stopped."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _produce_segments(whisper_model, audio: np.ndarray, chunked: bool, q: "queue.Queue", stop: threading.Event):
+    segments = iter_segments(whisper_model, audio, chunked)
+    try:
+        with metrics.span("transcribe"):  # includes time blocked on a full queue
+            for seg in segments:
+                if not _put(q, seg, stop):
+                    return
+    except BaseException as e:  # re-raised by the consumer
+        _put(q, e, stop)
+    finally:
+        segments.close()  # releases the Whisper generator and its hold on the audio
+    _put(q, _END, stop)
+
+def process_file_streaming(audio_path: str, whisper_model, ser: EmotionClassifier, chunked: bool = False) -> Dict[str, Any]:
+    """Like process_file, but annotates segments while Whisper is still transcribing.
+
+    A producer thread drains the faster-whisper generator into a bounded queue;
+    this thread takes whatever segments are ready, runs features + SER on them
+    as one batch and appends them to <session>_segments.jsonl.partial and
+    <session>_annotated.txt.partial straight away, so a crash keeps finished
+    segments. Style tags in the .partial files use the running RMS mean and are
+    provisional. Once the file is done, <session>_segments.jsonl and
+    <session>_annotated.txt are replaced atomically with the final session-mean
+    tags (the returned record, exactly as process_file gives) and the .partial
+    files are removed.
+    """
+    with metrics.span("decode"):
+        audio = load_audio(audio_path, SAMPLE_RATE, AUDIO_CACHE_DIR)
+    sr = SAMPLE_RATE
+    filename = session_name(audio_path)
+
+    q: "queue.Queue" = queue.Queue(maxsize=64)
+    # Set when this thread leaves, normally or on an error, so the producer never stays blocked on a full queue
+    stop = threading.Event()
+    producer = threading.Thread(target=_produce_segments, args=(whisper_model, audio, chunked, q, stop), daemon=True)
+    producer.start()
+
+    records = []
+    rms_total = 0.0
+    done = False
+    with contextlib.ExitStack() as cleanup:
+        cleanup.callback(producer.join)
+        cleanup.callback(stop.set)  # callbacks run last-in first-out: stop, then join
+        frame_features = FrameFeatures(audio, sr, pitch_tracker=PITCH_TRACKER)
+        jsonl = cleanup.enter_context(open(os.path.join(OUTPUT_DIR, f"{filename}_segments.jsonl.partial"), "w", encoding="utf-8"))
+        annotated = cleanup.enter_context(open(os.path.join(OUTPUT_DIR, f"{filename}_annotated.txt.partial"), "w", encoding="utf-8"))
+        annotated.write(f"{filename} (annotated)\n\n")
+        while not done:
+            batch = [q.get()]
+            while not q.empty() and len(batch) < 32:
+                batch.append(q.get_nowait())
+            if batch[-1] is _END:
+                batch.pop(); done = True
+            for item in batch:
+                if isinstance(item, BaseException):
+                    raise item
+
+            with metrics.span("features"):
+                chunks, features = segment_features(audio, sr, batch, frame_features)
+            with metrics.span("ser"):
+                emotions, _ = ser.predict_batch(chunks, sr) if chunks else ([], None)
+
+            with metrics.span("write"):
+                for seg, (rms, pitch), emotion in zip(batch, features, emotions):
+                    rms_total += rms
+                    record = {
+                        "start": float(seg["start"]), "end": float(seg["end"]), "text": seg["text"].strip(),
+                        "emotion": emotion, "rms": float(rms), "pitch": float(pitch),
+                        "style": style_tag(emotion, rms, rms_total / (len(records) + 1)),
+                    }
+                    records.append(record)
+                    jsonl.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    annotated.write(f"{record['style']} {record['text']}".strip() + "\n")
+                jsonl.flush(); annotated.flush()
+
+    rms_mean = rms_total / max(len(records), 1)
+    for record in records:
+        record["style"] = style_tag(record["emotion"], record["rms"], rms_mean)
+    with metrics.span("write"):
+        with atomic_write(os.path.join(OUTPUT_DIR, f"{filename}_segments.jsonl")) as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        write_annotated(filename, records)
+        for suffix in ("_segments.jsonl.partial", "_annotated.txt.partial"):
+            os.remove(os.path.join(OUTPUT_DIR, f"{filename}{suffix}"))
+    count_file(audio.shape[0] / sr, len(records))
+    return {"session": filename, "audio_seconds": audio.shape[0] / sr, "segments": records}
+
+# ------------- Result cache -------------
+# Records are content-addressed: the key covers the audio bytes and every setting
+# that changes segments, features, emotions or style tags.
+
+STAGE1_CACHE_VERSION = 1
+
+def stage1_cache_key(audio_path: str, chunked: bool = False, settings: Optional[Dict[str, Any]] = None) -> str:
+    settings = settings or resolve_settings()
+    key = {
+        "version": STAGE1_CACHE_VERSION, "audio": file_sha1(audio_path),
+        "whisper_model": settings["WHISPER_MODEL"], "whisper_backend": config.WHISPER_BACKEND,
+        "compute_type": settings["WHISPER_COMPUTE_TYPE"],
+        "ser_model": SER_MODEL_ID, "ser_quantize": settings["SER_QUANTIZE"], "ser_max_batch_seconds": SER_MAX_BATCH_SECONDS,
+        "sample_rate": SAMPLE_RATE, "pitch_tracker": PITCH_TRACKER,
+        "thresholds": [RMS_WHISPER, RMS_STATIC, RMS_SHOUT],
+        "chunked": [CHUNK_TARGET_SECONDS] if chunked else None,
+    }
+    if settings["SER_BACKEND"] != "torch":
+        key["ser_backend"] = settings["SER_BACKEND"]  # only when set, so existing torch cache entries stay valid
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+def load_cached_record(key: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(STAGE1_CACHE_DIR, f"{key}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_cached_record(key: str, record: Dict[str, Any]):
+    ensure_dir(STAGE1_CACHE_DIR)
+    with metrics.span("write", kind="stage1_cache"), atomic_write(os.path.join(STAGE1_CACHE_DIR, f"{key}.json")) as f:
+        json.dump(record, f, ensure_ascii=False)
+
+# ------------- Outputs -------------
+
+def write_annotated(filename: str, segments: List[Dict[str, Any]]):
+    with atomic_write(os.path.join(OUTPUT_DIR, f"{filename}_annotated.txt")) as f:
+        f.write(f"{filename} (annotated)\n\n")
+        for s in segments:
+            f.write(f"{s['style']} {s['text']}".strip() + "\n")
+
+def write_session_files(record: Dict[str, Any]):
+    filename = record["session"]
+    clean_session_lines: List[str] = [s["text"] for s in record["segments"]]
+
+    with atomic_write(os.path.join(OUTPUT_DIR, f"{filename}.txt")) as f:
+        f.write(f"{filename}\n\n")
+        f.write(" ".join(clean_session_lines).strip() + "\n")
+
+    write_annotated(filename, record["segments"])
+
+def remove_session_files(session: str):
+    """Delete what write_session_files and process_file_streaming left for a session whose audio is gone."""
+    for suffix in (".txt", "_annotated.txt", "_segments.jsonl", "_annotated.txt.partial", "_segments.jsonl.partial"):
+        path = os.path.join(OUTPUT_DIR, f"{session}{suffix}")
+        if os.path.exists(path):
+            os.remove(path)
+
+def write_segment_store(record: Dict[str, Any], source: Optional[str] = None):
+    """Write one session's partition of the columnar segment store (called as each file finishes).
+
+    With `source` (the record's Stage 1 cache key), a partition already written from it is left alone.
+    """
+    if source is not None and segment_store.partition_source(SEGMENT_STORE_DIR, record["session"],
+                                                             SEGMENT_STORE_FORMAT) == source:
+        return
+    with metrics.span("write", kind="segment_store"):
+        segment_store.write_session(SEGMENT_STORE_DIR, record["session"], record["segments"], SEGMENT_STORE_FORMAT,
+                                    source)
+
+def write_exports(records: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    # sessions.json layout (sessions without speech are kept as empty lists)
+    sessions = {
+        r["session"]: [{k: s[k] for k in segment_store.COLUMNS} for s in r["segments"]]
+        for r in records
+    }
+
+    if EXPORT_CSV:
+        with atomic_write(os.path.join(OUTPUT_DIR, "session_segments.csv"), newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["session", *segment_store.COLUMNS])
+            writer.writeheader()
+            for name, segs in sessions.items():
+                writer.writerows({"session": name, **s} for s in segs)
+
+    # Compact sessions.json for competition compatibility; the pipeline itself reads the segment store
+    with atomic_write(os.path.join(OUTPUT_DIR, "sessions.json")) as f:
+        json.dump(sessions, f, ensure_ascii=False, separators=(",", ":"))
+    segment_store.prune(SEGMENT_STORE_DIR, sessions)
+
+    # Single transcript store + manifest; Stage 2 and merge_sessions.py read sessions through it
+    write_transcript_store(transcripts_from_sessions(sessions), TRANSCRIPT_STORE, MANIFEST_PATH)
+    return sessions
+
+def transcripts_from_sessions(sessions: Dict[str, List[Dict[str, Any]]]) -> Dict[str, str]:
+    """Clean transcript per session, as written to outputs/<session>.txt."""
+    return {name: " ".join(s["text"] for s in segs).strip() for name, segs in sessions.items()}
+
+# ------------- Worker pool -------------
+
+_worker: Dict[str, Any] = {}
+
+def _init_worker(threads: int, stream: bool, chunked: bool, settings: Dict[str, Any]):
+    metrics.reset(trace=settings["TRACE_EVENTS"])
+    import torch
+    torch.set_num_threads(threads)
+    _worker["whisper"] = load_whisper_model(cpu_threads=threads, num_workers=CHUNK_WORKERS if chunked else 1,
+                                            settings=settings)
+    _worker["ser"] = load_emotion_classifier(threads, settings)
+    _worker["process"] = process_file_streaming if stream else process_file
+    _worker["chunked"] = chunked
+
+def _process_in_worker(audio_path: str) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    record = _worker["process"](audio_path, _worker["whisper"], _worker["ser"], _worker["chunked"])
+    # Spans and counters of this file go back to the parent, which exports them
+    return {"record": record, "worker": os.getpid(), "wall_seconds": time.perf_counter() - t0,
+            "metrics": metrics.drain()}
+
+@contextlib.contextmanager
+def _environ(values: Dict[str, str]):
+    """Set environment variables inside the block and restore the previous values after it."""
+    saved = {var: os.environ.get(var) for var in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+def _process_parallel(audio_files: List[str], workers: int, stream: bool = False, chunked: bool = False,
+                      settings: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    # Split the cores between workers so torch/OMP/CTranslate2 don't oversubscribe them
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"[Stage1] {workers} workers x {threads} threads")
+
+    stats: Dict[int, List[float]] = {}
+    ctx = multiprocessing.get_context("spawn")
+    # Workers are spawned on demand and inherit OMP/MKL_NUM_THREADS before they import torch; the
+    # variables are set for the pool's lifetime only, so later in-process stages keep their own
+    env = {"OMP_NUM_THREADS": str(threads), "MKL_NUM_THREADS": str(threads)}
+    with _environ(env), ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(threads, stream, chunked, settings or resolve_settings())) as pool:
+        # map() yields in submission order, so the merged outputs are deterministic
+        for idx, (audio_path, out) in enumerate(zip(audio_files, pool.map(_process_in_worker, audio_files)), start=1):
+            print(f"[Stage1] Finished Session {idx}: {audio_path} (worker {out['worker']})")
+            metrics.merge(out["metrics"])
+            audio_s, wall_s = stats.setdefault(out["worker"], [0.0, 0.0])
+            stats[out["worker"]] = [audio_s + out["record"]["audio_seconds"], wall_s + out["wall_seconds"]]
+            yield audio_path, out["record"]
+
+    for pid, (audio_s, wall_s) in sorted(stats.items()):
+        print(f"[Stage1] worker {pid}: {audio_s:.1f}s audio in {wall_s:.1f}s ({audio_s / max(wall_s, 1e-9):.2f} audio-s/wall-s)")
+
+# ------------- Memory-budgeted run -------------
+
+def model_footprints_mb(settings: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+    settings = settings or resolve_settings()
+    footprints = {"whisper": residency.whisper_footprint_mb(settings["WHISPER_MODEL"], config.WHISPER_BACKEND,
+                                                            settings["WHISPER_COMPUTE_TYPE"]),
+                  "ser": residency.ser_footprint_mb(SER_MODEL_ID, settings["SER_QUANTIZE"])}
+    footprints.update(settings["MODEL_FOOTPRINT_MB"])
+    return footprints
+
+def transcribe_file(audio_path: str, whisper_model, chunked: bool, cache_dir: str) -> List[Dict[str, Any]]:
+    """Whisper segments of one file, trimmed to what annotation needs."""
+    with metrics.span("decode"):
+        audio = load_audio(audio_path, SAMPLE_RATE, cache_dir, mmap=True)
+    with metrics.span("transcribe"):
+        segments = transcribe(whisper_model, audio, chunked)["segments"]
+    return [{"start": float(s["start"]), "end": float(s["end"]), "text": s["text"]} for s in segments]
+
+def annotate_file(audio_path: str, segments: List[Dict[str, Any]], ser: EmotionClassifier, cache_dir: str) -> Dict[str, Any]:
+    """Features + SER for transcribed segments; the same record process_file returns."""
+    with metrics.span("decode"):
+        audio = load_audio(audio_path, SAMPLE_RATE, cache_dir, mmap=True)
+    sr = SAMPLE_RATE
+    with metrics.span("features"):
+        chunks, features = segment_features(audio, sr, segments)
+    with metrics.span("ser"):
+        emotions, _ = ser.predict_batch(chunks, sr)
+    records = annotate_segments(segments, features, emotions)
+    count_file(audio.shape[0] / sr, len(records))
+    return {"session": session_name(audio_path), "audio_seconds": audio.shape[0] / sr, "segments": records}
+
+def _process_budgeted(pending: List[str], chunked: bool = False,
+                      settings: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Process files one at a time within MEMORY_BUDGET_MB, resident or in two phases (residency.py)."""
+    settings = settings or resolve_settings()
+    budget_mb = settings["MEMORY_BUDGET_MB"]
+    with contextlib.ExitStack() as stack:
+        # Models only ever see memory maps of the decoded PCM, so spill to a temp dir without the audio cache
+        cache_dir = AUDIO_CACHE_DIR or stack.enter_context(tempfile.TemporaryDirectory(prefix="stage1_pcm_"))
+        footprints = model_footprints_mb(settings)
+        models = residency.ModelResidency(budget_mb, {
+            "whisper": lambda: load_whisper_model(num_workers=CHUNK_WORKERS if chunked else 1, settings=settings),
+            "ser": lambda: load_emotion_classifier(settings=settings),
+        }, footprints)
+        stack.callback(models.report, "[Stage1]")
+        stack.callback(models.close)
+
+        # Decode everything before a model is loaded, so the decoder's peak never adds to a model's
+        longest = 0.0
+        with models.phase("decode"):
+            for audio_path in pending:
+                with metrics.span("decode"):
+                    audio = load_audio(audio_path, SAMPLE_RATE, cache_dir, mmap=True)
+                longest = max(longest, audio.shape[0] / SAMPLE_RATE)
+                del audio
+            residency.release_memory()
+
+        base_mb = metrics.current_rss() / residency.MB
+        schedule, estimates = residency.plan_schedule(budget_mb, base_mb, footprints,
+                                                      residency.audio_working_mb(longest, SAMPLE_RATE))
+        if settings["RESIDENCY_SCHEDULE"] != "auto":
+            schedule = settings["RESIDENCY_SCHEDULE"]
+        print(f"[Stage1] schedule: {schedule} (estimated peak {estimates['resident']:.0f} MB resident, "
+              f"{estimates['two-phase']:.0f} MB two-phase)")
+        if budget_mb is not None and estimates[schedule] > budget_mb:
+            print(f"[Stage1] warning: estimated peak is over the {budget_mb:.0f} MB budget")
+
+        if schedule == "resident":
+            with models.phase("process"):
+                for idx, audio_path in enumerate(pending, start=1):
+                    print(f"[Stage1] Processing Session {idx}: {audio_path}")
+                    segments = transcribe_file(audio_path, models.get("whisper"), chunked, cache_dir)
+                    yield audio_path, annotate_file(audio_path, segments, models.get("ser"), cache_dir)
+        elif schedule == "two-phase":
+            transcripts: Dict[str, List[Dict[str, Any]]] = {}
+            with models.phase("transcribe"):
+                for idx, audio_path in enumerate(pending, start=1):
+                    print(f"[Stage1] Transcribing Session {idx}: {audio_path}")
+                    transcripts[audio_path] = transcribe_file(audio_path, models.get("whisper"), chunked, cache_dir)
+                models.unload("whisper")
+            with models.phase("annotate"):
+                for idx, audio_path in enumerate(pending, start=1):
+                    print(f"[Stage1] Annotating Session {idx}: {audio_path}")
+                    yield audio_path, annotate_file(audio_path, transcripts.pop(audio_path), models.get("ser"), cache_dir)
+        else:
+            raise ValueError(f"Unknown schedule: {schedule}")
+
+def _workers_within_budget(workers: int, settings: Dict[str, Any]) -> int:
+    # Every worker holds both models; never start more than the budget has room for
+    budget_mb = settings["MEMORY_BUDGET_MB"]
+    base_mb = metrics.current_rss() / residency.MB
+    per_worker = base_mb + sum(model_footprints_mb(settings).values())
+    fits = max(1, int((budget_mb - base_mb) // per_worker))
+    if fits < workers:
+        print(f"[Stage1] {budget_mb:.0f} MB budget: {fits} of {workers} workers fit ({per_worker:.0f} MB each)")
+    return min(workers, fits)
+
 # ------------- Build -------------
 
-def build():
+def build(workers: int = 1, use_cache: bool = True, stream: bool = False, chunked: bool = False,
+          overrides: Optional[Dict[str, Any]] = None):
+    """Run Stage 1 over config.AUDIO_FILES. `overrides` replaces OVERRIDABLE config values for this run only."""
+    settings = resolve_settings(overrides)
+    # Writes outputs/metrics/stage_1.prom (and .trace.json / a profile when enabled), even if the run fails
+    with metrics.stage("stage_1", "[Stage1]", METRICS_DIR, settings["TRACE_EVENTS"], settings["PROFILER"]):
+        return _build(workers, use_cache, stream, chunked, settings)
+
+def _build(workers: int, use_cache: bool, stream: bool, chunked: bool, settings: Dict[str, Any]):
     ensure_dir(OUTPUT_DIR)
-    ser = EmotionClassifier(SER_MODEL_ID)
-    all_segments = []
-
-    whisper_model = load_whisper_model()
-    for idx, audio_path in enumerate(AUDIO_FILES, start=1):
-        print(f"[Stage1] Processing Session {idx}: {audio_path}")
-        result = transcribe(whisper_model, audio_path)
-        segments = result["segments"]
-        audio, sr = librosa.load(audio_path, sr=16000)
-
-        clean_session_lines: List[str] = []
-        annotated_session_lines: List[str] = []
-
-        rms_mean = 0.0
-        for seg in segments:
-            start = int(seg["start"] * sr); end = int(seg["end"] * sr)
-            chunk = audio[start:end]
-            rms, pitch = analyze_features(chunk, sr)
-            rms_mean += rms
-        rms_mean /= len(segments)
-        for seg in segments:
-            start = int(seg["start"] * sr); end = int(seg["end"] * sr)
-            chunk = audio[start:end]
-            rms, pitch = analyze_features(chunk, sr)
-            emotion = ser.predict_label(chunk, sr)
-
-            style = ""
-            if emotion == "angry" or rms > RMS_SHOUT*rms_mean:
-                style = "[shouting]"
-            elif emotion in ["sad", "fearful"] and rms < RMS_WHISPER*rms_mean:
-                style = "[whispered]"
-            elif emotion == "sad":
-                style = "[sobbing]"
-            elif rms < RMS_STATIC*rms_mean:
-                style = "[static interference]"
-
-            clean_session_lines.append(seg["text"].strip())
-            annotated_session_lines.append(f"{style} {seg['text'].strip()}".strip())
-            
-            filename = os.path.splitext(os.path.basename(audio_path))[0] ### changed here
-            all_segments.append({
-                "session": filename, "start": float(seg["start"]), "end": float(seg["end"]),
-                "text": seg["text"].strip(), "emotion": emotion, "rms": float(rms), "pitch": float(pitch)
-            })
-
-        filename = os.path.splitext(os.path.basename(audio_path))[0]  # e.g. "atlas_2025_1"
-        with open(os.path.join(OUTPUT_DIR, f"{filename}.txt"), "w", encoding="utf-8") as f:
-            f.write(f"{filename}\n\n")
-            f.write(" ".join(clean_session_lines).strip() + "\n")
-
-        with open(os.path.join(OUTPUT_DIR, f"{filename}_annotated.txt"), "w", encoding="utf-8") as f:
-            f.write(f"{filename} (annotated)\n\n")
-            for line in annotated_session_lines:
-                f.write(line + "\n")
-
-    # CSV export
-    with open(os.path.join(OUTPUT_DIR, "session_segments.csv"), "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=["session","start","end","text","emotion","rms","pitch"])
-        writer.writeheader(); writer.writerows(all_segments)
-
-    # sessions.json
-    sessions = {}
-    for s in all_segments:
-        sessions.setdefault(str(s["session"]), []).append({
-            "start": s["start"], "end": s["end"], "text": s["text"],
-            "emotion": s["emotion"], "rms": s["rms"], "pitch": s["pitch"]
-        })
-    with open(os.path.join(OUTPUT_DIR, "sessions.json"), "w", encoding="utf-8") as f:
-        json.dump(sessions, f, ensure_ascii=False, indent=2)
+    t0 = time.perf_counter()
+    use_cache = use_cache and bool(STAGE1_CACHE_DIR)
+
+    # Only new or changed files (or changed settings) go through the models
+    records: Dict[str, Dict[str, Any]] = {}
+    keys: Dict[str, str] = {}
+    for audio_path in config.AUDIO_FILES:
+        if use_cache:
+            keys[audio_path] = stage1_cache_key(audio_path, chunked, settings)
+            cached = load_cached_record(keys[audio_path])
+            if cached is not None:
+                records[audio_path] = cached
+    pending = [p for p in config.AUDIO_FILES if p not in records]
+    processed_sessions = {session_name(p) for p in pending}
+    metrics.count("stage1_cache_hits", len(records))
+    print(f"[Stage1] {len(records)} cached, {len(pending)} to process")
+
+    if pending and workers > 1 and settings["MEMORY_BUDGET_MB"] is not None:
+        workers = _workers_within_budget(workers, settings)
+    if pending and workers > 1:
+        for audio_path, record in _process_parallel(pending, workers, stream, chunked, settings):
+            records[audio_path] = record
+            write_segment_store(record, keys.get(audio_path))
+            if use_cache:
+                save_cached_record(keys[audio_path], record)
+    elif pending and (settings["MEMORY_BUDGET_MB"] is not None or settings["RESIDENCY_SCHEDULE"] != "auto"):
+        if stream:
+            print("[Stage1] --stream is ignored under a memory budget")
+        for audio_path, record in _process_budgeted(pending, chunked, settings):
+            records[audio_path] = record
+            write_segment_store(record, keys.get(audio_path))
+            if use_cache:
+                save_cached_record(keys[audio_path], record)
+    elif pending:
+        ser = load_emotion_classifier(settings=settings)
+        whisper_model = load_whisper_model(num_workers=CHUNK_WORKERS if chunked else 1, settings=settings)
+        process = process_file_streaming if stream else process_file
+        for idx, audio_path in enumerate(pending, start=1):
+            print(f"[Stage1] Processing Session {idx}: {audio_path}")
+            records[audio_path] = process(audio_path, whisper_model, ser, chunked)
+            write_segment_store(records[audio_path], keys.get(audio_path))
+            if use_cache:
+                save_cached_record(keys[audio_path], records[audio_path])
+
+    # Outputs are always rebuilt from the full set of records, cached or fresh; a cached record's
+    # partition only when it is missing or was written from another cache key
+    ordered = [records[p] for p in config.AUDIO_FILES]
+    for audio_path, record in zip(config.AUDIO_FILES, ordered):
+        with metrics.span("write", kind="session_files"):
+            write_session_files(record)
+        if record["session"] not in processed_sessions:
+            write_segment_store(record, keys.get(audio_path))
+    with metrics.span("write", kind="exports"):
+        sessions = write_exports(ordered)
+
+    elapsed = time.perf_counter() - t0
+    audio_s = sum(records[p]["audio_seconds"] for p in pending)
+    print(f"[Stage1] {len(pending)} files, {audio_s:.1f}s audio processed in {elapsed:.1f}s ({audio_s / max(elapsed, 1e-9):.2f} audio-s/wall-s)")
+    return sessions
 
 if __name__ == "__main__":
-    build()
+    parser = argparse.ArgumentParser(description="Stage 1: transcribe and annotate audio/")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, each with its own Whisper + SER models")
+    parser.add_argument("--no-cache", action="store_true", help="re-process every file, ignoring the Stage 1 result cache")
+    parser.add_argument("--stream", action="store_true", help="annotate and write segments while Whisper is still transcribing")
+    parser.add_argument("--chunked", action="store_true", help="split long audio at silences and transcribe chunks concurrently")
+    parser.add_argument("--model", help=f"Whisper model (default: {WHISPER_MODEL})")
+    parser.add_argument("--compute-type", help=f"faster-whisper compute type, e.g. int8, int8_float32 (default: {WHISPER_COMPUTE_TYPE})")
+    parser.add_argument("--ser-quantize", action="store_const", const=True, help="dynamic int8 quantization of the SER model")
+    parser.add_argument("--ser-backend", choices=["torch", "onnx"], help=f"SER runtime (default: {SER_BACKEND})")
+    parser.add_argument("--memory-budget", type=float, help="keep Stage 1 within this many MB of RSS (see residency.py)")
+    parser.add_argument("--schedule", choices=["auto", "resident", "two-phase"],
+                        help=f"model residency under a memory budget (default: {RESIDENCY_SCHEDULE})")
+    parser.add_argument("--trace", action="store_const", const=True, help=f"also write a Chrome trace to {METRICS_DIR}/stage_1.trace.json")
+    parser.add_argument("--profile", choices=["cprofile", "py-spy"], help=f"profile the stage into {METRICS_DIR}/")
+    args = parser.parse_args()
+    overrides = {"WHISPER_MODEL": args.model, "WHISPER_COMPUTE_TYPE": args.compute_type, "SER_QUANTIZE": args.ser_quantize,
+                 "SER_BACKEND": args.ser_backend, "MEMORY_BUDGET_MB": args.memory_budget, "RESIDENCY_SCHEDULE": args.schedule,
+                 "TRACE_EVENTS": args.trace, "PROFILER": args.profile}
+    build(workers=args.workers, use_cache=not args.no_cache, stream=args.stream, chunked=args.chunked, overrides=overrides)
     print("\n[Stage1] Done. See outputs/ for transcripts & segments.")
@@ -1,16 +1,28 @@
 # stage2_truth_extractor.py
 import os
 import json
-from typing import List, Dict, Any
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import contextlib
+from functools import lru_cache
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel, Field
-from langgraph.graph import StateGraph
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
-from config import OUTPUT_DIR,TEMP_DIRECTORIES,TRUTH_JSON_OUTPUT,FINAL_OUTPUT_DIR
-from dotenv import load_dotenv
-
-load_dotenv()
-api_key = os.getenv("GOOGLE_API_KEY")
+from config import OUTPUT_DIR,MANIFEST_PATH,SEGMENT_STORE_DIR,TRUTH_JSON_OUTPUT,FINAL_OUTPUT_DIR,PROMPT_TOKEN_BUDGET
+from config import LLM_CONCURRENCY,LLM_REQUESTS_PER_SECOND,LLM_MAX_RETRIES,LLM_BACKOFF_SECONDS
+from config import LLM_REPAIR_ATTEMPTS,LLM_JSON_MODE
+from config import LLM_CACHE_PATH,LLM_CACHE_TTL_SECONDS,LLM_CACHE_MAX_ENTRIES,STAGE2_CHECKPOINT_PATH
+from config import METRICS_DIR,TRACE_EVENTS,PROFILER
+from config import CLAIMS_FAST_PATH,CLAIMS_MIN_CONFIDENCE,CLAIMS_FACT_SHEET
+import claims
+from llm_cache import LLMCache, prompt_key
+import metrics
+from utils_io import atomic_write
+from manifest import group_by_shadow, load_manifest, read_shadow, shadow_ids, split_session
+from prompt_payload import build_annotation_payload, raw_tokens, shadow_segments
+import segment_store
 
 import re
 
@@ -43,41 +55,50 @@ class TruthWeaverOutput(BaseModel):
     revealed_truth: RevealedTruth
     deception_patterns: List[DeceptionPattern]
 
-# -------- Load sessions.json --------
-def load_sessions() -> Dict[str, List[Dict[str, Any]]]:
-    sessions_path = os.path.join(OUTPUT_DIR, "sessions.json")
-    if not os.path.exists(sessions_path):
-        raise FileNotFoundError(f"sessions.json not found at {sessions_path}")
-    
-    with open(sessions_path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def load_clean_sessions_text(TEMP_DIR:str) -> Dict[str, str]:
-    sessions_text = {}
-    for fname in os.listdir(TEMP_DIR):
-        if fname.endswith(".txt") and "annotated" not in fname:
-            path = os.path.join(TEMP_DIR, fname)
-            with open(path, "r", encoding="utf-8") as f:
-                header = f.readline()  # skip the label line
-                text = f.read().strip()
-                session_id = os.path.splitext(fname)[0]  # e.g. "atlas_2024_1"
-                sessions_text[session_id] = text
-    return sessions_text
-
-def infer_shadow_id(clean_sessions: Dict[str, str]) -> str:
-    """Infer shadow_id from filenames (common prefix before _number)."""
-    if not clean_sessions:
-        return "unknown_shadow"
-    first_key = next(iter(clean_sessions.keys()))
-    # e.g. "atlas_2024_1" -> "atlas_2024"
-    parts = first_key.split("_")
-    if parts[-1].isdigit():
-        return "_".join(parts[:-1])
-    return first_key
-
-# -------- LLM Setup --------
-llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-exp", google_api_key=api_key, temperature=0.0, top_k=1)
-prompt = ChatPromptTemplate.from_messages([
+# -------- Load Stage 1 segments --------
+def load_shadow_sessions(shadow_id: str) -> Dict[str, Any]:
+    """One shadow's segments as Arrow tables from the segment store; the prompt payload is built
+    straight from their columns (memory-mapped for .arrow partitions)."""
+    if not os.path.isdir(SEGMENT_STORE_DIR):
+        raise FileNotFoundError(f"Segment store not found at {SEGMENT_STORE_DIR} (run Stage 1 first)")
+    return segment_store.read_shadow(SEGMENT_STORE_DIR, shadow_id)
+
+@lru_cache(maxsize=1)
+def _manifest_at(path: str, mtime_ns: int) -> Dict[str, Any]:
+    return load_manifest(path)
+
+def get_manifest() -> Dict[str, Any]:
+    """Stage 1's transcript manifest, re-read only when the file changes."""
+    if not os.path.exists(MANIFEST_PATH):
+        return load_manifest(MANIFEST_PATH)  # raises with a helpful message
+    return _manifest_at(MANIFEST_PATH, os.stat(MANIFEST_PATH).st_mtime_ns)
+
+def load_clean_sessions_text(shadow_id: str, transcripts: Dict[str, str] = None) -> Dict[str, str]:
+    """Clean transcripts of one shadow keyed by session name ("atlas_2024_1"), from memory or the manifest."""
+    if transcripts is not None:
+        return {k: v for k, v in transcripts.items() if split_session(k)[0] == shadow_id}
+    return read_shadow(get_manifest(), shadow_id)
+
+def discover_shadows(transcripts: Dict[str, str] = None) -> List[str]:
+    """All shadow ids Stage 1 produced, sorted."""
+    if transcripts is not None:
+        return list(group_by_shadow(transcripts))
+    return shadow_ids(get_manifest())
+
+# The client, prompt and graph are built on first use so that importing this
+# module (e.g. from main.py or for --help) doesn't load langchain or read .env.
+@lru_cache(maxsize=None)
+def get_llm():
+    from dotenv import load_dotenv
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    load_dotenv()
+    api_key = os.getenv("GOOGLE_API_KEY")
+    # JSON mode makes Gemini emit a bare JSON object (no fences or prose around it)
+    json_mode = {"response_mime_type": "application/json"} if LLM_JSON_MODE else {}
+    return ChatGoogleGenerativeAI(model="gemini-2.0-flash-exp", google_api_key=api_key, temperature=0.0, top_k=1,
+                                  **json_mode)
+
+PROMPT_MESSAGES = [
     ("system", """You are an AI Truth Extractor for technical interviews.
 You will receive 5 sessions of transcripts (clean text) and segment-level annotations (emotion + RMS).
 Your goals:
@@ -179,11 +200,36 @@ Session 3: {s3}
 Session 4: {s4}
 Session 5: {s5}
 
-ANNOTATED SEGMENTS (guide for emotions; use for reasoning):
+ANNOTATED SEGMENTS (guide for emotions; use for reasoning; rows per session number, columns listed in "k"):
+{annotated_json}
+
+Return ONLY the JSON in the required schema.""")
+]
+
+# Same instructions, with claims.py's fact sheet in place of the clean sessions (CLAIMS_FACT_SHEET)
+FACTS_PROMPT_MESSAGES = [
+    PROMPT_MESSAGES[0],
+    ("human", """Shadow ID: {shadow_id}
+
+FACT SHEET (claims found in each session's clean transcript, keyed by session number, with the sentence each
+came from; "conflicts" are contradictions found by simple rules and still need your judgement):
+{facts}
+
+ANNOTATED SEGMENTS (guide for emotions; use for reasoning; rows per session number, columns listed in "k"):
 {annotated_json}
 
 Return ONLY the JSON in the required schema.""")
-])
+]
+
+@lru_cache(maxsize=None)
+def get_prompt():
+    from langchain_core.prompts import ChatPromptTemplate
+    return ChatPromptTemplate.from_messages(PROMPT_MESSAGES)
+
+@lru_cache(maxsize=None)
+def get_facts_prompt():
+    from langchain_core.prompts import ChatPromptTemplate
+    return ChatPromptTemplate.from_messages(FACTS_PROMPT_MESSAGES)
 
 
 # -------- Fixed LangGraph state & nodes --------
@@ -195,75 +241,281 @@ class TruthExtractorState(BaseModel):
     s4: str = ""
     s5: str = ""
     annotated_json: str = ""
+    facts: str = ""
+    cache_key: str = ""
     raw: str = ""
     json: str = ""
-
-def llm_node(state: TruthExtractorState) -> Dict[str, Any]:
+    error: str = ""
+    repairs: int = 0
+    repair_tokens: int = 0
+    llm_seconds: float = 0.0
+
+def _prompt_inputs(state: TruthExtractorState) -> Dict[str, str]:
+    return {
+        "shadow_id": state.shadow_id,
+        "s1": state.s1,
+        "s2": state.s2,
+        "s3": state.s3,
+        "s4": state.s4,
+        "s5": state.s5,
+        "annotated_json": state.annotated_json
+    }
+
+def _truth_prompt(state: TruthExtractorState):
+    """(prompt template, inputs) for the truth call: the fact sheet when claims_node set one, else the sessions."""
+    if state.facts:
+        return get_facts_prompt(), {"shadow_id": state.shadow_id, "facts": state.facts,
+                                    "annotated_json": state.annotated_json}
+    return get_prompt(), _prompt_inputs(state)
+
+def _configurable(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return (config or {}).get("configurable") or {}
+
+def _node_llm(config: Optional[Dict[str, Any]]):
+    # A chat model passed as config["configurable"]["llm"] (e.g. fake_llm.FakeTruthLLM) replaces Gemini
+    return _configurable(config).get("llm") or get_llm()
+
+def _model_params(llm) -> Dict[str, Any]:
+    # Model name and sampling params (temperature, top_k, ...) as reported by the chat model
+    return {"llm_type": llm._llm_type, **dict(llm._identifying_params)}
+
+def claims_node(state: TruthExtractorState) -> Dict[str, Any]:
+    """Rule-based claims: a consistent, well-backed shadow is answered here and skips the LLM;
+    otherwise, with CLAIMS_FACT_SHEET, the fact sheet replaces the sessions in the prompt."""
+    if not (CLAIMS_FAST_PATH or CLAIMS_FACT_SHEET):
+        return {}
+    with metrics.span("claims", lane=state.shadow_id):
+        sessions = {str(i): getattr(state, f"s{i}") for i in range(1, 6)}
+        sheet = claims.fact_sheet(state.shadow_id, sessions)
+        fast = claims.fast_path_truth(sheet, CLAIMS_MIN_CONFIDENCE) if CLAIMS_FAST_PATH else None
+    if fast is not None:
+        print(f"[Stage2] {state.shadow_id}: consistent claims (confidence {sheet['confidence']:.2f}), no LLM call")
+        metrics.count("claims_fast_path")
+        return {"json": _parse_truth(json.dumps(fast, ensure_ascii=False))}
+    print(f"[Stage2] {state.shadow_id}: claims confidence {sheet['confidence']:.2f}, "
+          f"{len(sheet['conflicts'])} conflict(s)")
+    if CLAIMS_FACT_SHEET:
+        return {"facts": claims.render_fact_sheet(sheet)}
+    return {}
+
+def cache_node(state: TruthExtractorState, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Look up a validated answer for this exact prompt + model; a hit skips llm and validate."""
+    cache = _configurable(config).get("cache")
+    if cache is None:
+        return {}
+    prompt, inputs = _truth_prompt(state)
+    with metrics.span("prompt", lane=state.shadow_id):
+        messages = prompt.format_messages(**inputs)
+    key = prompt_key(messages, _model_params(_node_llm(config)))
+    with metrics.span("cache", lane=state.shadow_id):
+        cached = cache.get(key)
+    if cached is not None:
+        print(f"[Stage2] {state.shadow_id}: LLM cache hit")
+        metrics.count("llm_cache_hits")
+        return {"cache_key": key, "json": cached}
+    metrics.count("llm_cache_misses")
+    return {"cache_key": key}
+
+def store_node(state: TruthExtractorState, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    cache = _configurable(config).get("cache")
+    if cache is not None and state.cache_key:
+        with metrics.span("cache", lane=state.shadow_id, op="put"):
+            cache.put(state.cache_key, state.json)
+    return {}
+
+def _is_retryable(e: Exception) -> bool:
+    """Rate limiting (429) and server errors (5xx) are worth retrying; anything else is not."""
+    code = getattr(e, "status_code", None) or getattr(e, "code", None)
     try:
-        chain = prompt | llm
-        # Convert state to dict for the prompt
-        state_dict = {
-            "shadow_id": state.shadow_id,
-            "s1": state.s1,
-            "s2": state.s2,
-            "s3": state.s3,
-            "s4": state.s4,
-            "s5": state.s5,
-            "annotated_json": state.annotated_json
-        }
-        
-        print(f"DEBUG: Sending prompt with state keys: {list(state_dict.keys())}")
-        print(f"DEBUG: State s1 length: {len(state_dict['s1'])}")
-        
-        resp = chain.invoke(state_dict)
-        
-        print(f"DEBUG: LLM response type: {type(resp.content)}")
-        print(f"DEBUG: LLM response length: {len(resp.content) if resp.content else 0}")
-        print(f"DEBUG: LLM response preview: {repr(resp.content[:100]) if resp.content else 'None'}")
-        
-        return {"raw": resp.content}
-    except Exception as e:
-        print(f"Error in LLM node: {e}")
-        raise
+        code = int(code() if callable(code) else code)
+    except (TypeError, ValueError):
+        return re.search(r"\b(429|5\d\d)\b", str(e)) is not None
+    return code == 429 or 500 <= code < 600
+
+def _backoff_delay(attempt: int) -> float:
+    # Exponential backoff with jitter: ~1s, 2s, 4s, ... capped at 60s
+    return min(LLM_BACKOFF_SECONDS * (2 ** attempt), 60.0) * (0.5 + random.random())
+
+def _count_usage(resp):
+    usage = getattr(resp, "usage_metadata", None) or {}
+    metrics.count("llm_calls")
+    metrics.count("llm_prompt_tokens", usage.get("input_tokens", 0))
+    metrics.count("llm_completion_tokens", usage.get("output_tokens", 0))
+
+# Both return (response, seconds spent in the calls themselves, excluding rate-limit waits and backoff)
+def _invoke_with_retry(llm, messages, shadow_id: str, limiter=None):
+    seconds = 0.0
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        if limiter is not None:
+            with metrics.span("rate_limit", lane=shadow_id):
+                limiter.acquire()
+        t0 = time.perf_counter()
+        try:
+            with metrics.span("llm", lane=shadow_id, attempt=attempt):
+                resp = llm.invoke(messages)
+            _count_usage(resp)
+            return resp, seconds + time.perf_counter() - t0
+        except Exception as e:
+            metrics.count("llm_errors")
+            if attempt == LLM_MAX_RETRIES or not _is_retryable(e):
+                print(f"Error in LLM node: {e}")
+                raise
+            delay = _backoff_delay(attempt)
+            print(f"[Stage2] {shadow_id}: LLM call failed ({e}); retrying in {delay:.1f}s")
+            seconds += time.perf_counter() - t0
+            time.sleep(delay)
+
+async def _ainvoke_with_retry(llm, messages, shadow_id: str, limiter=None):
+    seconds = 0.0
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        if limiter is not None:
+            with metrics.span("rate_limit", lane=shadow_id):
+                await limiter.aacquire()
+        t0 = time.perf_counter()
+        try:
+            with metrics.span("llm", lane=shadow_id, attempt=attempt):
+                resp = await llm.ainvoke(messages)
+            _count_usage(resp)
+            return resp, seconds + time.perf_counter() - t0
+        except Exception as e:
+            metrics.count("llm_errors")
+            if attempt == LLM_MAX_RETRIES or not _is_retryable(e):
+                print(f"Error in LLM node: {e}")
+                raise
+            delay = _backoff_delay(attempt)
+            print(f"[Stage2] {shadow_id}: LLM call failed ({e}); retrying in {delay:.1f}s")
+            seconds += time.perf_counter() - t0
+            await asyncio.sleep(delay)
+
+def _total_tokens(resp) -> int:
+    usage = getattr(resp, "usage_metadata", None) or {}
+    return int(usage.get("total_tokens", 0))
+
+def _render(prompt, inputs: Dict[str, Any], shadow_id: str):
+    with metrics.span("prompt", lane=shadow_id):
+        return prompt.format_messages(**inputs)
+
+def llm_node(state: TruthExtractorState, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    messages = _render(*_truth_prompt(state), state.shadow_id)
+    resp, seconds = _invoke_with_retry(_node_llm(config), messages, state.shadow_id,
+                                       _configurable(config).get("rate_limiter"))
+    return {"raw": resp.content, "llm_seconds": state.llm_seconds + seconds}
+
+async def allm_node(state: TruthExtractorState, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Async twin of llm_node, used by truth_flow.ainvoke; waits on the shared rate limiter before each call."""
+    messages = _render(*_truth_prompt(state), state.shadow_id)
+    resp, seconds = await _ainvoke_with_retry(_node_llm(config), messages, state.shadow_id,
+                                              _configurable(config).get("rate_limiter"))
+    return {"raw": resp.content, "llm_seconds": state.llm_seconds + seconds}
+
+def _parse_truth(raw: str) -> str:
+    """Validated, canonical JSON for `raw`; raises ValueError or pydantic's ValidationError."""
+    if raw.startswith("```"):
+        raw = raw.strip("`").replace("json","")
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError:
+        data = extract_json(raw)  # salvage the outermost {...} from surrounding prose/fences
+    tw = TruthWeaverOutput.model_validate(data)
+    canonical = tw.model_dump(by_alias=True)
+    return json.dumps(canonical, ensure_ascii=False, indent=2)
 
 def validate_node(state: TruthExtractorState) -> Dict[str, Any]:
     try:
-        raw = state.raw
-        if raw.startswith("```"):
-            raw = raw.strip("`").replace("json","")
-        print("\n")
-        print(type(raw))
-        print("\n")
-        data = json.loads(raw)
-        print("\n")
-        print(type(data))
-        print("\n")
-        tw = TruthWeaverOutput.model_validate(data)  
-        canonical = tw.model_dump(by_alias=True)
-        return {"json": json.dumps(canonical, ensure_ascii=False, indent=2)}
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
-        print(f"Raw response: {raw}")
-        raise
+        with metrics.span("validate", lane=state.shadow_id):
+            return {"json": _parse_truth(state.raw), "error": ""}
     except Exception as e:
-        print(f"Validation error: {e}")
-        print(f"Raw response: {raw}")
-        raise
+        metrics.count("validation_errors")
+        print(f"[Stage2] {state.shadow_id}: validation error: {e}")
+        print(f"Raw response: {state.raw[:300]}")
+        return {"error": str(e)}
+
+def after_validate(state: TruthExtractorState) -> str:
+    if state.json:
+        return "store"
+    return "repair" if state.repairs < LLM_REPAIR_ATTEMPTS else "give_up"
+
+REPAIR_MESSAGES = [
+    ("system", """You repair JSON so that it validates against a JSON schema.
+Keep every value from the input that is valid; fix only what the error points at.
+Return ONLY the corrected JSON object."""),
+    ("human", """SCHEMA:
+{schema}
+
+VALIDATION ERROR:
+{error}
+
+JSON TO REPAIR:
+{raw}""")
+]
+
+@lru_cache(maxsize=None)
+def get_repair_prompt():
+    from langchain_core.prompts import ChatPromptTemplate
+    return ChatPromptTemplate.from_messages(REPAIR_MESSAGES)
+
+def _repair_inputs(state: TruthExtractorState) -> Dict[str, str]:
+    # Only the error and the bad answer are sent back, not the transcripts
+    schema = json.dumps(TruthWeaverOutput.model_json_schema(by_alias=True), separators=(",", ":"))
+    return {"schema": schema, "error": state.error, "raw": state.raw}
+
+def _repair_update(state: TruthExtractorState, resp, seconds: float) -> Dict[str, Any]:
+    metrics.count("llm_repairs")
+    return {"raw": resp.content, "repairs": state.repairs + 1,
+            "repair_tokens": state.repair_tokens + _total_tokens(resp),
+            "llm_seconds": state.llm_seconds + seconds}
+
+def repair_node(state: TruthExtractorState, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    print(f"[Stage2] {state.shadow_id}: repair attempt {state.repairs + 1}/{LLM_REPAIR_ATTEMPTS}")
+    messages = _render(get_repair_prompt(), _repair_inputs(state), state.shadow_id)
+    resp, seconds = _invoke_with_retry(_node_llm(config), messages, state.shadow_id,
+                                       _configurable(config).get("rate_limiter"))
+    return _repair_update(state, resp, seconds)
+
+async def arepair_node(state: TruthExtractorState, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    print(f"[Stage2] {state.shadow_id}: repair attempt {state.repairs + 1}/{LLM_REPAIR_ATTEMPTS}")
+    messages = _render(get_repair_prompt(), _repair_inputs(state), state.shadow_id)
+    resp, seconds = await _ainvoke_with_retry(_node_llm(config), messages, state.shadow_id,
+                                              _configurable(config).get("rate_limiter"))
+    return _repair_update(state, resp, seconds)
+
+def give_up_node(state: TruthExtractorState) -> Dict[str, Any]:
+    raise ValueError(f"{state.shadow_id}: no valid JSON after {state.repairs} repair attempt(s): {state.error}")
 
 # Build the graph
-graph = StateGraph(TruthExtractorState)
-graph.add_node("llm", llm_node)
-graph.add_node("validate", validate_node)
-graph.set_entry_point("llm")
-graph.add_edge("llm", "validate")
-truth_flow = graph.compile()
+@lru_cache(maxsize=1)
+def get_truth_graph():
+    """The uncompiled truth graph, built once per process."""
+    from langgraph.graph import StateGraph, END
+    from langchain_core.runnables import RunnableLambda
+    graph = StateGraph(TruthExtractorState)
+    graph.add_node("claims", claims_node)
+    # Nodes that read config["configurable"] go through RunnableLambda, which passes `config` on
+    graph.add_node("cache", RunnableLambda(cache_node, name="cache"))
+    graph.add_node("llm", RunnableLambda(llm_node, afunc=allm_node, name="llm"))
+    graph.add_node("validate", validate_node)
+    graph.add_node("repair", RunnableLambda(repair_node, afunc=arepair_node, name="repair"))
+    graph.add_node("give_up", give_up_node)
+    graph.add_node("store", RunnableLambda(store_node, name="store"))
+    graph.set_entry_point("claims")
+    graph.add_conditional_edges("claims", lambda state: END if state.json else "cache", ["cache", END])
+    graph.add_conditional_edges("cache", lambda state: END if state.json else "llm", ["llm", END])
+    graph.add_edge("llm", "validate")
+    # Bad JSON goes through up to LLM_REPAIR_ATTEMPTS cheap repair calls instead of failing the shadow
+    graph.add_conditional_edges("validate", after_validate, ["store", "repair", "give_up"])
+    graph.add_edge("repair", "validate")
+    graph.add_edge("store", END)
+    return graph
+
+def get_truth_flow(checkpointer=None):
+    # Compiled per run and not cached: a cache keyed on the saver would keep every run's saver alive
+    return get_truth_graph().compile(checkpointer=checkpointer)
+
+def missing_sessions(shadow_id: str, clean_sessions: Dict[str, str]) -> List[str]:
+    return [f"{shadow_id}_{i}.txt" for i in range(1, 6) if f"{shadow_id}_{i}" not in clean_sessions]
 
 def check_required_files(shadow_id: str, clean_sessions: Dict[str, str]):
-    missing = []
-    for i in range(1, 6):
-        key = f"{shadow_id}_{i}"
-        if key not in clean_sessions:
-            missing.append(key + ".txt")
+    missing = missing_sessions(shadow_id, clean_sessions)
     if missing:
         print("Missing required files:")
         for m in missing:
@@ -272,78 +524,262 @@ def check_required_files(shadow_id: str, clean_sessions: Dict[str, str]):
     print("All required files found!")
     return True
 
-def main(TEMP_DIR:str):
+def _run_config(llm=None, rate_limiter=None, cache: LLMCache = None) -> Dict[str, Any]:
+    return {"configurable": {"llm": llm, "rate_limiter": rate_limiter, "cache": cache}}
+
+# -------- Checkpoints (resume after a crash) --------
+def open_checkpointer(path: str = STAGE2_CHECKPOINT_PATH):
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return SqliteSaver.from_conn_string(path)
+
+def open_async_checkpointer(path: str = STAGE2_CHECKPOINT_PATH):
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return AsyncSqliteSaver.from_conn_string(path)
+
+def thread_id(state: TruthExtractorState, llm) -> str:
+    """shadow_id plus a hash of the prompt inputs, model and claims settings, so changed inputs start a new thread."""
+    h = hashlib.sha256(json.dumps(_prompt_inputs(state), sort_keys=True).encode("utf-8"))
+    h.update(json.dumps(_model_params(llm), sort_keys=True, default=str).encode("utf-8"))
+    # The claims settings decide whether the LLM is called at all and with which prompt
+    h.update(json.dumps({"fast_path": CLAIMS_FAST_PATH, "min_confidence": CLAIMS_MIN_CONFIDENCE,
+                         "fact_sheet": CLAIMS_FACT_SHEET, "rules": claims.RULES_VERSION},
+                        sort_keys=True).encode("utf-8"))
+    return f"{state.shadow_id}:{h.hexdigest()[:16]}"
+
+def _flow_config(state: TruthExtractorState, llm, rate_limiter, cache, checkpointer) -> Dict[str, Any]:
+    config = _run_config(llm, rate_limiter, cache)
+    if checkpointer is not None:
+        config["configurable"]["thread_id"] = thread_id(state, llm or get_llm())
+    return config
+
+def _resume_point(snapshot, initial_state: TruthExtractorState):
+    """(graph input, finished) for a thread's latest checkpoint.
+
+    A finished thread is reused as is; an interrupted one resumes from its
+    pending node (input None); no checkpoint, or one stopped at give_up, starts over.
+    """
+    if snapshot is None or not snapshot.values:
+        return initial_state, False
+    if not snapshot.next:
+        return (None, True) if snapshot.values.get("json") else (initial_state, False)
+    if snapshot.next == ("give_up",):
+        return initial_state, False
+    print(f"[Stage2] {initial_state.shadow_id}: resuming at {snapshot.next[0]}")
+    return None, False
+
+def open_llm_cache() -> LLMCache:
+    return LLMCache(LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES)
+
+def _close_cache(cache: Optional[LLMCache]):
+    if cache is not None:
+        stats = cache.stats()
+        print(f"[Stage2] LLM cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
+        cache.close()
+
+def prepare_state(shadow_id: str, annotated: Dict[str, List[Dict[str, Any]]] = None,
+                  transcripts: Dict[str, str] = None) -> Optional[TruthExtractorState]:
+    with metrics.span("load", lane=shadow_id):
+        clean = load_clean_sessions_text(shadow_id, transcripts)
+        if not clean:
+            print(f"No sessions found for {shadow_id}")
+            return None
+        if annotated is None:
+            annotated = load_shadow_sessions(shadow_id)
+
+    # Only this shadow's segments, merged and compacted to the token budget
+    with metrics.span("payload", lane=shadow_id):
+        annotated_str, payload = build_annotation_payload(annotated, shadow_id, PROMPT_TOKEN_BUDGET)
+    full_tokens = raw_tokens(shadow_segments(annotated, shadow_id))
+    print(f"[Stage2] {shadow_id}: annotations {payload['segments']} segments -> {payload['rows']} rows, "
+          f"~{full_tokens} -> ~{payload['tokens']} prompt tokens")
+    return TruthExtractorState(
+        shadow_id=shadow_id,
+        s1=clean.get(f"{shadow_id}_1", ""),
+        s2=clean.get(f"{shadow_id}_2", ""),
+        s3=clean.get(f"{shadow_id}_3", ""),
+        s4=clean.get(f"{shadow_id}_4", ""),
+        s5=clean.get(f"{shadow_id}_5", ""),
+        annotated_json=annotated_str
+    )
+
+def report_attempts(result: Dict[str, Any]):
+    if result.get("raw") or result.get("repairs"):  # a cache hit made no LLM call
+        print(f"[Stage2] {result['shadow_id']}: {result['repairs']} repair(s), "
+              f"{result['repair_tokens']} repair tokens, {result['llm_seconds']:.1f}s in LLM calls")
+
+def truth_path(shadow_id: str) -> str:
+    return os.path.join(TRUTH_JSON_OUTPUT, f"{shadow_id}_truth.json")
+
+def save_truth(shadow_id: str, final_json: str) -> Dict[str, Any]:
+    os.makedirs(TRUTH_JSON_OUTPUT, exist_ok=True)
+    out_path = truth_path(shadow_id)
+    with metrics.span("write", lane=shadow_id, kind="truth"), atomic_write(out_path) as f:
+        f.write(final_json)
+    metrics.count("shadows")
+
+    print(f"\n[Stage2] Successfully wrote: {out_path}")
+    print("\nGenerated truth.json:")
+    print(final_json)
+    return json.loads(final_json)
+
+def main(shadow_id: str, annotated: Dict[str, List[Dict[str, Any]]] = None, transcripts: Dict[str, str] = None,
+         llm=None, cache: LLMCache = None, checkpointer=None):
     print(f"Output directory: {OUTPUT_DIR}")
     
-    # Check if required files exist
-    sessions_path = os.path.join(OUTPUT_DIR, "sessions.json")
-    if not os.path.exists(sessions_path):
-        print(f"Missing sessions.json at {sessions_path}")
+    # Check if required files exist (unless Stage 1 handed us the sessions in memory)
+    if annotated is None and not os.path.isdir(SEGMENT_STORE_DIR):
+        print(f"Missing segment store at {SEGMENT_STORE_DIR}")
         return
     
     try:
-        # Load data
-        annotated = load_sessions()
-        clean = load_clean_sessions_text(TEMP_DIR)
-
-        # Get shadow_id from filenames
-        shadow_id = infer_shadow_id(clean)
-
-        # Build initial state
-        annotated_str = json.dumps(annotated, ensure_ascii=False, indent=2)
-        initial_state = TruthExtractorState(
-            shadow_id=shadow_id,
-            s1=clean.get(f"{shadow_id}_1", ""),
-            s2=clean.get(f"{shadow_id}_2", ""),
-            s3=clean.get(f"{shadow_id}_3", ""),
-            s4=clean.get(f"{shadow_id}_4", ""),
-            s5=clean.get(f"{shadow_id}_5", ""),
-            annotated_json=annotated_str
-        )
-        
-        # Run the graph
-        print("\nRunning truth extraction...")
-        result = truth_flow.invoke(initial_state)
-        
-        # Save output
-        final_json = result["json"]
-
-        print(f'\n\nResult\n{result}\n\n')
-
-        temp_name = os.path.basename(TEMP_DIR)
+        # Load data (only this shadow's partitions when reading from disk)
+        initial_state = prepare_state(shadow_id, annotated, transcripts)
+        if initial_state is None:
+            return None
 
-        out_path = os.path.join(TRUTH_JSON_OUTPUT, f"{temp_name}_truth.json")
-        with open(out_path, "w", encoding="utf-8") as f:
-            f.write(final_json)
-        
-        print(f"\n[Stage2] Successfully wrote: {out_path}")
-        print("\nGenerated truth.json:")
-        print(final_json)
+        # Run the graph
+        flow = get_truth_flow(checkpointer)
+        config = _flow_config(initial_state, llm, None, cache, checkpointer)
+        start, finished = _resume_point(flow.get_state(config) if checkpointer else None, initial_state)
+        if finished:
+            print(f"[Stage2] {shadow_id}: already extracted for these inputs, skipping")
+            return save_truth(shadow_id, flow.get_state(config).values["json"])
 
-        return json.loads(final_json)
-        print(f"\n[Stage2] Successfully wrote: {out_path}")
+        print("\nRunning truth extraction...")
+        result = flow.invoke(start, config)
+        report_attempts(result)
+        return save_truth(shadow_id, result["json"])
 
     except Exception as e:
+        metrics.count("shadow_errors")
         print(f"\nError during execution: {e}")
         import traceback
         traceback.print_exc()
         return None
 
-if __name__ == "__main__":
-    combined_results = []
+async def amain(shadow_id: str, annotated: Dict[str, List[Dict[str, Any]]], transcripts: Dict[str, str] = None,
+                llm=None, rate_limiter=None, cache: LLMCache = None, checkpointer=None):
+    try:
+        initial_state = prepare_state(shadow_id, annotated, transcripts)
+        if initial_state is None:
+            return None
+        flow = get_truth_flow(checkpointer)
+        config = _flow_config(initial_state, llm, rate_limiter, cache, checkpointer)
+        snapshot = await flow.aget_state(config) if checkpointer else None
+        start, finished = _resume_point(snapshot, initial_state)
+        if finished:
+            print(f"[Stage2] {shadow_id}: already extracted for these inputs, skipping")
+            return save_truth(shadow_id, snapshot.values["json"])
+
+        print(f"[Stage2] {shadow_id}: running truth extraction")
+        result = await flow.ainvoke(start, config)
+        report_attempts(result)
+        return save_truth(shadow_id, result["json"])
+    except Exception as e:
+        metrics.count("shadow_errors")
+        print(f"\n[Stage2] {shadow_id}: error during execution: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
 
-    for DIR in TEMP_DIRECTORIES:
-        result = main(DIR)
-        if result:
-            combined_results.append(result)
+def stage_metrics():
+    """Spans/counters of this run -> outputs/metrics/stage_2.prom (+ trace / profile when enabled)."""
+    return metrics.stage("stage_2", "[Stage2]", METRICS_DIR, TRACE_EVENTS, PROFILER)
 
+def write_submission(shadows: List[str]) -> List[Dict[str, Any]]:
+    """Rebuild PrelimsSubmission.json from the truth files written so far, in shadows order.
+
+    Called after every finished shadow, so a crash keeps everything extracted up to that point.
+    """
+    combined_results = []
+    for shadow_id in shadows:
+        if os.path.exists(truth_path(shadow_id)):
+            with open(truth_path(shadow_id), "r", encoding="utf-8") as f:
+                combined_results.append(json.load(f))
+
+    os.makedirs(FINAL_OUTPUT_DIR, exist_ok=True)
     combined_path = os.path.join(FINAL_OUTPUT_DIR, "PrelimsSubmission.json")
-    with open(combined_path, "w", encoding="utf-8") as f:
+    with metrics.span("write", kind="submission"), atomic_write(combined_path) as f:
         json.dump(combined_results, f, ensure_ascii=False, indent=2)
+    return combined_results
+
+def run_all(sessions: Dict[str, List[Dict[str, Any]]] = None, transcripts: Dict[str, str] = None,
+            llm=None, shadows: List[str] = None, use_cache: bool = True,
+            use_checkpoints: bool = True) -> List[Dict[str, Any]]:
+    shadows = shadows or discover_shadows(transcripts)
+
+    with stage_metrics():
+        cache = open_llm_cache() if use_cache else None
+        try:
+            with open_checkpointer() if use_checkpoints else contextlib.nullcontext() as checkpointer:
+                for shadow_id in shadows:
+                    if main(shadow_id, sessions, transcripts, llm, cache, checkpointer):
+                        write_submission(shadows)
+        finally:
+            _close_cache(cache)
+        combined_results = write_submission(shadows)
+    print(f"\n[Stage2] Combined results written to: {os.path.join(FINAL_OUTPUT_DIR, 'PrelimsSubmission.json')}")
+    return combined_results
+
+async def arun_all(sessions: Dict[str, List[Dict[str, Any]]] = None, transcripts: Dict[str, str] = None,
+                   llm=None, shadows: List[str] = None, concurrency: int = LLM_CONCURRENCY,
+                   requests_per_second: float = LLM_REQUESTS_PER_SECOND,
+                   use_cache: bool = True, use_checkpoints: bool = True) -> List[Dict[str, Any]]:
+    """Run all shadows concurrently: at most `concurrency` in flight, LLM calls token-bucket limited."""
+    from langchain_core.rate_limiters import InMemoryRateLimiter
+    shadows = shadows or discover_shadows(transcripts)
+    rate_limiter = InMemoryRateLimiter(requests_per_second=requests_per_second, check_every_n_seconds=0.05,
+                                       max_bucket_size=max(concurrency, 1))
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run_one(shadow_id: str, checkpointer):
+        async with semaphore:
+            if await amain(shadow_id, sessions, transcripts, llm, rate_limiter, cache, checkpointer):
+                write_submission(shadows)
+
+    with stage_metrics():
+        cache = open_llm_cache() if use_cache else None
+        try:
+            async with open_async_checkpointer() if use_checkpoints else contextlib.nullcontext() as checkpointer:
+                await asyncio.gather(*(run_one(shadow_id, checkpointer) for shadow_id in shadows))
+        finally:
+            _close_cache(cache)
+        # The submission follows shadows order, not completion order, so it is deterministic
+        combined_results = write_submission(shadows)
+    print(f"\n[Stage2] Combined results written to: {os.path.join(FINAL_OUTPUT_DIR, 'PrelimsSubmission.json')}")
+    return combined_results
 
-    print(f"\n[Stage2] Combined results written to: {combined_path}")
-
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stage 2: extract the truth for every shadow")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="run shadows concurrently")
+    parser.add_argument("--concurrency", type=int, default=LLM_CONCURRENCY, help="max shadows in flight (--async)")
+    parser.add_argument("--rps", type=float, default=LLM_REQUESTS_PER_SECOND, help="max LLM requests per second (--async)")
+    parser.add_argument("--no-cache", action="store_true", help="ignore and do not update the LLM response cache")
+    parser.add_argument("--no-checkpoints", action="store_true", help="do not resume from or record graph checkpoints")
+    parser.add_argument("--shadow", action="append", dest="shadows", metavar="SHADOW_ID",
+                        help="only this shadow (repeatable); default: every shadow in the Stage 1 manifest")
+    parser.add_argument("--fake-llm", type=float, metavar="LATENCY", help="use the offline fake model with this latency in seconds")
+    parser.add_argument("--fast-path", action="store_true", help="answer consistent shadows from claims.py without the LLM")
+    parser.add_argument("--fact-sheet", action="store_true", help="send extracted claims instead of the clean sessions")
+    parser.add_argument("--trace", action="store_true", help=f"also write a Chrome trace to {METRICS_DIR}/stage_2.trace.json")
+    parser.add_argument("--profile", choices=["cprofile", "py-spy"], help=f"profile the stage into {METRICS_DIR}/")
+    args = parser.parse_args()
+    TRACE_EVENTS = TRACE_EVENTS or args.trace
+    PROFILER = args.profile or PROFILER
+    CLAIMS_FAST_PATH = CLAIMS_FAST_PATH or args.fast_path
+    CLAIMS_FACT_SHEET = CLAIMS_FACT_SHEET or args.fact_sheet
+
+    llm = None
+    if args.fake_llm is not None:
+        from fake_llm import FakeTruthLLM
+        llm = FakeTruthLLM(latency=args.fake_llm)
+    if args.use_async:
+        asyncio.run(arun_all(llm=llm, shadows=args.shadows, concurrency=args.concurrency, requests_per_second=args.rps,
+                             use_cache=not args.no_cache, use_checkpoints=not args.no_checkpoints))
+    else:
+        run_all(llm=llm, shadows=args.shadows, use_cache=not args.no_cache, use_checkpoints=not args.no_checkpoints)
 
     print("\nAll done!\n")
     print("Check the 'final_outputs' directory for results.")
-
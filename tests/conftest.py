@@ -0,0 +1,13 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty directory, so outputs/, caches and checkpoints stay out of the repo."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,64 @@
+# tests/test_claims.py
+"""claims.py against reference answers for the sample shadows in data/claims_samples.json.
+
+Each sample holds five clean sessions and the TruthWeaverOutput the LLM is
+expected to give for them. Wherever the fast path answers, it has to agree
+with that answer on the fields a grader checks: no deception, the years of
+experience, the language and framework, the skill level and whether the
+candidate leads. To re-check against the live model, run Stage 2 with
+CLAIMS_FAST_PATH off on these sessions and compare with its answers instead.
+"""
+import os
+import re
+import json
+
+import pytest
+
+import claims
+from config import CLAIMS_MIN_CONFIDENCE
+
+with open(os.path.join(os.path.dirname(__file__), "data", "claims_samples.json"), encoding="utf-8") as f:
+    SAMPLES = json.load(f)
+
+def _years(text):
+    m = re.match(r"\s*(\d+(?:\.\d+)?)", text)
+    return float(m.group(1)) if m else None
+
+def _language(text):
+    return re.sub(r"[\s.]", "", text).lower()
+
+def _leads(text):
+    text = text.lower()
+    return not any(w in text for w in ("none", "fabricated", "no ")) and bool(re.search(r"\b(led|leads?|mentor)", text))
+
+def fast_answers():
+    sheets = {s: claims.fact_sheet(s, sample["sessions"]) for s, sample in SAMPLES.items()}
+    return {s: claims.fast_path_truth(sheet, CLAIMS_MIN_CONFIDENCE) for s, sheet in sheets.items()}
+
+def test_fast_path_answers_some_samples():
+    answered = [s for s, truth in fast_answers().items() if truth is not None]
+    assert len(answered) >= 3
+
+@pytest.mark.parametrize("shadow_id", sorted(SAMPLES))
+def test_fast_path_agrees_with_the_llm(shadow_id):
+    truth = fast_answers()[shadow_id]
+    expected = SAMPLES[shadow_id]["answer"]
+    if truth is None:
+        return  # goes to the LLM
+    assert expected["deception_patterns"] == []
+    got, want = truth["revealed_truth"], expected["revealed_truth"]
+    assert _years(got["programming_experience"]) == _years(want["programming_experience"])
+    assert _language(got["programming_language"]) == _language(want["programming_language"])
+    assert got["skill_mastery"] == want["skill_mastery"]
+    assert _leads(got["leadership_claims"]) == _leads(want["leadership_claims"])
+
+def test_deceptive_samples_go_to_the_llm():
+    answers = fast_answers()
+    for shadow_id, sample in SAMPLES.items():
+        if sample["answer"]["deception_patterns"]:
+            assert answers[shadow_id] is None, shadow_id
+
+@pytest.mark.parametrize("sentence", ["I spent a year at a bank writing JavaScript.",
+                                      "I learned Python in a year at university."])
+def test_articles_are_not_numbers(sentence):
+    assert claims.extract_session(sentence)["experience"] == []
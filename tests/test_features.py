@@ -0,0 +1,58 @@
+# tests/test_features.py
+"""FrameFeatures segment queries against analyze_features on the same slices."""
+import numpy as np
+import pytest
+
+pytest.importorskip("librosa")
+
+from utils_audio import FrameFeatures, analyze_features
+
+SR = 16000
+
+@pytest.fixture(scope="module")
+def voice():
+    """30 s of a gliding harmonic tone with a loudness envelope and a little noise."""
+    rng = np.random.default_rng(0)
+    t = np.arange(30 * SR) / SR
+    phase = 2 * np.pi * np.cumsum(150 + 60 * np.sin(2 * np.pi * 0.3 * t)) / SR
+    envelope = 0.5 + 0.5 * np.abs(np.sin(2 * np.pi * 0.7 * t))
+    tone = np.sin(phase) + 0.5 * np.sin(2 * phase) + 0.25 * np.sin(3 * phase)
+    return (0.1 * envelope * tone + 0.01 * rng.standard_normal(t.size)).astype(np.float32)
+
+@pytest.fixture(scope="module")
+def features(voice):
+    return FrameFeatures(voice, SR)
+
+def relative_errors(audio, features, seconds, n=40, seed=1):
+    rng = np.random.default_rng(seed)
+    errors = []
+    for _ in range(n):
+        length = int(rng.uniform(*seconds) * SR)
+        start = int(rng.integers(0, audio.size - length))
+        rms, pitch = analyze_features(audio[start:start + length], SR)
+        got_rms, got_pitch = features.segment(start, start + length)
+        errors.append((abs(got_rms - rms) / rms, abs(got_pitch - pitch) / pitch))
+    return np.array(errors)
+
+@pytest.mark.parametrize("seconds, mean_tol, max_tol", [((1.0, 2.0), 0.03, 0.06), ((2.0, 8.0), 0.01, 0.03)])
+def test_matches_analyze_features_within_tolerance(voice, features, seconds, mean_tol, max_tol):
+    errors = relative_errors(voice, features, seconds)
+    assert errors.mean(axis=0).max() < mean_tol
+    assert errors.max() < max_tol
+
+def test_short_segments_fall_back_to_analyze_features(voice, features):
+    # Under min_seconds the slice is analysed on its own, so the values are exact
+    errors = relative_errors(voice, features, (0.1, 0.9))
+    assert errors.max() < 1e-6
+
+def test_empty_segment(features):
+    assert features.segment(100, 100) == (0.0, 0.0)
+
+def test_yin_reports_the_fundamental(voice):
+    # yin is not held to analyze_features: it tracks F0, so compare with the glide itself
+    yin = FrameFeatures(voice, SR, pitch_tracker="yin")
+    t = np.arange(voice.size) / SR
+    f0 = 150 + 60 * np.sin(2 * np.pi * 0.3 * t)
+    for start, end in [(0, 4 * SR), (5 * SR, 12 * SR), (20 * SR, 30 * SR)]:
+        _, pitch = yin.segment(start, end)
+        assert abs(pitch - f0[start:end].mean()) / f0[start:end].mean() < 0.03
@@ -0,0 +1,44 @@
+# tests/test_main.py
+"""The pipeline runner's bookkeeping does not depend on the working directory."""
+import os
+
+import pytest
+
+import main
+
+def test_stage_inputs_resolve_from_another_directory(workdir):
+    for stage in main.PIPELINE:
+        modules = main.local_modules(f"{stage.name}.py")
+        assert modules and all(os.path.isabs(p) and os.path.exists(p) for p in modules), stage.name
+    assert os.path.dirname(main.STATE_FILE) == main.ROOT
+    assert all(o.startswith(main.ROOT) for stage in main.PIPELINE for o in stage.outputs)
+
+def test_stage_2_fingerprints_the_segment_store(workdir, monkeypatch):
+    import config
+    import segment_store
+    monkeypatch.setattr(main, "ROOT", str(workdir))
+    monkeypatch.setattr(config, "SEGMENT_STORE_DIR", "segments")
+    segs = [{"start": 0.0, "end": 1.0, "text": "hello", "emotion": "neu", "rms": 0.05, "pitch": 180.0, "style": ""}]
+    path = segment_store.write_session("segments", "rhea_2024_1", segs)
+    assert main._segment_partitions() == [str(workdir / path)]
+    before = main.fingerprint(main._segment_partitions())
+    segment_store.write_session("segments", "rhea_2024_1", segs + [dict(segs[0], text="again")])
+    assert main.fingerprint(main._segment_partitions()) != before
+
+def test_stage_2_inputs(monkeypatch):
+    monkeypatch.setattr(main, "_segment_partitions", lambda: ["partition.arrow"])
+    inputs = next(s for s in main.PIPELINE if s.name == "stage_2").inputs()
+    assert "partition.arrow" in inputs
+    assert not [p for p in inputs if p.endswith("sessions.json")]
+
+def test_save_state_keeps_the_old_file_on_a_failed_write(workdir, monkeypatch):
+    def interrupted(*args, **kwargs):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(main, "STATE_FILE", str(workdir / ".pipeline_state.json"))
+    main.save_state({"stage_1": "abc"})
+    with monkeypatch.context() as m:
+        m.setattr(main.json, "dump", interrupted)
+        with pytest.raises(KeyboardInterrupt):
+            main.save_state({"stage_1": "def"})
+    assert main.load_state() == {"stage_1": "abc"}
+    assert os.listdir(workdir) == [".pipeline_state.json"]
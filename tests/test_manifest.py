@@ -0,0 +1,32 @@
+# tests/test_manifest.py
+"""The transcript store and its manifest: one commit point, old readers keep working."""
+import os
+
+from manifest import iter_transcripts, load_manifest, read_shadow, write_transcript_store
+
+def write(tmp_path, transcripts):
+    return write_transcript_store(transcripts, str(tmp_path / "transcripts.txt"), str(tmp_path / "manifest.json"))
+
+def stores(tmp_path):
+    return sorted(n for n in os.listdir(tmp_path) if n.startswith("transcripts."))
+
+def test_round_trip(tmp_path):
+    transcripts = {"rhea_2024_2": "second", "rhea_2024_1": "first é", "atlas_2025_1": "atlas"}
+    manifest = write(tmp_path, transcripts)
+    assert manifest["store"] == stores(tmp_path)[0] and manifest["store"] != "transcripts.txt"
+    loaded = load_manifest(str(tmp_path / "manifest.json"))
+    assert dict(iter_transcripts(loaded)) == transcripts
+
+def test_a_loaded_manifest_survives_a_rewrite(tmp_path):
+    write(tmp_path, {"rhea_2024_1": "short", "rhea_2024_2": "also short"})
+    old = load_manifest(str(tmp_path / "manifest.json"))
+    write(tmp_path, {"rhea_2024_1": "a much longer first session than before", "rhea_2024_2": "changed"})
+    # A reader that loaded the manifest before the rewrite still slices its own store
+    assert read_shadow(old, "rhea_2024") == {"rhea_2024_1": "short", "rhea_2024_2": "also short"}
+    new = load_manifest(str(tmp_path / "manifest.json"))
+    assert read_shadow(new, "rhea_2024")["rhea_2024_2"] == "changed"
+
+def test_old_store_versions_are_pruned(tmp_path):
+    manifests = [write(tmp_path, {"rhea_2024_1": f"version {i}"}) for i in range(4)]
+    assert stores(tmp_path) == sorted(m["store"] for m in manifests[-2:])
+    assert not [n for n in os.listdir(tmp_path) if n.endswith(".tmp")]
@@ -0,0 +1,53 @@
+# tests/test_prompt_payload.py
+"""The Stage 2 annotation payload is the same whether segments come as dicts or as segment store tables."""
+import random
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import segment_store
+from prompt_payload import build_annotation_payload, merge_runs, raw_tokens, shadow_segments
+
+SHADOW = "atlas_2025"
+
+def synthetic_sessions(seed: int = 0):
+    rng = random.Random(seed)
+    sessions = {}
+    for n in range(1, 6):
+        t, segs = 0.0, []
+        for _ in range(rng.randint(0, 120)):
+            dur = rng.uniform(0.3, 6.0)
+            segs.append({"start": round(t, 2), "end": round(t + dur, 2),
+                         "text": " ".join(rng.choice(["team", "python", "years", ""]) for _ in range(rng.randint(0, 6))),
+                         "emotion": rng.choice(["neutral", "neutral", "happy", "angry", "sad"]),
+                         "rms": rng.uniform(0.01, 0.3), "pitch": rng.uniform(80.0, 300.0), "style": ""})
+            t += dur + 0.2
+        sessions[f"{SHADOW}_{n}"] = segs
+    return sessions
+
+@pytest.fixture
+def stored(tmp_path):
+    sessions = synthetic_sessions()
+    for name, segs in sessions.items():
+        segment_store.write_session(str(tmp_path), name, segs)
+    return sessions, segment_store.read_shadow(str(tmp_path), SHADOW)
+
+@pytest.mark.parametrize("budget", [200, 1500, 100000])
+def test_tables_and_dicts_give_the_same_payload(stored, budget):
+    dicts, tables = stored
+    assert build_annotation_payload(tables, SHADOW, budget) == build_annotation_payload(dicts, SHADOW, budget)
+
+def test_raw_tokens_match(stored):
+    dicts, tables = stored
+    assert raw_tokens(shadow_segments(tables, SHADOW)) == raw_tokens(shadow_segments(dicts, SHADOW))
+
+def test_merge_runs_weights_by_duration():
+    segs = [{"start": 0.0, "end": 1.0, "text": "a", "emotion": "sad", "rms": 0.1, "pitch": 100.0},
+            {"start": 1.0, "end": 4.0, "text": "b", "emotion": "sad", "rms": 0.2, "pitch": 200.0},
+            {"start": 4.0, "end": 5.0, "text": "c", "emotion": "happy", "rms": 0.3, "pitch": 300.0}]
+    runs = merge_runs(segs)
+    assert runs["emotion"] == ["sad", "happy"]
+    assert list(runs["end"]) == [4.0, 5.0]
+    assert runs["rms"][0] == pytest.approx(0.175)
+    assert runs["pitch"][0] == pytest.approx(175.0)
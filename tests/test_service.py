@@ -0,0 +1,41 @@
+# tests/test_service.py
+"""service.MicroBatcher keeps serving after a client goes away."""
+import asyncio
+import threading
+
+import numpy as np
+
+from config import SAMPLE_RATE
+from service import MicroBatcher
+
+class SlowSER:
+    """Labels every chunk "neu"; each call waits until `release` is set."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def predict_batch(self, chunks, sr):
+        self.release.wait(5)
+        return ["neu"] * len(chunks), None
+
+def job():
+    audio = np.sin(np.linspace(0, 2000, SAMPLE_RATE * 2)).astype(np.float32) * 0.1
+    return audio, [{"start": 0.0, "end": 1.0, "text": "hello"}]
+
+def test_cancelled_request_does_not_stop_the_batcher():
+    async def scenario():
+        ser = SlowSER()
+        batcher = MicroBatcher(ser, max_wait=0.01, max_jobs=4)
+        runner = asyncio.create_task(batcher.run())
+        try:
+            gone = asyncio.create_task(batcher.annotate(*job()))
+            await asyncio.sleep(0.1)  # its batch is now running on the SER thread
+            gone.cancel()
+            ser.release.set()
+            features, emotions = await asyncio.wait_for(batcher.annotate(*job()), 5)
+            assert emotions == ["neu"] and len(features) == 1
+            assert not runner.done()
+        finally:
+            runner.cancel()
+            batcher.pool.shutdown()
+    asyncio.run(scenario())
@@ -0,0 +1,54 @@
+# tests/test_stage1_cache.py
+"""The Stage 1 cache key changes with every setting that can change a record."""
+import pytest
+
+import config
+import stage_1
+
+@pytest.fixture
+def audio(workdir, monkeypatch):
+    monkeypatch.setitem(vars(config), "WHISPER_BACKEND", "faster-whisper")
+    path = workdir / "rhea_2024_1.wav"
+    path.write_bytes(b"RIFF not really audio")
+    return str(path)
+
+@pytest.mark.parametrize("setting, value", [("SER_MAX_BATCH_SECONDS", 30.0), ("SER_QUANTIZE", True),
+                                            ("PITCH_TRACKER", "other")])
+def test_settings_change_the_key(audio, monkeypatch, setting, value):
+    before = stage_1.stage1_cache_key(audio)
+    monkeypatch.setattr(stage_1, setting, value)
+    assert stage_1.stage1_cache_key(audio) != before
+
+def test_cached_records_keep_their_partitions(audio, monkeypatch):
+    import segment_store
+    monkeypatch.setitem(vars(config), "AUDIO_FILES", [audio])
+    segs = [{"start": 0.0, "end": 2.0, "text": "hello", "emotion": "neu", "rms": 0.05, "pitch": 180.0, "style": ""}]
+    stage_1.save_cached_record(stage_1.stage1_cache_key(audio), {"session": "rhea_2024_1", "audio_seconds": 2.0,
+                                                                "segments": segs})
+    writes = []
+    write_session = segment_store.write_session
+    monkeypatch.setattr(segment_store, "write_session", lambda *a, **k: writes.append(a[1]) or write_session(*a, **k))
+
+    stage_1._build(1, True, False, False, stage_1.resolve_settings())
+    assert writes == ["rhea_2024_1"]
+    stage_1._build(1, True, False, False, stage_1.resolve_settings())
+    assert writes == ["rhea_2024_1"]  # unchanged: not rewritten
+
+    monkeypatch.setattr(stage_1, "SER_MAX_BATCH_SECONDS", 30.0)
+    stage_1.save_cached_record(stage_1.stage1_cache_key(audio), {"session": "rhea_2024_1", "audio_seconds": 2.0,
+                                                                "segments": segs * 2})
+    stage_1._build(1, True, False, False, stage_1.resolve_settings())
+    assert writes == ["rhea_2024_1"] * 2
+    (shadow,) = segment_store.load_shadow_sessions(stage_1.SEGMENT_STORE_DIR, "rhea_2024").values()
+    assert len(shadow) == 2
+
+def test_overrides_last_for_one_build(audio, monkeypatch):
+    monkeypatch.setitem(vars(config), "AUDIO_FILES", [])
+    default_key = stage_1.stage1_cache_key(audio)
+    stage_1.build(use_cache=False, overrides={"WHISPER_MODEL": "tiny", "SER_QUANTIZE": True})
+    assert stage_1.WHISPER_MODEL == config.WHISPER_MODEL
+    assert stage_1.stage1_cache_key(audio) == default_key
+    tiny = stage_1.resolve_settings({"WHISPER_MODEL": "tiny"})
+    assert stage_1.stage1_cache_key(audio, settings=tiny) != default_key
+    with pytest.raises(ValueError):
+        stage_1.resolve_settings({"WHISPER_MODLE": "tiny"})
@@ -0,0 +1,17 @@
+# tests/test_stage1_parallel.py
+"""The worker pool's thread settings stay with the workers."""
+import os
+
+import pytest
+
+import stage_1
+
+def test_environ_is_restored(monkeypatch):
+    monkeypatch.setenv("OMP_NUM_THREADS", "8")
+    monkeypatch.delenv("MKL_NUM_THREADS", raising=False)
+    with pytest.raises(RuntimeError):
+        with stage_1._environ({"OMP_NUM_THREADS": "2", "MKL_NUM_THREADS": "2"}):
+            assert os.environ["OMP_NUM_THREADS"] == os.environ["MKL_NUM_THREADS"] == "2"
+            raise RuntimeError("pool failed")
+    assert os.environ["OMP_NUM_THREADS"] == "8"
+    assert "MKL_NUM_THREADS" not in os.environ
@@ -0,0 +1,52 @@
+# tests/test_stage1_streaming.py
+"""Streaming Stage 1: the producer thread must not outlive a failed file, and the final outputs replace the partial ones."""
+import json
+import os
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip("librosa")
+
+import config
+import stage_1
+from benchmarks.stubs import StubSER, StubWhisper
+
+SR = 16000
+
+class FailingSER(StubSER):
+    def predict_batch(self, chunks, sr):
+        raise RuntimeError("SER failed")
+
+@pytest.fixture
+def bursts(workdir, monkeypatch):
+    """Two minutes of 0.5 s tone bursts: 120 segments, more than the segment queue holds."""
+    t = np.arange(120 * SR) / SR
+    audio = (0.1 * np.sin(2 * np.pi * 200 * t) * ((t % 1.0) < 0.5)).astype(np.float32)
+    monkeypatch.setattr(stage_1, "load_audio", lambda *args, **kwargs: audio)
+    monkeypatch.setattr(stage_1, "OUTPUT_DIR", str(workdir))
+    # Through the module dict: reading config.WHISPER_BACKEND would run the torch-based detection
+    monkeypatch.setitem(vars(config), "WHISPER_BACKEND", "faster-whisper")
+    return "bursts_2025_1.wav"
+
+def outputs(workdir):
+    return sorted(os.listdir(workdir))
+
+def test_streams_every_segment(bursts, workdir):
+    record = stage_1.process_file_streaming(bursts, StubWhisper(), StubSER())
+    assert len(record["segments"]) == 120
+    assert outputs(workdir) == ["bursts_2025_1_annotated.txt", "bursts_2025_1_segments.jsonl"]
+    with open(workdir / "bursts_2025_1_segments.jsonl", encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == record["segments"]
+    streamed = (workdir / "bursts_2025_1_annotated.txt").read_text(encoding="utf-8")
+    stage_1.write_session_files(record)
+    assert (workdir / "bursts_2025_1_annotated.txt").read_text(encoding="utf-8") == streamed
+
+def test_failed_consumer_stops_producer(bursts, workdir):
+    before = threading.active_count()
+    with pytest.raises(RuntimeError, match="SER failed"):
+        stage_1.process_file_streaming(bursts, StubWhisper(), FailingSER())
+    assert threading.active_count() == before
+    # Only the provisional files; nothing that looks like a finished session
+    assert outputs(workdir) == ["bursts_2025_1_annotated.txt.partial", "bursts_2025_1_segments.jsonl.partial"]
@@ -0,0 +1,50 @@
+# tests/test_stage2_claims.py
+"""The claims fast path in Stage 2 and its interaction with graph checkpoints."""
+import pytest
+
+pytest.importorskip("langgraph.checkpoint.sqlite")
+
+import stage_2
+from fake_llm import FakeTruthLLM
+
+SHADOW = "rhea_2025"
+LINES = ["I have been coding in Java for six years.", "Most of my work is in Java with Spring Boot.",
+         "I led a team of five engineers on the payments service."]
+
+def consistent_inputs():
+    transcripts = {f"{SHADOW}_{n}": " ".join(LINES) for n in range(1, 6)}
+    sessions = {name: [{"start": i * 3.0, "end": i * 3.0 + 2.5, "text": line, "emotion": "neu",
+                        "rms": 0.05, "pitch": 180.0, "style": ""} for i, line in enumerate(LINES)]
+                for name in transcripts}
+    return sessions, transcripts
+
+def run(llm):
+    sessions, transcripts = consistent_inputs()
+    return stage_2.run_all(sessions, transcripts, llm=llm, use_cache=False)
+
+def test_fast_path_skips_llm(workdir, monkeypatch):
+    monkeypatch.setattr(stage_2, "CLAIMS_FAST_PATH", True)
+    llm = FakeTruthLLM(latency=0.0)
+    (result,) = run(llm)
+    assert llm.calls == 0
+    assert result["deception_patterns"] == []
+    assert result["revealed_truth"]["programming_experience"] == "6 years"
+
+@pytest.mark.parametrize("setting, value", [("CLAIMS_FAST_PATH", False), ("CLAIMS_MIN_CONFIDENCE", 1.01)])
+def test_changed_claims_settings_start_a_new_thread(workdir, monkeypatch, setting, value):
+    monkeypatch.setattr(stage_2, "CLAIMS_FAST_PATH", True)
+    run(FakeTruthLLM(latency=0.0))  # answered by the fast path and checkpointed as finished
+
+    monkeypatch.setattr(stage_2, setting, value)
+    llm = FakeTruthLLM(latency=0.0)
+    (result,) = run(llm)
+    assert llm.calls == 1
+    assert result["deception_patterns"] != []  # the fake model's answer, not the rule-based one
+
+def test_rules_version_is_part_of_the_thread(monkeypatch):
+    sessions, transcripts = consistent_inputs()
+    state = stage_2.prepare_state(SHADOW, sessions, transcripts)
+    llm = FakeTruthLLM(latency=0.0)
+    before = stage_2.thread_id(state, llm)
+    monkeypatch.setattr(stage_2.claims, "RULES_VERSION", stage_2.claims.RULES_VERSION + 1)
+    assert stage_2.thread_id(state, llm) != before
@@ -0,0 +1,79 @@
+# tests/test_stage2_resume.py
+"""Crash injection for resumable Stage 2 runs.
+
+A run is killed by a simulated crash on a chosen LLM call and restarted; the
+restart must only make the calls that were still missing. The LLM response
+cache is disabled, so any skipping comes from the graph checkpoints.
+"""
+import json
+import os
+from typing import List
+
+import pytest
+
+pytest.importorskip("langgraph.checkpoint.sqlite")
+
+import stage_2
+from fake_llm import FakeTruthLLM, synthetic_inputs
+
+class SimulatedCrash(BaseException):
+    """Not an Exception, so Stage 2's per-shadow error handling can't swallow it."""
+
+class CrashingLLM(FakeTruthLLM):
+    crash_on: int = 0
+
+    def _answer(self, messages):
+        if self.calls + 1 == self.crash_on:
+            raise SimulatedCrash(f"crash on LLM call {self.crash_on}")
+        return super()._answer(messages)
+
+class RecordingLLM(FakeTruthLLM):
+    prompts: List[str] = []
+
+    def _answer(self, messages):
+        self.prompts.append("\n".join(str(m.content) for m in messages))
+        return super()._answer(messages)
+
+def run(n_shadows, llm):
+    sessions, transcripts, shadows = synthetic_inputs(n_shadows)
+    return stage_2.run_all(sessions, transcripts, llm=llm, shadows=shadows, use_cache=False)
+
+def published():
+    path = os.path.join(stage_2.FINAL_OUTPUT_DIR, "PrelimsSubmission.json")
+    if not os.path.exists(path):
+        return 0
+    with open(path, encoding="utf-8") as f:
+        return len(json.load(f))
+
+def test_restart_between_shadows(workdir):
+    # Call 6 of 8 crashes: shadows 1-5 are done, the restart makes calls for shadows 6-8 only
+    with pytest.raises(SimulatedCrash):
+        run(8, CrashingLLM(latency=0.0, crash_on=6))
+    assert published() == 5
+
+    llm = FakeTruthLLM(latency=0.0)
+    assert len(run(8, llm)) == 8
+    assert llm.calls == 3
+
+def test_restart_inside_a_graph(workdir):
+    # Call 1 returns invalid JSON and call 2 (the repair) crashes; the restart resumes at repair
+    with pytest.raises(SimulatedCrash):
+        run(1, CrashingLLM(latency=0.0, fail_first=1, crash_on=2))
+    assert published() == 0
+
+    llm = RecordingLLM(latency=0.0)
+    assert len(run(1, llm)) == 1
+    assert llm.calls == 1
+    assert "Shadow ID:" not in llm.prompts[0]  # the repair prompt, not a fresh truth prompt
+
+def test_compiled_flows_do_not_keep_their_checkpointer():
+    import gc
+    import weakref
+    from langgraph.checkpoint.memory import InMemorySaver
+    saver = InMemorySaver()
+    ref = weakref.ref(saver)
+    flow = stage_2.get_truth_flow(saver)
+    assert stage_2.get_truth_flow(InMemorySaver()) is not flow
+    del flow, saver
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,67 @@
+# tests/test_watch.py
+"""watch.Ingestor: a removed recording leaves nothing behind, and its shadow stops being published."""
+import json
+import os
+
+import pytest
+
+pytest.importorskip("langgraph.checkpoint.sqlite")
+
+import segment_store
+import stage_1
+import stage_2
+import watch
+from fake_llm import FakeTruthLLM
+
+SHADOW = "rhea_2025"
+PATHS = [f"audio/{SHADOW}_{n}.wav" for n in range(1, 6)]
+
+def fake_stage_1(self, audio_path):
+    # What Ingestor.stage_1 leaves behind, without models
+    segs = [{"start": i * 3.0, "end": i * 3.0 + 2.5, "text": f"segment {i}", "emotion": "neu",
+             "rms": 0.05, "pitch": 180.0, "style": ""} for i in range(3)]
+    record = {"session": stage_1.session_name(audio_path), "audio_seconds": 10.0, "segments": segs}
+    stage_1.write_session_files(record)
+    stage_1.write_segment_store(record)
+    return record
+
+def submission():
+    with open(os.path.join(stage_2.FINAL_OUTPUT_DIR, "PrelimsSubmission.json"), encoding="utf-8") as f:
+        return [entry["shadow_id"] for entry in json.load(f)]
+
+def test_removed_session_withdraws_the_shadow(workdir, monkeypatch):
+    monkeypatch.setattr(watch.Ingestor, "stage_1", fake_stage_1)
+    ingestor = watch.Ingestor(use_cache=False, llm=FakeTruthLLM(latency=0.0))
+    try:
+        ingestor.update(PATHS, [])
+        assert os.path.exists(stage_2.truth_path(SHADOW))
+        assert submission() == [SHADOW]
+
+        ingestor.update([], PATHS[-1:])
+        assert not os.path.exists(stage_2.truth_path(SHADOW))
+        assert submission() == []
+
+        ingestor.update(PATHS[-1:], [])  # complete again
+        assert submission() == [SHADOW]
+    finally:
+        ingestor.close()
+
+def test_removed_session_deletes_its_outputs(workdir, monkeypatch):
+    monkeypatch.setattr(watch.Ingestor, "stage_1", fake_stage_1)
+    ingestor = watch.Ingestor(use_cache=False, stage_2=False)
+    session = stage_1.session_name(PATHS[-1])
+    artifacts = [os.path.join(stage_1.OUTPUT_DIR, f"{session}.txt"),
+                 os.path.join(stage_1.OUTPUT_DIR, f"{session}_annotated.txt"),
+                 segment_store.session_path(stage_1.SEGMENT_STORE_DIR, session, stage_1.SEGMENT_STORE_FORMAT)]
+    try:
+        ingestor.update(PATHS, [])
+        assert all(os.path.exists(p) for p in artifacts)
+
+        ingestor.update([], PATHS[-1:])
+        assert [p for p in artifacts if os.path.exists(p)] == []
+        with open(os.path.join(stage_1.OUTPUT_DIR, "sessions.json"), encoding="utf-8") as f:
+            assert session not in json.load(f)
+        assert session not in segment_store.load_shadow_sessions(stage_1.SEGMENT_STORE_DIR, SHADOW)
+        assert os.path.exists(os.path.join(stage_1.OUTPUT_DIR, f"{stage_1.session_name(PATHS[0])}.txt"))
+    finally:
+        ingestor.close()
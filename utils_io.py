@@ -0,0 +1,24 @@
+# utils_io.py
+import os
+import threading
+import contextlib
+from typing import Optional
+
+@contextlib.contextmanager
+def atomic_write(path: str, mode: str = "w", encoding: Optional[str] = "utf-8", **kwargs):
+    """Write `path` through a temporary file next to it that replaces `path` only when the block succeeds.
+
+    Readers (Stage 2, merge_sessions.py, the watch daemon, anyone tailing outputs/) see
+    either the previous file or the complete new one, never a partial write. The
+    temporary name is unique per process and thread, so concurrent writers don't collide.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, mode, encoding=None if "b" in mode else encoding, **kwargs) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,248 @@
+# watch.py
+"""Watch audio/ and process recordings as they arrive.
+
+    python watch.py            # run until interrupted
+    python watch.py --once     # process what is there (once it has settled), then exit
+
+New or changed files go through Stage 1 one at a time with the models kept
+loaded (unchanged files come from the Stage 1 cache). After each batch the
+exports (sessions.json, transcript store + manifest, segment store) are rebuilt
+from every known file. A shadow goes to Stage 2 as soon as the same check
+Stage 2 uses (check_required_files) finds all five of its sessions; only
+shadows touched by the batch are re-run. A removed recording takes its
+<session>.txt, _annotated.txt and segment-store partition with it; its shadow
+has its truth file removed and drops out of PrelimsSubmission.json until it is
+complete again. Every output is replaced atomically.
+
+inotify events (via the optional `watchdog` package) wake the loop early; without
+it the folder is rescanned every WATCH_POLL_SECONDS. Either way a file is only
+picked up once its size and mtime have been stable for WATCH_SETTLE_SECONDS.
+"""
+import os
+import time
+import argparse
+import threading
+import contextlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+from config import AUDIO_DIR, AUDIO_EXTENSIONS, OUTPUT_DIR, METRICS_DIR, WATCH_POLL_SECONDS, WATCH_SETTLE_SECONDS
+from manifest import split_session
+import metrics
+import segment_store
+
+Signature = Tuple[int, int]  # (size, mtime_ns)
+
+# ------------- Folder watching -------------
+
+class FolderWatcher:
+    """Reports audio files that were added, changed or removed, once they have stopped changing."""
+
+    def __init__(self, root: str = AUDIO_DIR, settle: float = WATCH_SETTLE_SECONDS,
+                 extensions: Optional[Tuple[str, ...]] = None):
+        self.root = root
+        self.settle = settle
+        self.extensions = tuple(extensions or AUDIO_EXTENSIONS)
+        self.known: Dict[str, Signature] = {}  # last signature handed out
+        self.pending: Dict[str, Tuple[Signature, float]] = {}  # signature and when it was first seen
+
+    def scan(self) -> Dict[str, Signature]:
+        found = {}
+        if not os.path.isdir(self.root):
+            return found
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                # Dotfiles and other extensions cover partial downloads (.part, .crdownload, .tmp)
+                if entry.name.startswith(".") or not entry.name.endswith(self.extensions) or not entry.is_file():
+                    continue
+                st = entry.stat()
+                found[os.path.join(self.root, entry.name).replace("\\", "/")] = (st.st_size, st.st_mtime_ns)
+        return found
+
+    def poll(self, now: Optional[float] = None) -> Tuple[List[str], List[str]]:
+        """(settled new or changed files, removed files) since the last poll."""
+        now = time.monotonic() if now is None else now
+        found = self.scan()
+        removed = sorted(p for p in self.known if p not in found)
+        for path in removed:
+            del self.known[path]
+        for path in [p for p in self.pending if p not in found]:
+            del self.pending[path]
+
+        ready = []
+        wall = time.time()
+        for path, sig in found.items():
+            if self.known.get(path) == sig:
+                continue
+            seen = self.pending.get(path)
+            # Files last modified longer than `settle` ago (e.g. already there at startup) are ready at once
+            if seen is None and sig[0] > 0 and wall - sig[1] / 1e9 >= self.settle:
+                seen = (sig, now - self.settle)
+            if seen is None or seen[0] != sig:
+                self.pending[path] = (sig, now)  # new, or still being written: restart the clock
+            elif sig[0] > 0 and now - seen[1] >= self.settle:
+                ready.append(path)
+                self.known[path] = sig
+                self.pending.pop(path, None)
+        return sorted(ready), removed
+
+    def next_deadline(self, now: float) -> Optional[float]:
+        """Seconds until the earliest pending file could settle (None if nothing is pending)."""
+        if not self.pending:
+            return None
+        return max(min(first for _, first in self.pending.values()) + self.settle - now, 0.0)
+
+def start_inotify(root: str, wake: threading.Event):
+    """A watchdog observer that sets `wake` on any change in `root`; None if watchdog is not installed."""
+    try:
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+    except ImportError:
+        return None
+
+    class Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            wake.set()
+
+    os.makedirs(root, exist_ok=True)
+    observer = Observer()
+    observer.schedule(Handler(), root, recursive=False)
+    observer.start()
+    return observer
+
+# ------------- Incremental pipeline -------------
+
+class Ingestor:
+    """Keeps the Stage 1 models, the records of every known file and the Stage 2 cache between batches."""
+
+    def __init__(self, use_cache: bool = True, stage_2: bool = True, llm=None):
+        self.use_cache = use_cache and bool(config.STAGE1_CACHE_DIR)
+        self.run_stage_2 = stage_2
+        self.llm = llm
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self._models = None
+        self._resources = contextlib.ExitStack()
+        self._llm_cache = None
+        self._checkpointer = None
+
+    def models(self):
+        # Loaded on the first file that is not in the Stage 1 cache, then kept
+        if self._models is None:
+            import stage_1
+            t0 = time.perf_counter()
+            self._models = (stage_1.load_whisper_model(), stage_1.load_emotion_classifier())
+            print(f"[Watch] models loaded in {time.perf_counter() - t0:.1f}s")
+        return self._models
+
+    def stage_1(self, audio_path: str) -> Dict[str, Any]:
+        import stage_1
+        key = stage_1.stage1_cache_key(audio_path) if self.use_cache else None
+        record = stage_1.load_cached_record(key) if key else None
+        if record is None:
+            print(f"[Watch] Stage 1: {audio_path}")
+            whisper_model, ser = self.models()
+            record = stage_1.process_file(audio_path, whisper_model, ser)
+            if key:
+                stage_1.save_cached_record(key, record)
+        else:
+            metrics.count("stage1_cache_hits")
+        stage_1.write_session_files(record)
+        stage_1.write_segment_store(record, key)
+        return record
+
+    def stage_2(self, shadow_id: str, transcripts: Dict[str, str]) -> bool:
+        import stage_2
+        if self._checkpointer is None:
+            self._llm_cache = stage_2.open_llm_cache()
+            self._checkpointer = self._resources.enter_context(stage_2.open_checkpointer())
+        print(f"[Watch] Stage 2: {shadow_id}")
+        return stage_2.main(shadow_id, None, transcripts, self.llm, self._llm_cache, self._checkpointer) is not None
+
+    def update(self, changed: List[str], removed: List[str]):
+        import stage_1
+        stage_1.ensure_dir(OUTPUT_DIR)
+        for path in removed:
+            print(f"[Watch] removed: {path}")
+            self.records.pop(path, None)
+            stage_1.remove_session_files(stage_1.session_name(path))
+        if removed:
+            segment_store.prune(config.SEGMENT_STORE_DIR, [r["session"] for r in self.records.values()])
+        touched = set()
+        for path in changed:
+            try:
+                self.records[path] = self.stage_1(path)
+            except Exception as e:
+                metrics.count("watch_errors")
+                print(f"[Watch] Stage 1 failed for {path}: {e}")
+                continue
+            touched.add(path)
+        with metrics.span("write", kind="exports"):
+            sessions = stage_1.write_exports([self.records[p] for p in sorted(self.records)])
+        transcripts = stage_1.transcripts_from_sessions(sessions)
+
+        if self.run_stage_2:
+            import stage_2
+            shadows = sorted({split_session(stage_1.session_name(p))[0] for p in touched | set(removed)})
+            for shadow_id in shadows:
+                # Incomplete shadows wait for their remaining sessions
+                if stage_2.check_required_files(shadow_id, transcripts):
+                    self.stage_2(shadow_id, transcripts)
+                elif os.path.exists(stage_2.truth_path(shadow_id)):
+                    # It lost a session: its answer no longer matches the recordings
+                    print(f"[Watch] {shadow_id} is incomplete, withdrawing its truth file")
+                    os.remove(stage_2.truth_path(shadow_id))
+            if shadows:
+                complete = [s for s in stage_2.discover_shadows(transcripts)
+                            if not stage_2.missing_sessions(s, transcripts)]
+                stage_2.write_submission(complete)
+        metrics.write_prometheus(os.path.join(METRICS_DIR, "watch.prom"), "watch")
+
+    def close(self):
+        if self._llm_cache is not None:
+            self._llm_cache.close()
+        self._resources.close()
+
+def run(once: bool = False, use_cache: bool = True, stage_2: bool = True, llm=None,
+        poll: float = WATCH_POLL_SECONDS, settle: float = WATCH_SETTLE_SECONDS, root: str = AUDIO_DIR):
+    watcher = FolderWatcher(root, settle)
+    ingestor = Ingestor(use_cache, stage_2, llm)
+    wake = threading.Event()
+    observer = start_inotify(root, wake)
+    print(f"[Watch] watching {root}/ ({'inotify' if observer else f'polling every {poll:g}s'}, "
+          f"settle {settle:g}s)")
+    try:
+        while True:
+            changed, removed = watcher.poll()
+            if changed or removed:
+                ingestor.update(changed, removed)
+            now = time.monotonic()
+            deadline = watcher.next_deadline(now)
+            if once and deadline is None:
+                break
+            # Sleep until the next rescan, an inotify event, or the moment a pending file may have settled
+            wake.wait(poll if deadline is None else min(poll, deadline + 0.05))
+            wake.clear()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
+        ingestor.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process new recordings in audio/ as they arrive")
+    parser.add_argument("--once", action="store_true", help="process the current files, then exit")
+    parser.add_argument("--no-cache", action="store_true", help="re-process files even if the Stage 1 cache has them")
+    parser.add_argument("--no-stage-2", action="store_true", help="only run Stage 1")
+    parser.add_argument("--poll", type=float, default=WATCH_POLL_SECONDS, help="rescan interval in seconds")
+    parser.add_argument("--settle", type=float, default=WATCH_SETTLE_SECONDS,
+                        help="seconds a file must stay unchanged before it is processed")
+    parser.add_argument("--fake-llm", type=float, metavar="LATENCY", help="use the offline fake model for Stage 2")
+    args = parser.parse_args()
+    llm = None
+    if args.fake_llm is not None:
+        from fake_llm import FakeTruthLLM
+        llm = FakeTruthLLM(latency=args.fake_llm)
+    run(once=args.once, use_cache=not args.no_cache, stage_2=not args.no_stage_2, llm=llm,
+        poll=args.poll, settle=args.settle)